@@ -1,14 +1,19 @@
 import os
 import json
 import datetime
+import numpy as np
 import pandas as pd
 import time
 import random
-import re
+import tempfile
 import sys # Добавлен sys для использования log_callback
 
 # Импортируем из нового вспомогательного модуля
 from utils.json_utils import load_json_config, save_json_config
+from utils.draw_store import get_draw_store
+from utils.pool_format import scan_pool, write_pool
+from utils.ticket_masks import TicketMasks
+from utils.pool_catalog import get_pool_catalog
 
 # Используем относительный импорт для модулей AKK (они в той же папке akk/)
 from .AKK import AKK as AKK_Module
@@ -22,6 +27,12 @@ import sys
 if os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)) not in sys.path:
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
 from labcore.stats_calculator import StatsCalculator 
+from labcore.pool_stats_history import PoolStatsHistory
+from labcore.psw_engine import PSWEngine
+from labcore.zone_classifier import ZoneClassifier
+from labcore.cooccurrence import CoOccurrenceEngine
+from labcore.structure_features import StructureFeaturesBuilder
+from labcore import transition_matrix
 
 
 # Предполагается, что эти пути будут относительно корневой директории LABCORE
@@ -31,6 +42,8 @@ LABCORE_STATE_FILE_NAME = "labcore_state.json"
 LABCORE_DRAWS_FILE = "labcore_draws.csv"
 GENERATED_DIR = "generated"
 SVERKA_INF_DIR = os.path.join("reports", "Сверка_inf")
+# Размер пула, который Тест-Лаборатория генерирует в памяти для каждого тиража
+HISTORICAL_TEST_POOL_SIZE = 200
 
 
 # --- Новый класс: LABCORE_AI_Agent ---
@@ -41,17 +54,32 @@ class LABCORE_AI_Agent:
         self.akk_instance = AKK_Module(os.path.join(self.project_root_dir, CONFIG_DIR, "akk_config.json"), self.project_root_dir)
         self.reverse_analysis_instance = ReverseAnalysis(os.path.join(self.project_root_dir, CONFIG_DIR, "reverse_analysis_config.json"), self.project_root_dir)
         
-    def decide_on_akk_action(self, draw_number, performance_metrics):
+    def decide_on_akk_action(self, draw_number, performance_metrics, history_performance_metrics=None, test_pool=None):
+        """
+        test_pool — комбинации (N, 6), сгенерированные Тест-Лабораторией по статистике на момент тиража:
+        обратный анализ выполняется по ним, а не по пулам из generated/.
+        """
         print(f"AI Agent: Deciding on AKK action for draw {draw_number} with metrics: {performance_metrics}")
         
         recommendation, adjustment_made = self.akk_instance.analyze_performance_and_adjust(
-            draw_number, performance_metrics
+            draw_number, performance_metrics, history_performance_metrics=history_performance_metrics
         )
         
-        if adjustment_made:
+        if adjustment_made and test_pool is not None:
+            winning_numbers = self._get_winning_numbers_from_history(draw_number)
+            if winning_numbers:
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    test_pool_file = os.path.join(tmp_dir, f"historical_test_draw_{draw_number}.lcpool")
+                    write_pool(test_pool_file, test_pool, draw=draw_number)
+                    self.reverse_analysis_instance.analyze_failed_generation(draw_number, test_pool_file, winning_numbers)
+                print("AI Agent: Triggered Reverse Analysis on the historical test pool.")
+        elif adjustment_made:
             print("AI Agent: AKK made an adjustment. Considering further actions like Reverse Analysis.")
             
-            mock_failed_combinations_file = os.path.join(self.project_root_dir, GENERATED_DIR, f"combinations_for_draw_{draw_number + 1}_Контур_A.csv")
+            generated_dir_path = os.path.join(self.project_root_dir, GENERATED_DIR)
+            existing_pools = get_pool_catalog(generated_dir_path).pools_for_draw(draw_number + 1, "A")
+            mock_failed_combinations_file = existing_pools[-1] if existing_pools else os.path.join(
+                generated_dir_path, f"combinations_for_draw_{draw_number + 1}_Контур_A.csv")
             
             if not os.path.exists(mock_failed_combinations_file):
                 print(f"AI Agent: Mock failed combinations file {os.path.basename(mock_failed_combinations_file)} not found. Creating a dummy one.")
@@ -61,6 +89,7 @@ class LABCORE_AI_Agent:
                     "N4": [19, 20, 21], "N5": [25, 26, 27], "N6": [31, 32, 33]
                 }
                 pd.DataFrame(mock_df_data).to_csv(mock_failed_combinations_file, index=False, encoding="utf-8-sig")
+                get_pool_catalog(generated_dir_path).register(mock_failed_combinations_file)
 
             mock_winning_numbers = self._get_winning_numbers_from_history(draw_number)
             if mock_winning_numbers:
@@ -74,18 +103,10 @@ class LABCORE_AI_Agent:
         return recommendation, adjustment_made
 
     def _get_winning_numbers_from_history(self, draw_number):
-        filepath = os.path.join(self.project_root_dir, LABCORE_DRAWS_FILE)
-        if os.path.exists(filepath):
-            try:
-                df = pd.read_csv(filepath, encoding="utf-8-sig")
-                df['Тираж'] = pd.to_numeric(df['Тираж'], errors='coerce')
-                draw_row = df[df['Тираж'] == draw_number]
-                if not draw_row.empty:
-                    numbers = [int(draw_row.iloc[0][f'N{i}']) for i in range(1, 7) if pd.notna(draw_row.iloc[0][f'N{i}'])]
-                    if len(numbers) == 6:
-                        return numbers
-            except Exception as e:
-                print(f"AI Agent: Ошибка получения номеров для тиража {draw_number} из {LABCORE_DRAWS_FILE}: {e}")
+        try:
+            return get_draw_store(os.path.join(self.project_root_dir, LABCORE_DRAWS_FILE)).numbers_for(draw_number)
+        except Exception as e:
+            print(f"AI Agent: Ошибка получения номеров для тиража {draw_number} из {LABCORE_DRAWS_FILE}: {e}")
         return None
 
 # --- Основной класс LABCORE_80 ---
@@ -123,36 +144,34 @@ class LABCORE_80:
         save_json_config(self.labcore_state_filepath, self.labcore_state) # Используем save_json_config
 
     def _get_last_draw_number_from_history(self):
-        filepath = self.draws_filepath
-        if os.path.exists(filepath):
-            try:
-                df = pd.read_csv(filepath, encoding="utf-8-sig")
-                df['Тираж'] = pd.to_numeric(df['Тираж'], errors='coerce')
-                if not df.empty and not pd.isna(df['Тираж'].max()):
-                    return int(df['Тираж'].max())
-            except Exception as e:
-                print(f"LABCORE-80: Ошибка чтения {LABCORE_DRAWS_FILE}: {e}. Используем 0.")
+        try:
+            return get_draw_store(self.draws_filepath).last_draw_number()
+        except Exception as e:
+            print(f"LABCORE-80: Ошибка чтения {LABCORE_DRAWS_FILE}: {e}. Используем 0.")
         return 0
 
     def _get_winning_numbers_for_draw(self, draw_number):
-        filepath = self.draws_filepath
-        if os.path.exists(filepath):
-            try:
-                df = pd.read_csv(filepath, encoding="utf-8-sig")
-                df['Тираж'] = pd.to_numeric(df['Тираж'], errors='coerce')
-                draw_row = df[df['Тираж'] == draw_number]
-                if not draw_row.empty:
-                    numbers = [int(draw_row.iloc[0][f'N{i}']) for i in range(1, 7) if pd.notna(draw_row.iloc[0][f'N{i}'])]
-                    if len(numbers) == 6:
-                        return numbers
-            except Exception as e:
-                print(f"LABCORE-80: Ошибка получения номеров для тиража {draw_number} из {LABCORE_DRAWS_FILE}: {e}")
+        try:
+            return get_draw_store(self.draws_filepath).numbers_for(draw_number)
+        except Exception as e:
+            print(f"LABCORE-80: Ошибка получения номеров для тиража {draw_number} из {LABCORE_DRAWS_FILE}: {e}")
         return None
 
-    def _perform_comparison_mock(self, processed_draw_number, generated_for_draw_number):
+    def _perform_comparison_mock(self, processed_draw_number, generated_for_draw_number, generated_combinations=None):
+        """
+        Сверка тиража с пулами из generated/ для тиража generated_for_draw_number, либо — если передан
+        generated_combinations (N, 6) — с этим пулом в памяти (Тест-Лаборатория).
+        """
         print(f"LABCORE-80: Performing comparison mock for draw {processed_draw_number} with generations for {generated_for_draw_number}...")
         
         winning_numbers = self._get_winning_numbers_for_draw(processed_draw_number)
+        if winning_numbers is not None and generated_combinations is not None:
+            match_counts = np.bincount(TicketMasks.from_numbers(generated_combinations).match_counts(winning_numbers), minlength=7)
+            return {
+                'match_5_plus_count': int(match_counts[5:].sum()),
+                'total_combinations': len(generated_combinations),
+                'match_6_count': int(match_counts[6])
+            }
         if winning_numbers is None:
             print(f"LABCORE-80: Warning: Winning numbers for draw {processed_draw_number} not found or incomplete. Cannot perform realistic comparison mock.")
             return {
@@ -166,11 +185,7 @@ class LABCORE_80:
         total_5_plus_matches = 0
         total_6_matches = 0
 
-        generated_files = []
-        for f_name in os.listdir(generated_dir_path):
-            match = re.match(r"combinations_for_draw_(\d+)_Контур_([AB])_?(\d{8}_\d{6})?\.csv", f_name)
-            if match and int(match.group(1)) == generated_for_draw_number:
-                generated_files.append(os.path.join(generated_dir_path, f_name))
+        generated_files = get_pool_catalog(generated_dir_path).pools_for_draw(generated_for_draw_number)
         
         if not generated_files:
             print(f"LABCORE-80: No generated files found for draw {generated_for_draw_number}. Cannot perform realistic comparison mock.")
@@ -182,16 +197,10 @@ class LABCORE_80:
 
         for g_file_path in generated_files:
             try:
-                df_gen = pd.read_csv(g_file_path, encoding="utf-8-sig")
-                all_generated_combinations_count += len(df_gen)
-                
-                for _, row in df_gen.iterrows():
-                    generated_combination = [row[f'N{i}'] for i in range(1, 7) if pd.notna(row[f'N{i}'])]
-                    num_matches = len(set(generated_combination) & set(winning_numbers))
-                    if num_matches >= 5:
-                        total_5_plus_matches += 1
-                    if num_matches == 6:
-                        total_6_matches += 1
+                scan = scan_pool(g_file_path, winning_numbers)
+                all_generated_combinations_count += scan["total"]
+                total_5_plus_matches += int(scan["match_counts"][5:].sum())
+                total_6_matches += int(scan["match_counts"][6])
             except Exception as e:
                 print(f"LABCORE-80: Error processing generated file {os.path.basename(g_file_path)}: {e}")
 
@@ -201,7 +210,26 @@ class LABCORE_80:
             'match_6_count': total_6_matches
         }
 
-    def _perform_generation_mock(self, generate_for_draw_number):
+    def _perform_generation_mock(self, generate_for_draw_number, pool_stats=None):
+        """
+        Без pool_stats — отметка о генерации в labcore_state. С pool_stats (статистика на момент тиража,
+        Тест-Лаборатория) — генерирует в памяти HISTORICAL_TEST_POOL_SIZE комбинаций по этой статистике
+        и возвращает их; live-состояние и generated/ не меняются.
+        """
+        if pool_stats is not None:
+            from generate.generator import LotteryGenerator
+            config_dir = os.path.join(self.project_root_dir, CONFIG_DIR)
+            generator = LotteryGenerator(
+                draws_df=None,
+                config_core=load_json_config(os.path.join(config_dir, "core_settings.json")),
+                config_softpool=load_json_config(os.path.join(config_dir, "softpool_config.json")),
+                config_quotas=load_json_config(os.path.join(config_dir, "quota_config.json")),
+                pool_stats=pool_stats,
+                attention_weights=load_json_config(os.path.join(config_dir, "attention_weights.json"))
+            )
+            # seed — номер тиража: повторный прогон теста даёт те же пулы
+            return generator.generate_batch(HISTORICAL_TEST_POOL_SIZE, seed=generate_for_draw_number)
+
         print(f"LABCORE-80: Generating combinations mock for draw {generate_for_draw_number}...")
         self.labcore_state["last_generated_draw"] = generate_for_draw_number
         self._save_labcore_state()
@@ -265,8 +293,19 @@ class LABCORE_80:
         # Обновление pool_stats.json в начале цикла
         print("LABCORE-80: Updating pool_stats.json...")
         self.stats_calculator.calculate_and_update_pool_stats()
+        # PSW пересчитывается раз в psw_calculation_interval тиражей, между пересчётами — из кеша
+        PSWEngine(self.project_root_dir).update_pool_stats()
+        # Зоны Hot/Warm/Cold/Sleepy по правилам sleepy_zones.json
+        ZoneClassifier(self.project_root_dir).update_pool_stats()
+        # Оценка номеров по матрицам переходов от последних тиражей (признак "transition")
+        transition_matrix.update_pool_stats(self.project_root_dir)
         print("LABCORE-80: pool_stats.json updated.")
 
+        # Частые пары и тройки по свежей истории — в glue_clusters_auto.json (ручной glue_clusters.json не меняется)
+        CoOccurrenceEngine.from_csv(self.project_root_dir).update_glue_clusters_file(self.project_root_dir)
+        # Матрица признаков структуры: дописываются только новые тиражи
+        StructureFeaturesBuilder(self.project_root_dir).refresh()
+
         draw_number_to_process = draw_number if draw_number is not None else (self._get_last_draw_number_from_history() + 1)
         
         print(f"LABCORE-80: New draw {draw_number_to_process} detected/assumed.")
@@ -333,7 +372,7 @@ class LABCORE_80:
         
         # Загружаем полную историю тиражей один раз
         try:
-            draws_df = pd.read_csv(os.path.join(self.project_root_dir, LABCORE_DRAWS_FILE), encoding="utf-8-sig")
+            draws_df = get_draw_store(os.path.join(self.project_root_dir, LABCORE_DRAWS_FILE)).dataframe()
             draws_df['Тираж'] = pd.to_numeric(draws_df['Тираж'], errors='coerce').astype('Int64')
             draws_df = draws_df.sort_values(by='Тираж', ascending=True).reset_index(drop=True)
         except Exception as e:
@@ -341,6 +380,14 @@ class LABCORE_80:
             sys.stdout = original_stdout
             return
 
+        # Статистика номеров на момент каждого тиража — один проход по истории,
+        # live pool_stats.json при этом не меняется и будущие тиражи не подмешиваются
+        pool_stats_history = PoolStatsHistory.from_dataframe(
+            draws_df,
+            psw_config=load_json_config(os.path.join(self.project_root_dir, CONFIG_DIR, "psw_config.json")),
+            sleepy_config=load_json_config(os.path.join(self.project_root_dir, CONFIG_DIR, "sleepy_zones.json"))
+        )
+
         performance_history_for_akk_A = [] # История метрик для Контура A (30 тиражей)
 
         for i in range(num_draws):
@@ -353,14 +400,23 @@ class LABCORE_80:
 
             print(f"\n--- Тест-Лаборатория: Обработка тиража №{current_test_draw_number} ---")
             
-            # --- Фаза: Обновление pool_stats.json (имитация) ---
-            # В реальном сценарии StatsCalculator может потребовать историю до этого тиража
-            # Для мока просто вызываем, предполагая, что данные актуальны.
-            self.stats_calculator.calculate_and_update_pool_stats() # Обновляем pool_stats для текущего тиража
-            print(f"Тест-Лаборатория: pool_stats.json обновлен для тиража №{current_test_draw_number}.")
-
-            # --- Фаза: Сверка (используем реальные данные тиража, но мок генерации) ---
-            performance_metrics = self._perform_comparison_mock(current_test_draw_number, current_test_draw_number + 1)
+            # --- Фаза: pool_stats на момент перед тиражом (только предшествующая история) ---
+            pool_stats_as_of = pool_stats_history.stats_before(current_test_draw_number)
+            zone_counts = {}
+            for stats in pool_stats_as_of.values():
+                zone_counts[stats["zone"]] = zone_counts.get(stats["zone"], 0) + 1
+            print(f"Тест-Лаборатория: pool_stats на момент тиража №{current_test_draw_number}: зоны {zone_counts}.")
+
+            # --- Фаза: Генерация по статистике на момент тиража (в памяти, не сохраняем в 'generated/') ---
+            try:
+                test_pool = self._perform_generation_mock(current_test_draw_number, pool_stats=pool_stats_as_of)
+            except Exception as e:
+                print(f"Тест-Лаборатория: Генерация для тиража №{current_test_draw_number} не выполнена: {e}. Пропускаем.")
+                continue
+            print(f"Тест-Лаборатория: Сгенерировано {len(test_pool)} комбинаций для тиража №{current_test_draw_number}.")
+
+            # --- Фаза: Сверка пула с реальным тиражом ---
+            performance_metrics = self._perform_comparison_mock(current_test_draw_number, current_test_draw_number, generated_combinations=test_pool)
             print(f"Тест-Лаборатория: Сверка завершена. Метрики: {performance_metrics}")
             
             # Добавляем метрики в историю для АКК (Контур А)
@@ -372,7 +428,8 @@ class LABCORE_80:
             akk_recommendation, adjustment_made = self.ai_agent.decide_on_akk_action(
                 current_test_draw_number, 
                 performance_metrics, 
-                history_performance_metrics=performance_history_for_akk_A # Передаем историю
+                history_performance_metrics=performance_history_for_akk_A, # Передаем историю
+                test_pool=test_pool
             )
             print(f"Тест-Лаборатория: AI Agent решение: {akk_recommendation}")
 
@@ -380,9 +437,6 @@ class LABCORE_80:
             if adjustment_made:
                 print("Тест-Лаборатория: Параметры скорректированы / Переобучение запущено (имитация).")
             
-            # --- Фаза: Генерация Комбинаций (имитация, не сохраняем в 'generated/') ---
-            print(f"Тест-Лаборатория: Генерация комбинаций для тиража №{current_test_draw_number + 1} (имитация).")
-            
             # --- Фаза: Отчетность (имитация, не сохраняем в 'reports/') ---
             # Отчеты Тест-Лаборатории будут только в логе диалога
             print(f"Тест-Лаборатория: Отчетность выполнена (имитация).")
@@ -1,11 +1,10 @@
-import pandas as pd
 import json
 import os
 import datetime
-from collections import Counter
 
 # Импортируем из нового вспомогательного модуля
 from utils.json_utils import load_json_config, save_json_config
+from utils.pool_format import scan_pool
 
 # Предполагается, что эти пути будут относительно корневой директории LABCORE
 GENERATED_DIR = "generated"
@@ -29,40 +28,37 @@ class ReverseAnalysis:
             return "File not found."
 
         try:
-            failed_df = pd.read_csv(failed_combinations_filepath, encoding="utf-8-sig")
+            # Пул читается окнами: память не зависит от размера файла
+            scan = scan_pool(failed_combinations_filepath, winning_numbers, number_counts=True)
             winning_set = set(winning_numbers)
 
             analysis_results = {
                 "draw_number": draw_number,
                 "analysis_timestamp": datetime.datetime.now().isoformat(),
                 "winning_numbers": winning_numbers,
-                "total_failed_combinations": len(failed_df),
+                "total_failed_combinations": scan["total"],
                 "match_counts": {str(i): 0 for i in range(7)},
                 "common_missing_numbers": {},
                 "common_extra_numbers": {}
             }
 
-            all_generated_numbers = []
-            for index, row in failed_df.iterrows():
-                generated_combination = [row[f'N{i}'] for i in range(1, 7) if pd.notna(row[f'N{i}'])]
-                generated_set = set(generated_combination)
-                
-                num_matches = len(generated_set & winning_set)
-                analysis_results["match_counts"][str(num_matches)] += 1
-
-                missing_in_combination = list(winning_set - generated_set)
-                extra_in_combination = list(generated_set - winning_set)
-
-                for num in missing_in_combination:
-                    analysis_results["common_missing_numbers"][str(num)] = analysis_results["common_missing_numbers"].get(str(num), 0) + 1
-                for num in extra_in_combination:
-                    analysis_results["common_extra_numbers"][str(num)] = analysis_results["common_extra_numbers"].get(str(num), 0) + 1
-                
-                all_generated_numbers.extend(generated_combination)
-
-            generated_counter = Counter(all_generated_numbers)
+            for num_matches, count in enumerate(scan["match_counts"]):
+                analysis_results["match_counts"][str(num_matches)] += int(count)
+
+            # Частоты номеров по всему набору: выигрышный номер "отсутствовал" в каждой комбинации без него,
+            # невыигрышный номер был "лишним" в каждой комбинации, где встречается
+            number_counts = scan["number_counts"]
+            total_combinations = scan["total"]
+            for num in winning_set:
+                missing_count = total_combinations - int(number_counts[num])
+                if missing_count > 0:
+                    analysis_results["common_missing_numbers"][str(num)] = missing_count
+            for num in range(1, 53):
+                if num not in winning_set and number_counts[num] > 0:
+                    analysis_results["common_extra_numbers"][str(num)] = int(number_counts[num])
+
             analysis_results["top_generated_unmatched"] = sorted([
-                (num, count) for num, count in generated_counter.items() if num not in winning_set
+                (num, int(number_counts[num])) for num in range(1, 53) if num not in winning_set and number_counts[num] > 0
             ], key=lambda x: x[1], reverse=True)[:self.config.get("top_missing_limit", 10)]
 
             print(f"ReverseAnalysis: Analysis complete for draw {draw_number}.")
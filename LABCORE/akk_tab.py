@@ -2,7 +2,6 @@ import os
 import json
 import datetime
 import sys
-import pandas as pd
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QGroupBox, QFormLayout, QHBoxLayout,
     QMessageBox, QPlainTextEdit, QDialog, QListWidget, QListWidgetItem, QLineEdit,
@@ -12,6 +11,7 @@ from PyQt5.QtCore import Qt, QTimer
 
 # Импортируем из нового вспомогательного модуля
 from utils.json_utils import load_json_config, save_json_config
+from utils.draw_store import get_draw_store
 
 # Импортируем модули АКК
 from akk.LABCORE_80 import LABCORE_80
@@ -177,7 +177,7 @@ class AkkSettingsDialog(QDialog):
             return
 
         try:
-            draws_df = pd.read_csv(draws_filepath, encoding="utf-8-sig")
+            draws_df = get_draw_store(draws_filepath).dataframe()
             if draws_df.empty or 'Тираж' not in draws_df.columns:
                 QMessageBox.warning(self, "Ошибка Тест-Лаборатории", "Файл labcore_draws.csv пуст или не содержит колонку 'Тираж'. Тест невозможен.")
                 return
@@ -403,12 +403,11 @@ class AkkTab(QWidget):
             QMessageBox.warning(self, "Ошибка", f"Файл {LABCORE_DRAWS_FILE} не найден. Невозможно определить следующий тираж. Используем 1.")
             return 1
         try:
-            draws_df = pd.read_csv(draws_filepath, encoding="utf-8-sig")
-            if draws_df.empty or 'Тираж' not in draws_df.columns:
+            draw_store = get_draw_store(draws_filepath)
+            if len(draw_store) == 0:
                 QMessageBox.warning(self, "Ошибка", f"Файл {LABCORE_DRAWS_FILE} пуст или не содержит колонку 'Тираж'. Используем 1.")
                 return 1
-            last_draw = draws_df['Тираж'].max()
-            return int(last_draw) + 1
+            return draw_store.next_draw_number()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка чтения тиражей", f"Не удалось прочитать {LABCORE_DRAWS_FILE}: {e}. Используем 1.")
             return 1
@@ -8,10 +8,13 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 import datetime
-import re
 
 # Импортируем из нового вспомогательного модуля
 from utils.json_utils import load_json_config, save_json_config
+from utils.draw_store import get_draw_store
+from utils.draw_import import clean_draws
+from utils.pool_format import POOL_EXTENSION, is_binary_pool, parse_pool_filename, read_pool_header, scan_pool
+from utils.pool_catalog import get_pool_catalog
 
 LABCORE_DRAWS_FILE = "labcore_draws.csv"
 GENERATED_DIR = "generated"
@@ -84,7 +87,6 @@ class CompareTab(QWidget):
         self.selected_draw_numbers = []
         self.selected_draw_info = {}
         self.selected_generated_filepath = None
-        self.generated_df = pd.DataFrame()
 
         self.all_draws_df = self._load_draws_history() # Загружаем историю при инициализации
         self.update_last_draw_info_label()
@@ -120,20 +122,18 @@ class CompareTab(QWidget):
                 QMessageBox.information(self, "История тиражей", f"Файл {filepath} пуст.")
                 return pd.DataFrame(columns=["Тираж", "Дата", "Комплект", "N1", "N2", "N3", "N4", "N5", "N6"])
             
-            df = pd.read_csv(filepath, encoding="utf-8-sig")
+            df = get_draw_store(filepath).dataframe()
             
             if df.empty:
                 QMessageBox.information(self, "История тиражей", f"Файл {filepath} содержит только заголовок или пуст после чтения.")
                 return pd.DataFrame(columns=["Тираж", "Дата", "Комплект", "N1", "N2", "N3", "N4", "N5", "N6"])
 
-            df_cleaned = self._clean_dataframe_for_comparison(df)
+            df_cleaned, _ = clean_draws(df)
             
             if df_cleaned.empty:
                 QMessageBox.warning(self, "История тиражей", "После очистки данных в файле тиражей не осталось валидных строк.")
                 return pd.DataFrame(columns=["Тираж", "Дата", "Комплект", "N1", "N2", "N3", "N4", "N5", "N6"])
 
-            df_cleaned['Тираж'] = pd.to_numeric(df_cleaned['Тираж'], errors='coerce').astype('Int64')
-            df_cleaned.sort_values(by="Тираж", ascending=False, inplace=True)
             return df_cleaned
         except pd.errors.EmptyDataError:
             QMessageBox.information(self, "История тиражей", f"Файл {filepath} пуст или некорректен для чтения Pandas.")
@@ -142,51 +142,6 @@ class CompareTab(QWidget):
             QMessageBox.warning(self, "Ошибка загрузки истории тиражей", f"Не удалось загрузить {filepath}: {e}")
             return pd.DataFrame()
 
-    def _clean_dataframe_for_comparison(self, df):
-        column_mapping = {
-            "тираж": "Тираж", "розіграш": "Тираж",
-            "дата": "Дата",
-            "комплект": "Комплект",
-            "n1": "N1", "кулька 1": "N1", "шар 1": "N1",
-            "n2": "N2", "кулька 2": "N2", "шар 2": "N2",
-            "n3": "N3", "кулька 3": "N3", "шар 3": "N3",
-            "n4": "N4", "кулька 4": "N4", "шар 4": "N4",
-            "n5": "N5", "кулька 5": "N5", "шар 5": "N5",
-            "n6": "N6", "кулька 6": "N6", "шар 6": "N6"
-        }
-
-        df.columns = [col.lower() for col in df.columns]
-
-        df_cleaned = pd.DataFrame()
-        for target_col in ["Тираж", "Дата", "Комплект", "N1", "N2", "N3", "N4", "N5", "N6"]:
-            found_col_name = None
-            for original_col_name, mapped_col_name in column_mapping.items():
-                if mapped_col_name == target_col:
-                    if original_col_name in df.columns:
-                        found_col_name = original_col_name
-                        break
-            
-            if found_col_name:
-                df_cleaned[target_col] = df[found_col_name]
-            else:
-                df_cleaned[target_col] = pd.NA
-
-        if "Тираж" in df_cleaned.columns:
-            df_cleaned["Тираж"] = pd.to_numeric(df_cleaned["Тираж"], errors='coerce')
-            df_cleaned = df_cleaned.dropna(subset=["Тираж"])
-            df_cleaned["Тираж"] = df_cleaned["Тираж"].astype('Int64')
-        
-        for col in ["Дата", "Комплект"]:
-            if col in df_cleaned.columns:
-                df_cleaned[col] = df_cleaned[col].fillna("").astype(str)
-
-        if "Тираж" in df_cleaned.columns:
-            df_cleaned.drop_duplicates(subset=["Тираж"], keep="last", inplace=True)
-            df_cleaned.sort_values(by="Тираж", ascending=False, inplace=True)
-
-        return df_cleaned
-
-
     def _get_last_draw_number(self):
         if not self.all_draws_df.empty and 'Тираж' in self.all_draws_df.columns:
             draws_series = self.all_draws_df['Тираж'].dropna()
@@ -246,28 +201,25 @@ class CompareTab(QWidget):
             QMessageBox.information(self, "Нет файлов", f"Директория {generated_dir_path} не найдена. Сначала сгенерируйте комбинации.")
             return
 
-        path, _ = QFileDialog.getOpenFileName(self, "Выбрать файл сгенерированных комбинаций", generated_dir_path, "CSV Files (*.csv)")
+        path, _ = QFileDialog.getOpenFileName(self, "Выбрать файл сгенерированных комбинаций", generated_dir_path, f"Пулы комбинаций (*{POOL_EXTENSION} *.csv)")
         if path:
-            self.selected_generated_filepath = path
-            self.generated_file_label.setText(f"Выбранный файл: {os.path.basename(path)}")
+            # Пул целиком не загружается: при сверке он читается окнами (scan_pool), здесь только проверка файла
             try:
-                df = pd.read_csv(path, encoding="utf-8-sig")
-                for i in range(1, 7):
-                    df[f'N{i}'] = pd.to_numeric(df[f'N{i}'], errors='coerce').astype('Int64')
-                self.generated_df = df
+                if is_binary_pool(path):
+                    read_pool_header(path)
+                else:
+                    pd.read_csv(path, encoding="utf-8-sig", nrows=0)
             except Exception as e:
                 QMessageBox.warning(self, "Ошибка загрузки файла", f"Не удалось загрузить файл комбинаций: {str(e)}")
-                self.generated_df = pd.DataFrame()
-        else:
-            self.selected_generated_filepath = None
-            self.generated_file_label.setText("Выбранный файл: Не выбран")
-            self.generated_df = pd.DataFrame()
+                path = None
+        self.selected_generated_filepath = path or None
+        self.generated_file_label.setText(f"Выбранный файл: {os.path.basename(path)}" if path else "Выбранный файл: Не выбран")
 
     def perform_manual_comparison(self):
         if not self.selected_draw_numbers:
             QMessageBox.warning(self, "Ошибка", "Пожалуйста, выберите тираж для сверки.")
             return
-        if self.generated_df.empty:
+        if not self.selected_generated_filepath:
             QMessageBox.warning(self, "Ошибка", "Пожалуйста, выберите файл сгенерированных комбинаций.")
             return
         
@@ -281,43 +233,43 @@ class CompareTab(QWidget):
         match_counts = {i: 0 for i in range(7)}
         threshold_5_plus_met = False
         
-        all_generated_combinations_count = len(self.generated_df)
-
         gen_for_draw_num_from_filename = 'N/A'
-        file_match = re.match(r"combinations_for_draw_(\d+)_Контур_([AB])_?(\d{8}_\d{6})?\.csv", os.path.basename(self.selected_generated_filepath))
+        file_match = parse_pool_filename(self.selected_generated_filepath)
         if file_match:
-            gen_for_draw_num_from_filename = file_match.group(1)
-            contour_label_for_file = file_match.group(2)
+            gen_for_draw_num_from_filename = str(file_match[0])
+            contour_label_for_file = file_match[1]
         else:
             contour_label_for_file = "Неизвестный"
 
-        for idx, row in self.generated_df.iterrows():
-            generated_combination_list = [row[f'N{i}'] for i in range(1, 7) if pd.notna(row[f'N{i}'])]
-            generated_combination_set = set(generated_combination_list)
-            
-            num_matches = len(generated_combination_set & winning_numbers_set)
-            
-            matching_numbers = sorted(list(generated_combination_set & winning_numbers_set))
-            
-            if num_matches >= 3:
-                results_data.append({
-                    "№": idx + 1,
-                    "Номера вышедшего тиража": ", ".join(map(str, sorted(list(winning_numbers_set)))),
-                    "Прогнозная комбинация": ", ".join(map(str, sorted(generated_combination_list))),
-                    "Совпадающие номера": ", ".join(map(str, matching_numbers)),
-                    "Количество совпадений": num_matches
-                })
-            
-            match_counts[num_matches] += 1
-            if num_matches >= 5:
-                threshold_5_plus_met = True
+        try:
+            scan = scan_pool(self.selected_generated_filepath, self.selected_draw_numbers, min_matches=3)
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка загрузки файла", f"Не удалось загрузить файл комбинаций: {str(e)}")
+            self.summary_label.setText("Сводка: Ошибка чтения файла комбинаций.")
+            return
+        all_generated_combinations_count = scan["total"]
+        hits_total = scan["hits_total"]
+
+        for ticket_number, ticket, matching, matches in scan["hits"]:
+            results_data.append({
+                "№": ticket_number,
+                "Номера вышедшего тиража": ", ".join(map(str, sorted(list(winning_numbers_set)))),
+                "Прогнозная комбинация": ", ".join(map(str, ticket)),
+                "Совпадающие номера": ", ".join(map(str, matching)),
+                "Количество совпадений": matches
+            })
+
+        for num_matches, count in enumerate(scan["match_counts"]):
+            match_counts[num_matches] += int(count)
+        threshold_5_plus_met = bool(scan["match_counts"][5:].sum() > 0)
 
         self.display_comparison_results(results_data)
 
         draw_num = self.selected_draw_info.get('Тираж', 'N/A')
 
         summary_text = f"<b>Сводка результатов ручной сверки для тиража №{draw_num} (сгенерировано для тиража №{gen_for_draw_num_from_filename}):</b><br>"
-        summary_text += f"Всего проанализировано комбинаций: {all_generated_combinations_count}<br><br>"
+        summary_text += f"Всего проанализировано комбинаций: {all_generated_combinations_count}<br>"
+        summary_text += self._hits_shown_text(len(results_data), hits_total)
 
         summary_text += "Совпадений (из всех сгенерированных комбинаций):<br>"
         for i in range(len(match_counts) - 1, -1, -1):
@@ -363,7 +315,6 @@ class CompareTab(QWidget):
 
         last_draw_row = self.all_draws_df[self.all_draws_df['Тираж'] == last_draw_number].iloc[0]
         winning_numbers_list = [int(last_draw_row[f'N{i}']) for i in range(1, 7) if pd.notna(last_draw_row[f'N{i}'])]
-        winning_numbers_set = set(winning_numbers_list)
         
         if len(winning_numbers_list) < 6:
             QMessageBox.warning(self, "Ошибка", f"Номера для последнего тиража №{last_draw_number} неполные. Необходимы все 6 чисел.")
@@ -379,11 +330,7 @@ class CompareTab(QWidget):
             return
         
         expected_draw_for_gen = last_draw_number + 1
-        generated_files = []
-        for f_name in os.listdir(generated_dir_path):
-            match = re.match(r"combinations_for_draw_(\d+)_Контур_([AB])_?(\d{8}_\d{6})?\.csv", f_name)
-            if match and int(match.group(1)) == expected_draw_for_gen:
-                generated_files.append(os.path.join(generated_dir_path, f_name))
+        generated_files = get_pool_catalog(generated_dir_path).pools_for_draw(expected_draw_for_gen)
         
         if not generated_files:
             QMessageBox.warning(self, "Нет файлов генерации", f"Не найдено сгенерированных файлов для тиража №{expected_draw_for_gen}. Сначала сгенерируйте комбинации для этого тиража.")
@@ -395,35 +342,30 @@ class CompareTab(QWidget):
         threshold_5_plus_met = False
         
         all_generated_combinations_count = 0
+        hits_total = 0
 
         winning_draw_numbers_str = ", ".join(map(str, sorted(winning_numbers_list)))
 
         for g_file_path in generated_files:
             try:
-                df_gen = pd.read_csv(g_file_path, encoding="utf-8-sig")
-                all_generated_combinations_count += len(df_gen) 
-                
-                for i_combo, row in df_gen.iterrows():
-                    generated_combination_list = [row[f'N{i}'] for i in range(1, 7) if pd.notna(row[f'N{i}'])]
-                    generated_combination_set = set(generated_combination_list)
-                    
-                    num_matches = len(generated_combination_set & winning_numbers_set)
-                    
-                    matching_numbers = sorted(list(generated_combination_set & winning_numbers_set))
-                    
-                    if num_matches >= 3:
-                        overall_results_data.append({
-                            "№": i_combo + 1,
-                            "Номера вышедшего тиража": winning_draw_numbers_str,
-                            "Прогнозная комбинация": ", ".join(map(str, sorted(generated_combination_list))),
-                            "Совпадающие номера": ", ".join(map(str, matching_numbers)),
-                            "Количество совпадений": num_matches
-                        })
-                    
-                    overall_match_counts[num_matches] += 1
-
-                    if num_matches >= 5:
-                        threshold_5_plus_met = True
+                scan = scan_pool(g_file_path, winning_numbers_list, min_matches=3)
+                all_generated_combinations_count += scan["total"]
+                hits_total += scan["hits_total"]
+
+                for ticket_number, ticket, matching, matches in scan["hits"]:
+                    overall_results_data.append({
+                        "№": ticket_number,
+                        "Номера вышедшего тиража": winning_draw_numbers_str,
+                        "Прогнозная комбинация": ", ".join(map(str, ticket)),
+                        "Совпадающие номера": ", ".join(map(str, matching)),
+                        "Количество совпадений": matches
+                    })
+
+                for num_matches, count in enumerate(scan["match_counts"]):
+                    overall_match_counts[num_matches] += int(count)
+
+                if scan["match_counts"][5:].sum() > 0:
+                    threshold_5_plus_met = True
 
             except Exception as e:
                 QMessageBox.warning(self, "Ошибка загрузки/сверки файла", f"Ошибка обработки файла {os.path.basename(g_file_path)}: {str(e)}")
@@ -432,7 +374,8 @@ class CompareTab(QWidget):
         self.display_comparison_results(overall_results_data)
 
         summary_text = f"<b>Сводка результатов автоматической сверки для тиража №{last_draw_number} (генерации для тиража №{expected_draw_for_gen}):</b><br>"
-        summary_text += f"Всего проанализировано комбинаций: {all_generated_combinations_count}<br><br>"
+        summary_text += f"Всего проанализировано комбинаций: {all_generated_combinations_count}<br>"
+        summary_text += self._hits_shown_text(len(overall_results_data), hits_total)
 
         summary_text += "Совпадений (из всех сгенерированных комбинаций):<br>"
         for i in range(len(overall_match_counts) - 1, -1, -1):
@@ -454,6 +397,13 @@ class CompareTab(QWidget):
 
         QMessageBox.information(self, "Сверка завершена", "Автоматическая сверка успешно завершена.")
 
+    @staticmethod
+    def _hits_shown_text(shown_count, hits_total):
+        """Строка сводки о том, сколько билетов с 3+ совпадениями попало в таблицу (их число ограничено POOL_MAX_HITS)."""
+        if shown_count < hits_total:
+            return f"В таблице {shown_count} билетов с наибольшим числом совпадений из {hits_total} билетов с 3+ совпадениями.<br><br>"
+        return "<br>"
+
     def display_comparison_results(self, results_data):
         if not results_data:
             self.comparison_table.setRowCount(0)
@@ -0,0 +1,161 @@
+import heapq
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.combination_rank import TOTAL_COMBINATIONS, unrank_combinations
+from generate.weighted_sampler import get_number_probabilities
+from generate.glue_index import GlueIndex
+
+# Сколько рангов оценивается за один векторный проход (ограничивает память: ~6 байт и 4 байта на ранг).
+SCORE_CHUNK_SIZE = 1 << 20
+
+# До такого k лучшие между порциями отбираются кучей; при больших k — массивами и argpartition
+HEAP_TOP_K_LIMIT = 100000
+
+# Доля квоты, которой штрафуются структуры, отсутствующие в таблице квот.
+MISSING_STRUCTURE_SHARE = 1e-4
+
+# Коды частотных зон для структуры HMC: Hot -> H, Warm -> M, Cold/Sleepy -> C
+HMC_ZONE_CODES = {"Hot": 0, "Warm": 1, "Cold": 2, "Sleepy": 2}
+
+def _structure_code(counts_first, counts_second):
+    """Код распределения (a, b, 6 - a - b) -> a * 7 + b."""
+    return counts_first * 7 + counts_second
+
+
+def _merge_top_k(best_scores, best_ranks, scores, ranks, k):
+    """Объединяет кандидатов с новой порцией и оставляет k лучших (argpartition, без сортировки)."""
+    best_scores = np.concatenate([best_scores, scores])
+    best_ranks = np.concatenate([best_ranks, ranks])
+    if len(best_scores) > k:
+        keep = np.argpartition(-best_scores, k - 1)[:k]
+        best_scores, best_ranks = best_scores[keep], best_ranks[keep]
+    return best_scores, best_ranks
+
+
+def _score_chunk(task):
+    """Оценивает диапазон рангов [start, end) и возвращает top_k (оценки, ранги) этого диапазона."""
+    scorer, start, end, top_k = task
+    scores = scorer.score_ranks(start, end)
+    if len(scores) > top_k:
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        best = np.arange(len(scores))
+    return scores[best], (best + start).astype(np.uint32)
+
+
+class ExhaustiveScorer:
+    """
+    Полный перебор пространства 6 из 52 с векторной оценкой каждой комбинации:
+    сумма логарифмов вероятностей номеров (pool_stats + attention_weights.json),
+    бонусы пар, троек и якорей из glue_clusters.json (GlueIndex) и логарифм доли структуры LMH|HMC в квотах.
+    """
+
+    def __init__(self, pool_stats, attention_weights, glue_clusters=None, structure_quotas=None, excluded_numbers=()):
+        probabilities = get_number_probabilities(pool_stats, attention_weights)
+        with np.errstate(divide="ignore"):
+            self.number_scores = np.log(probabilities)
+        self.number_scores[0] = -np.inf
+        for num in excluded_numbers:
+            self.number_scores[int(num)] = -np.inf
+
+        self.glue_index = GlueIndex(glue_clusters)
+
+        self.line_zone = np.zeros(53, dtype=np.int64)
+        self.line_zone[18:35] = 1
+        self.line_zone[35:53] = 2
+        self.hmc_zone = np.full(53, 2, dtype=np.int64)
+        for num in range(1, 53):
+            self.hmc_zone[num] = HMC_ZONE_CODES.get(pool_stats.get(str(num), {}).get("zone", "Sleepy"), 2)
+
+        # structure_scores[lmh_code, hmc_code] = log(доля структуры в квотах)
+        self.structure_scores = np.zeros((49, 49), dtype=np.float64)
+        if structure_quotas:
+            total = float(sum(q for q in structure_quotas.values() if q > 0))
+            self.structure_scores[:] = np.log(MISSING_STRUCTURE_SHARE)
+            for key, quota in structure_quotas.items():
+                try:
+                    lmh_part, hmc_part = key.split("|")
+                    lmh = [int(x) for x in lmh_part.split("-")]
+                    hmc = [int(x[:-1]) for x in hmc_part.split("-")]
+                except (ValueError, AttributeError):
+                    continue
+                if quota > 0 and len(lmh) == 3 and len(hmc) == 3:
+                    self.structure_scores[_structure_code(lmh[0], lmh[1]), _structure_code(hmc[0], hmc[1])] = np.log(quota / total)
+
+    def score_combinations(self, combinations):
+        """Оценки массива комбинаций (N, 6)."""
+        combinations = np.asarray(combinations, dtype=np.intp)
+        scores = self.number_scores[combinations].sum(axis=1)
+
+        scores += self.glue_index.log_boost(combinations)
+
+        line = self.line_zone[combinations]
+        hmc = self.hmc_zone[combinations]
+        lmh_code = _structure_code((line == 0).sum(axis=1), (line == 1).sum(axis=1))
+        hmc_code = _structure_code((hmc == 0).sum(axis=1), (hmc == 1).sum(axis=1))
+        scores += self.structure_scores[lmh_code, hmc_code]
+        return scores.astype(np.float32)
+
+    def score_ranks(self, start, end):
+        """Оценки всех комбинаций с рангами [start, end)."""
+        return self.score_combinations(unrank_combinations(np.arange(start, end, dtype=np.int64)))
+
+    def top_k(self, k, workers=1, chunk_size=SCORE_CHUNK_SIZE, progress_callback=None):
+        """
+        Перебирает все C(52, 6) комбинаций порциями и возвращает k лучших:
+        (массив комбинаций (k, 6) uint8, массив оценок), по убыванию оценки.
+        Внутри порции лучшие отбираются argpartition, между порциями — кучей размера k,
+        а при k больше HEAP_TOP_K_LIMIT — тоже argpartition по массивам кандидатов.
+        k ограничивается числом всех комбинаций. progress_callback(done, total) вызывается после каждой порции.
+        """
+        k = min(int(k), TOTAL_COMBINATIONS)
+        if k <= 0:
+            return np.empty((0, 6), dtype=np.uint8), np.empty(0, dtype=np.float32)
+        if k > HEAP_TOP_K_LIMIT:
+            return self._top_k_arrays(k, workers, chunk_size, progress_callback)
+
+        tasks = [(self, start, min(start + chunk_size, TOTAL_COMBINATIONS), k)
+                 for start in range(0, TOTAL_COMBINATIONS, chunk_size)]
+        heap = []
+        executor = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+        try:
+            results = executor.map(_score_chunk, tasks) if executor is not None else map(_score_chunk, tasks)
+            for done, (scores, ranks) in enumerate(results, start=1):
+                threshold = heap[0][0] if len(heap) >= k else -np.inf
+                for score, rank in zip(scores[scores > threshold].tolist(), ranks[scores > threshold].tolist()):
+                    if len(heap) < k:
+                        heapq.heappush(heap, (score, rank))
+                    elif score > heap[0][0]:
+                        heapq.heapreplace(heap, (score, rank))
+                if progress_callback is not None:
+                    progress_callback(done, len(tasks))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        heap.sort(reverse=True)
+        best_scores = np.array([score for score, _ in heap], dtype=np.float32)
+        best_ranks = np.array([rank for _, rank in heap], dtype=np.int64)
+        return unrank_combinations(best_ranks), best_scores
+
+    def _top_k_arrays(self, k, workers, chunk_size, progress_callback):
+        """top_k для больших k: кандидаты хранятся в массивах numpy вместо кучи из объектов Python."""
+        tasks = [(self, start, min(start + chunk_size, TOTAL_COMBINATIONS), k)
+                 for start in range(0, TOTAL_COMBINATIONS, chunk_size)]
+        best_scores = np.empty(0, dtype=np.float32)
+        best_ranks = np.empty(0, dtype=np.uint32)
+        executor = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+        try:
+            results = executor.map(_score_chunk, tasks) if executor is not None else map(_score_chunk, tasks)
+            for done, (scores, ranks) in enumerate(results, start=1):
+                best_scores, best_ranks = _merge_top_k(best_scores, best_ranks, scores, ranks, k)
+                if progress_callback is not None:
+                    progress_callback(done, len(tasks))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # По убыванию оценки, при равных оценках — по убыванию ранга (как у отсортированной кучи)
+        order = np.lexsort((best_ranks, best_scores))[::-1]
+        return unrank_combinations(best_ranks[order].astype(np.int64)), best_scores[order]
@@ -7,13 +7,14 @@ import datetime
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QLabel, QSpinBox, QHBoxLayout,
     QComboBox, QLineEdit, QCheckBox, QGroupBox, QFormLayout, QMessageBox,
-    QDialog, QDialogButtonBox, QDoubleSpinBox
+    QDialog, QDialogButtonBox, QDoubleSpinBox, QApplication
 )
 from PyQt5.QtCore import Qt
 
 LABCORE_DRAWS_FILE_NAME = "labcore_draws.csv"
 CONFIG_DIR_NAME = "config"
 GENERATED_DIR_NAME = "generated"
+MAX_COMBINATIONS_PER_RUN = 100000000
 
 class GenerationSettingsDialog(QDialog):
     def __init__(self, parent=None, config_core={}, config_softpool={}, config_quotas={}, pool_stats={}):
@@ -43,10 +44,20 @@ class GenerationSettingsDialog(QDialog):
         self.psw_weight_spinbox.setValue(self.config_core.get("psw_weight", 1.0))
         settings_layout.addRow("Усиление номеров по PSW:", self.psw_weight_spinbox)
 
-        self.glue_anchor_checkbox = QCheckBox("Включить Glue/Anchor")
+        # Отбор по glue_clusters.json: кандидатов в GLUE_OVERSAMPLE_FACTOR раз больше, генерация во столько же раз медленнее
+        from generate.generator import GLUE_OVERSAMPLE_FACTOR
+        self.glue_anchor_checkbox = QCheckBox(f"Включить Glue/Anchor (медленнее, ×{GLUE_OVERSAMPLE_FACTOR} кандидатов)")
         self.glue_anchor_checkbox.setChecked(self.config_core.get("glue_anchor", False))
         settings_layout.addRow("", self.glue_anchor_checkbox)
 
+        self.structure_quotas_checkbox = QCheckBox("Генерация по структурным квотам (LMH|HMC)")
+        self.structure_quotas_checkbox.setChecked(self.config_core.get("use_structure_quotas", False))
+        settings_layout.addRow("", self.structure_quotas_checkbox)
+
+        self.weighted_sampling_checkbox = QCheckBox("Взвешенный выбор номеров (attention_weights.json)")
+        self.weighted_sampling_checkbox.setChecked(self.config_core.get("weighted_sampling", False))
+        settings_layout.addRow("", self.weighted_sampling_checkbox)
+
         self.stabilization_method_combo = QComboBox()
         self.stabilization_method_combo.addItems(["average_last_30_draws", "dynamic_adaptive"])
         self.stabilization_method_combo.setCurrentText(self.config_core.get("stabilization_method", "average_last_30_draws"))
@@ -111,6 +122,8 @@ class GenerationSettingsDialog(QDialog):
                 "boost": self.boost_spinbox.value(),
                 "psw_weight": self.psw_weight_spinbox.value(),
                 "glue_anchor": self.glue_anchor_checkbox.isChecked(),
+                "use_structure_quotas": self.structure_quotas_checkbox.isChecked(),
+                "weighted_sampling": self.weighted_sampling_checkbox.isChecked(),
                 "stabilization_method": self.stabilization_method_combo.currentText()
             },
             "softpool": {
@@ -140,6 +153,10 @@ class GenerationTab(QWidget):
         self.config_softpool = self._load_config(os.path.join(self.project_root_dir, CONFIG_DIR_NAME, "softpool_config.json"))
         self.config_quotas = self._load_config(os.path.join(self.project_root_dir, CONFIG_DIR_NAME, "quota_config.json"))
         self.pool_stats = self._load_config(os.path.join(self.project_root_dir, CONFIG_DIR_NAME, "pool_stats.json"))
+        self.attention_weights = self._load_config(os.path.join(self.project_root_dir, CONFIG_DIR_NAME, "attention_weights.json"))
+        # Ручные кластеры вместе с частыми парами и тройками, которые LABCORE-80 считает по истории
+        from generate.glue_index import load_glue_clusters
+        self.glue_clusters = load_glue_clusters(os.path.join(self.project_root_dir, CONFIG_DIR_NAME))
         
         self.draws_df = self._load_draws(os.path.join(self.project_root_dir, LABCORE_DRAWS_FILE_NAME))
 
@@ -165,7 +182,7 @@ class GenerationTab(QWidget):
 
         basic_settings_layout.addWidget(QLabel("Количество комбинаций:"))
         self.num_combinations_spinbox = QSpinBox()
-        self.num_combinations_spinbox.setRange(1, 1000)
+        self.num_combinations_spinbox.setRange(1, MAX_COMBINATIONS_PER_RUN)
         self.num_combinations_spinbox.setValue(100)
         basic_settings_layout.addWidget(self.num_combinations_spinbox)
 
@@ -185,6 +202,34 @@ class GenerationTab(QWidget):
 
         top_layout.addLayout(basic_settings_layout)
 
+        uniqueness_layout = QHBoxLayout()
+        self.unique_checkbox = QCheckBox("Только уникальные комбинации")
+        self.unique_checkbox.setChecked(False)
+        uniqueness_layout.addWidget(self.unique_checkbox)
+        self.exclude_previous_checkbox = QCheckBox("Исключить комбинации прошлых генераций для этого тиража")
+        self.exclude_previous_checkbox.setChecked(False)
+        uniqueness_layout.addWidget(self.exclude_previous_checkbox)
+        top_layout.addLayout(uniqueness_layout)
+
+        self.exhaustive_checkbox = QCheckBox("Полный перебор: лучшие комбинации по оценке вместо случайной выборки")
+        self.exhaustive_checkbox.setChecked(False)
+        top_layout.addWidget(self.exhaustive_checkbox)
+
+        self.binary_pool_checkbox = QCheckBox("Сохранять пул в бинарном формате (.lcpool) вместо CSV")
+        self.binary_pool_checkbox.setChecked(True)
+        top_layout.addWidget(self.binary_pool_checkbox)
+
+        parallel_layout = QHBoxLayout()
+        parallel_layout.addWidget(QLabel("Seed (пусто — случайный):"))
+        self.seed_edit = QLineEdit("")
+        parallel_layout.addWidget(self.seed_edit)
+        parallel_layout.addWidget(QLabel("Процессов:"))
+        self.workers_spinbox = QSpinBox()
+        self.workers_spinbox.setRange(1, os.cpu_count() or 1)
+        self.workers_spinbox.setValue(1)
+        parallel_layout.addWidget(self.workers_spinbox)
+        top_layout.addLayout(parallel_layout)
+
         self.layout().addLayout(top_layout)
         
         btn_generate = QPushButton("Сгенерировать Комбинации")
@@ -223,9 +268,10 @@ class GenerationTab(QWidget):
             return {}
 
     def _load_draws(self, filename):
+        from utils.draw_store import get_draw_store
         if os.path.exists(filename):
             try:
-                df = pd.read_csv(filename, encoding="utf-8-sig")
+                df = get_draw_store(filename).dataframe()
                 for i in range(1, 7):
                     df[f'N{i}'] = pd.to_numeric(df[f'N{i}'], errors='coerce').astype('Int64')
                 return df
@@ -237,17 +283,64 @@ class GenerationTab(QWidget):
             return pd.DataFrame()
 
     def _get_next_draw_number(self):
-        filepath = os.path.join(self.project_root_dir, LABCORE_DRAWS_FILE_NAME)
-        if os.path.exists(filepath):
+        from utils.draw_store import get_draw_store
+        try:
+            return get_draw_store(os.path.join(self.project_root_dir, LABCORE_DRAWS_FILE_NAME)).next_draw_number()
+        except Exception:
+            return 1
+
+
+    def _report_exhaustive_progress(self, done, total):
+        self.status_label.setText(f"Полный перебор... обработано порций {done} из {total}.")
+        QApplication.processEvents()
+
+    def _report_written(self, written_count, num_combinations):
+        self.status_label.setText(f"Генерация... записано {written_count} из {num_combinations} комбинаций.")
+        QApplication.processEvents()
+
+    def _write_combinations_streaming(self, batches, output_filename, num_combinations, pool_header=None):
+        """
+        Дописывает порции комбинаций в файл пула по мере генерации и показывает прогресс по каждой порции.
+        Файл .lcpool пишется в бинарном формате (utils.pool_format) с заголовком pool_header, иначе — CSV.
+        Возвращает количество записанных комбинаций.
+        """
+        from utils.pool_format import PoolWriter, is_binary_pool
+
+        written_count = 0
+        if is_binary_pool(output_filename):
+            with PoolWriter(output_filename, **(pool_header or {})) as writer:
+                for batch in batches:
+                    writer.write(batch)
+                    written_count += len(batch)
+                    self._report_written(written_count, num_combinations)
+            return written_count
+
+        columns = [f'N{i}' for i in range(1, 7)]
+        with open(output_filename, 'w', encoding="utf-8-sig", newline="") as f:
+            f.write(",".join(columns) + "\n")
+            for batch in batches:
+                pd.DataFrame(batch, columns=columns).to_csv(f, header=False, index=False, lineterminator="\n")
+                written_count += len(batch)
+                self._report_written(written_count, num_combinations)
+        return written_count
+
+    def _load_previous_pools_bitmap(self, draw_number):
+        """Собирает в битовую карту все комбинации, уже сгенерированные для тиража."""
+        from utils.combination_bitmap import CombinationBitmap
+        from utils.pool_catalog import get_pool_catalog
+        from utils.pool_format import load_pool_ranks
+
+        bitmap = CombinationBitmap()
+        generated_dir_path = os.path.join(self.project_root_dir, GENERATED_DIR_NAME)
+        if not os.path.exists(generated_dir_path):
+            return bitmap
+
+        for pool_path in get_pool_catalog(generated_dir_path).pools_for_draw(draw_number):
             try:
-                df = pd.read_csv(filepath, encoding="utf-8-sig")
-                df['Тираж'] = pd.to_numeric(df['Тираж'], errors='coerce')
-                if not df['Тираж'].empty and not pd.isna(df['Тираж'].max()):
-                    return int(df['Тираж'].max()) + 1
-            except Exception:
-                pass
-        return 1
-
+                bitmap.add(load_pool_ranks(pool_path))
+            except Exception as e:
+                QMessageBox.warning(self, "Ошибка загрузки пула", f"Не удалось прочитать {os.path.basename(pool_path)}: {e}")
+        return bitmap
 
     def open_generation_settings(self):
         dialog = GenerationSettingsDialog(
@@ -321,6 +414,13 @@ class GenerationTab(QWidget):
             self.status_label.setText("Генерация отменена: Ошибка квот.")
             return
 
+        seed_text = self.seed_edit.text().strip()
+        if seed_text and not seed_text.isdigit():
+            QMessageBox.warning(self, "Ошибка seed", "Seed должен быть неотрицательным целым числом.")
+            self.status_label.setText("Генерация отменена: Некорректный seed.")
+            return
+        seed = int(seed_text) if seed_text else None
+
         try:
             from generate.generator import LotteryGenerator
             generator = LotteryGenerator(
@@ -328,27 +428,61 @@ class GenerationTab(QWidget):
                 config_core=self.config_core,
                 config_softpool=self.config_softpool,
                 config_quotas=self.config_quotas,
-                pool_stats=self.pool_stats
+                pool_stats=self.pool_stats,
+                attention_weights=self.attention_weights,
+                glue_clusters=self.glue_clusters
             )
             
-            generated_combinations = generator.generate_combinations(num_combinations)
+            exclude_bitmap = None
+            if self.exclude_previous_checkbox.isChecked():
+                exclude_bitmap = self._load_previous_pools_bitmap(generate_for_draw_number)
 
             output_dir_path = os.path.join(self.project_root_dir, GENERATED_DIR_NAME)
             os.makedirs(output_dir_path, exist_ok=True)
             
-            base_filename = f"combinations_for_draw_{generate_for_draw_number}_{contour_label}.csv"
+            from utils.pool_format import POOL_EXTENSION, config_hash
+            extension = POOL_EXTENSION if self.binary_pool_checkbox.isChecked() else ".csv"
+            base_filename = f"combinations_for_draw_{generate_for_draw_number}_{contour_label}{extension}"
             output_filename = os.path.join(output_dir_path, base_filename)
 
             if os.path.exists(output_filename):
                 timestamp_suffix = datetime.datetime.now().strftime("_%Y%m%d_%H%M%S")
-                output_filename = os.path.join(output_dir_path, f"combinations_for_draw_{generate_for_draw_number}_{contour_label}{timestamp_suffix}.csv")
-
-
-            generated_df = pd.DataFrame(generated_combinations, columns=[f'N{i}' for i in range(1, 7)])
-            generated_df.to_csv(output_filename, index=False, encoding="utf-8-sig")
+                output_filename = os.path.join(output_dir_path, f"combinations_for_draw_{generate_for_draw_number}_{contour_label}{timestamp_suffix}{extension}")
+
+            if not self.exhaustive_checkbox.isChecked() and seed is None:
+                # Случайный seed выбирается здесь, чтобы сохранить его в заголовке пула
+                seed = random.SystemRandom().getrandbits(128)
+            pool_header = {
+                "draw": generate_for_draw_number,
+                "contour": contour_label,
+                "seed": None if self.exhaustive_checkbox.isChecked() else seed,
+                "config_hash": config_hash(self.config_core, self.config_softpool, self.config_quotas),
+            }
 
-            self.status_label.setText(f"Сгенерировано {len(generated_combinations)} комбинаций для тиража №{generate_for_draw_number} ({contour_label}). Сохранено в {os.path.basename(output_filename)}")
-            QMessageBox.information(self, "Генерация завершена", f"Успешно сгенерировано {len(generated_combinations)} комбинаций для тиража №{generate_for_draw_number} ({contour_label}).")
+            if self.exhaustive_checkbox.isChecked():
+                from utils.combination_rank import TOTAL_COMBINATIONS
+                # Полный перебор не может вернуть больше комбинаций, чем их всего
+                num_combinations = min(num_combinations, TOTAL_COMBINATIONS)
+                batches = [generator.generate_top_k(
+                    num_combinations,
+                    workers=self.workers_spinbox.value(),
+                    progress_callback=self._report_exhaustive_progress
+                )]
+            else:
+                batches = generator.iter_batches(
+                    num_combinations,
+                    unique=self.unique_checkbox.isChecked(),
+                    exclude_bitmap=exclude_bitmap,
+                    seed=seed,
+                    workers=self.workers_spinbox.value()
+                )
+            written_count = self._write_combinations_streaming(batches, output_filename, num_combinations, pool_header)
+            from utils.pool_catalog import get_pool_catalog
+            get_pool_catalog(output_dir_path).register(output_filename)
+
+            warnings_text = "".join(f"\nВнимание: {warning}" for warning in generator.warnings)
+            self.status_label.setText(f"Сгенерировано {written_count} комбинаций для тиража №{generate_for_draw_number} ({contour_label}). Сохранено в {os.path.basename(output_filename)}. Seed: {getattr(generator, 'last_seed', '—')}{warnings_text}")
+            QMessageBox.information(self, "Генерация завершена", f"Успешно сгенерировано {written_count} комбинаций для тиража №{generate_for_draw_number} ({contour_label}).{warnings_text}")
 
         except Exception as e:
             self.status_label.setText(f"Ошибка генерации: {e}")
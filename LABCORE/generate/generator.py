@@ -1,15 +1,238 @@
 import pandas as pd
 import json
-import random
 import os
+import numpy as np
+from math import comb
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.combination_rank import rank_combinations
+from utils.combination_bitmap import CombinationBitmap
+from generate.weighted_sampler import get_alias_table
+from generate.exhaustive_scorer import ExhaustiveScorer
+from generate.glue_index import GlueIndex
+
+# Размер порции, которой пакетный генератор заполняет итоговый массив.
+# Ограничивает объём временных массивов случайных ключей (порция × 52);
+# каждая порция получает свой дочерний поток SeedSequence и может считаться в отдельном процессе.
+BATCH_CHUNK_SIZE = 100000
+
+# Размер порции, которую отдаёт потоковая генерация (iter_batches): несколько порций
+# BATCH_CHUNK_SIZE, считаемых параллельно. Не зависит от числа процессов, чтобы при
+# одном seed пул был одинаковым.
+STREAM_CHUNK_SIZE = BATCH_CHUNK_SIZE * 8
+
+# Сколько раундов подряд (порций не меньше BATCH_CHUNK_SIZE) без единой новой комбинации допускается в режиме уникальности,
+# прежде чем считать, что пространство допустимых комбинаций исчерпано.
+UNIQUE_MAX_STALLED_ROUNDS = 20
+
+# Линейные зоны L/M/H для структуры LMH: 1–17, 18–34, 35–52
+LINE_ZONES = {"L": range(1, 18), "M": range(18, 35), "H": range(35, 53)}
+
+# Сколько раундов перевыборки строк с повторами делает взвешенный (alias) выбор,
+# прежде чем добрать остаток выбором без возвращения по ключам.
+ALIAS_MAX_REJECTION_ROUNDS = 50
+
+# Во сколько раз больше кандидатов генерируется при включённом Glue/Anchor:
+# из них отбирается нужное число комбинаций с вероятностью, пропорциональной glue-бонусу.
+GLUE_OVERSAMPLE_FACTOR = 4
+
+
+def _has_collisions(rows, taken):
+    combined = np.concatenate([rows, taken], axis=1)
+    combined.sort(axis=1)
+    return (combined[:, 1:] == combined[:, :-1]).any(axis=1)
+
+
+def _sample_weighted(alias, k, taken, rng):
+    """
+    Выбирает k различных номеров на строку по таблице псевдонимов alias,
+    не пересекающихся с уже выбранными номерами строки taken (n, m).
+    """
+    n = len(taken)
+    result = alias.sample(rng, (n, k))
+    pending = np.arange(n)
+    for _ in range(ALIAS_MAX_REJECTION_ROUNDS):
+        pending = pending[_has_collisions(result[pending], taken[pending])]
+        if len(pending) == 0:
+            return result
+        result[pending] = alias.sample(rng, (len(pending), k))
+
+    # Редкий остаток при сильно неравных весах — ключи Эфраимидиса–Спиракиса
+    pending = pending[_has_collisions(result[pending], taken[pending])]
+    if len(pending) > 0:
+        keys = -np.log(rng.random((len(pending), len(alias.values)))) / alias.probabilities
+        blocked = (alias.values[None, None, :] == taken[pending][:, :, None]).any(axis=1)
+        keys[blocked] = np.inf
+        idx = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        result[pending] = alias.values[idx]
+    return result
+
+
+def _sample_from_pool(pool, k, n, rng, alias=None):
+    """
+    Выбирает k различных номеров из pool для каждой из n строк.
+    С таблицей псевдонимов alias выбор взвешенный, иначе равномерный.
+    Возвращает массив (n, k) uint8.
+    """
+    if k <= 0 or n == 0:
+        return np.empty((n, 0), dtype=np.uint8)
+    if alias is not None:
+        return _sample_weighted(alias, k, np.empty((n, 0), dtype=np.uint8), rng)
+    keys = rng.random((n, len(pool)))
+    idx = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    return pool[idx]
+
+
+def _sample_batch(plan, n, rng):
+    """
+    Генерирует n комбинаций по заранее подготовленному плану (см. LotteryGenerator._build_batch_plan).
+    Возвращает отсортированный по строкам массив (n, 6) uint8.
+    """
+    available = plan["available"]
+    parts = [_sample_from_pool(pool, k, n, rng, alias) for pool, k, alias in plan["groups"]]
+    selected = np.concatenate(parts, axis=1) if parts else np.empty((n, 0), dtype=np.uint8)
+
+    remaining_count = 6 - selected.shape[1]
+    if remaining_count > 0 and plan.get("fill_alias") is not None:
+        # Взвешенный добор недостающих номеров из всех доступных
+        filled = _sample_weighted(plan["fill_alias"], remaining_count, selected, rng)
+        selected = np.concatenate([selected, filled], axis=1)
+    elif remaining_count > 0:
+        # Добор недостающих номеров из всех доступных, исключая уже выбранные в строке
+        keys = rng.random((n, len(available)))
+        if selected.shape[1] > 0:
+            rows = np.repeat(np.arange(n), selected.shape[1])
+            keys[rows, plan["positions"][selected.ravel()]] = 2.0
+        idx = np.argpartition(keys, remaining_count - 1, axis=1)[:, :remaining_count]
+        selected = np.concatenate([selected, available[idx]], axis=1)
+
+    selected.sort(axis=1)
+    return selected
+
+
+def _parse_structure_key(structure_key):
+    """
+    "3-2-1|2H-3M-1C" -> ((3, 2, 1), (2, 3, 1)): количество номеров по линейным зонам L/M/H
+    и по частотным зонам H/M/C. Возвращает None для некорректного ключа.
+    """
+    try:
+        lmh_part, hmc_part = structure_key.split("|")
+        lmh = tuple(int(x) for x in lmh_part.split("-"))
+        hmc = tuple(int(x[:-1]) for x in hmc_part.split("-"))
+    except (ValueError, AttributeError):
+        return None
+    if len(lmh) != 3 or len(hmc) != 3 or sum(lmh) != 6 or sum(hmc) != 6 or min(lmh + hmc) < 0:
+        return None
+    return lmh, hmc
+
+
+def _structure_tables(lmh, hmc):
+    """Все таблицы 3x3 неотрицательных целых с суммами строк lmh и столбцов hmc."""
+    tables = []
+    for t00 in range(min(lmh[0], hmc[0]) + 1):
+        for t01 in range(min(lmh[0] - t00, hmc[1]) + 1):
+            t02 = lmh[0] - t00 - t01
+            if t02 > hmc[2]:
+                continue
+            for t10 in range(min(lmh[1], hmc[0] - t00) + 1):
+                for t11 in range(min(lmh[1] - t10, hmc[1] - t01) + 1):
+                    t12 = lmh[1] - t10 - t11
+                    if t12 > hmc[2] - t02:
+                        continue
+                    tables.append(((t00, t01, t02),
+                                   (t10, t11, t12),
+                                   (hmc[0] - t00 - t10, hmc[1] - t01 - t11, hmc[2] - t02 - t12)))
+    return tables
+
+
+def _allocate_by_quotas(n, quotas):
+    """Делит n пропорционально quotas методом наибольших остатков."""
+    quotas = np.asarray(quotas, dtype=np.float64)
+    exact = n * quotas / quotas.sum()
+    counts = np.floor(exact).astype(np.int64)
+    shortfall = n - counts.sum()
+    if shortfall > 0:
+        counts[np.argsort(-(exact - counts), kind="stable")[:shortfall]] += 1
+    return counts
+
+
+def _sample_structured_batch(plan, n, rng):
+    """
+    Генерирует n комбинаций, распределяя их по структурам пропорционально квотам.
+    Внутри структуры строка получает одну из допустимых таблиц ячеек, и номера каждой
+    ячейки выбираются векторно — без циклов повторных попыток.
+    """
+    structures = plan["structures"]
+    counts = _allocate_by_quotas(n, [structure["quota"] for structure in structures])
+
+    parts = []
+    for structure, count in zip(structures, counts):
+        if count == 0:
+            continue
+        table_idx = rng.choice(len(structure["tables"]), size=count, p=structure["probs"])
+        for t, groups in enumerate(structure["tables"]):
+            rows = int((table_idx == t).sum())
+            if rows == 0:
+                continue
+            parts.append(np.concatenate([_sample_from_pool(pool, k, rows, rng, alias) for pool, k, alias in groups], axis=1))
+
+    selected = np.concatenate(parts, axis=0) if parts else np.empty((0, 6), dtype=np.uint8)
+    selected.sort(axis=1)
+    return selected[rng.permutation(len(selected))]
+
+
+def _select_by_glue(candidates, n, glue_index, rng):
+    """
+    Взвешенный отбор n строк из candidates без возвращения (ключи Эфраимидиса–Спиракиса):
+    вес строки — её glue-бонус, поэтому комбинации с частыми парами, тройками и якорями
+    попадают в партию чаще. Порядок отобранных строк сохраняется.
+    """
+    if len(candidates) <= n:
+        return candidates
+    keys = np.log(rng.random(len(candidates))) / glue_index.boost(candidates)
+    best = np.argpartition(-keys, n - 1)[:n]
+    return candidates[np.sort(best)]
+
+
+def _sample_block(task):
+    """Одна порция партии: (план, размер, SeedSequence) -> массив (n, 6) uint8."""
+    plan, n, seed_sequence = task
+    rng = np.random.default_rng(seed_sequence)
+    sample = _sample_structured_batch if "structures" in plan else _sample_batch
+    if "glue" in plan:
+        return _select_by_glue(sample(plan, n * GLUE_OVERSAMPLE_FACTOR, rng), n, plan["glue"], rng)
+    return sample(plan, n, rng)
+
+
+def _sample_blocks(plan, n, seed_sequence, executor=None):
+    """
+    Делит n строк на порции по BATCH_CHUNK_SIZE; порция i получает i-й дочерний поток seed_sequence.
+    Порции склеиваются в исходном порядке, поэтому результат зависит только от seed_sequence и n,
+    но не от того, сколько процессов их считало.
+    """
+    sizes = [min(BATCH_CHUNK_SIZE, n - start) for start in range(0, n, BATCH_CHUNK_SIZE)]
+    if not sizes:
+        return np.empty((0, 6), dtype=np.uint8)
+    tasks = [(plan, size, child) for size, child in zip(sizes, seed_sequence.spawn(len(sizes)))]
+    if executor is not None and len(tasks) > 1:
+        blocks = executor.map(_sample_block, tasks)
+    else:
+        blocks = map(_sample_block, tasks)
+    return np.concatenate(list(blocks), axis=0)
 
 class LotteryGenerator:
-    def __init__(self, draws_df, config_core, config_softpool, config_quotas, pool_stats):
+    def __init__(self, draws_df, config_core, config_softpool, config_quotas, pool_stats,
+                 attention_weights=None, glue_clusters=None):
         self.draws_df = draws_df
         self.config_core = config_core
         self.config_softpool = config_softpool
         self.config_quotas = config_quotas
         self.pool_stats = pool_stats
+        self.attention_weights = attention_weights or {}
+        self.glue_clusters = glue_clusters or {}
+        self.glue_index = GlueIndex(self.glue_clusters)
+        # Предупреждения последней генерации (GenerationTab показывает их в строке состояния)
+        self.warnings = []
 
         self.base_quota_matrix = {
             "2-2-2|2H-2M-2C": 20.0,
@@ -58,24 +281,7 @@ class LotteryGenerator:
                 numbers.append(int(num_str))
         return numbers
 
-    def generate_combinations(self, num_combinations):
-        generated_combinations = []
-        excluded_numbers = set(self.config_softpool.get("exclude", []))
-
-        all_available_numbers = [n for n in range(1, 53) if n not in excluded_numbers]
-        
-        if len(all_available_numbers) < 6:
-            raise ValueError("Недостаточно доступных чисел для генерации комбинаций после исключения.")
-
-        for _ in range(num_combinations):
-            combination = self._generate_single_combination(all_available_numbers)
-            generated_combinations.append(combination)
-        
-        return generated_combinations
-
-    def _generate_single_combination(self, all_available_numbers):
-        combination = []
-        
+    def _calculate_zone_targets(self):
         h_quota_percent = self.config_quotas.get("H", 0)
         m_quota_percent = self.config_quotas.get("M", 0)
         c_quota_percent = self.config_quotas.get("C", 0)
@@ -101,51 +307,222 @@ class LotteryGenerator:
                 elif num_c_target < 6:
                     num_c_target += 1
             current_total = num_h_target + num_m_target + num_c_target
-        
-        temp_combination = set()
-        
-        def safe_sample(population, k, chosen_set):
-            available = [n for n in population if n not in chosen_set]
-            if len(available) >= k:
-                return random.sample(available, k)
-            else:
-                return available
 
-        hot_pool_all = set(self.get_numbers_by_dynamic_zone("Hot")) & set(all_available_numbers)
-        warm_pool_all = set(self.get_numbers_by_dynamic_zone("Warm")) & set(all_available_numbers)
-        cold_pool_all = set(self.get_numbers_by_dynamic_zone("Cold")) & set(all_available_numbers)
-        sleepy_pool_all = set(self.get_numbers_by_dynamic_zone("Sleepy")) & set(all_available_numbers)
+        return num_h_target, num_m_target, num_c_target
 
-        h_candidates = list(hot_pool_all)
-        m_candidates = list(warm_pool_all)
-        c_candidates = list(cold_pool_all | sleepy_pool_all)
-        
-        selected_h = safe_sample(h_candidates, num_h_target, temp_combination)
-        temp_combination.update(selected_h)
-        
-        selected_m = safe_sample(m_candidates, num_m_target, temp_combination)
-        temp_combination.update(selected_m)
+    def _get_available_numbers(self):
+        excluded_numbers = set(self.config_softpool.get("exclude", []))
+        all_available_numbers = [n for n in range(1, 53) if n not in excluded_numbers]
 
-        selected_c = safe_sample(c_candidates, num_c_target, temp_combination)
-        temp_combination.update(selected_c)
+        if len(all_available_numbers) < 6:
+            raise ValueError("Недостаточно доступных чисел для генерации комбинаций после исключения.")
+        return all_available_numbers
 
-        remaining_count = 6 - len(temp_combination)
-        if remaining_count > 0:
-            remaining_available = [n for n in all_available_numbers if n not in temp_combination]
-            if len(remaining_available) >= remaining_count:
-                temp_combination.update(random.sample(remaining_available, remaining_count))
-            else:
-                temp_combination.update(remaining_available)
-        
-        combination = list(temp_combination)
-        
-        if len(combination) < 6:
-            all_possible = list(set(range(1, 53)) - excluded_numbers)
-            while len(combination) < 6:
-                chosen = random.choice(all_possible)
-                if chosen not in combination:
-                    combination.append(chosen)
-
-        combination = combination[:6]
-        combination.sort()
-        return combination
\ No newline at end of file
+    def _alias_table(self, pool, weighted):
+        if not weighted or len(pool) == 0:
+            return None
+        return get_alias_table(self.pool_stats, self.attention_weights, pool)
+
+    def _build_batch_plan(self, all_available_numbers, weighted=False):
+        """
+        Один раз на партию собирает пулы зон и целевые квоты H/M/C.
+        Зоны, которым не хватает номеров, берут сколько есть — остаток добирается из всех доступных.
+        weighted=True добавляет к пулам таблицы псевдонимов по весам attention_weights.json.
+        """
+        num_h_target, num_m_target, num_c_target = self._calculate_zone_targets()
+        available_set = set(all_available_numbers)
+
+        hot_pool_all = set(self.get_numbers_by_dynamic_zone("Hot")) & available_set
+        warm_pool_all = set(self.get_numbers_by_dynamic_zone("Warm")) & available_set
+        cold_pool_all = set(self.get_numbers_by_dynamic_zone("Cold")) & available_set
+        sleepy_pool_all = set(self.get_numbers_by_dynamic_zone("Sleepy")) & available_set
+
+        groups = []
+        for pool_set, target in ((hot_pool_all, num_h_target),
+                                 (warm_pool_all, num_m_target),
+                                 (cold_pool_all | sleepy_pool_all, num_c_target)):
+            pool = np.array(sorted(pool_set), dtype=np.uint8)
+            groups.append((pool, min(target, len(pool)), self._alias_table(pool, weighted)))
+
+        available = np.array(all_available_numbers, dtype=np.uint8)
+        positions = np.zeros(53, dtype=np.intp)
+        positions[available] = np.arange(len(available))
+
+        return {"available": available, "positions": positions, "groups": groups,
+                "fill_alias": self._alias_table(available, weighted)}
+
+    def _build_structure_plan(self, all_available_numbers, weighted=False):
+        """
+        План генерации по структурным квотам LMH|HMC (core_settings.structure_quotas,
+        при их отсутствии — base_quota_matrix).
+        Ячейки L/M/H × Hot/Warm/Cold собираются один раз; для каждой структуры перечисляются
+        допустимые таблицы распределения номеров по ячейкам с весом, равным числу билетов,
+        которые она допускает. Невыполнимые при текущих зонах структуры отбрасываются; если не выполнима
+        ни одна (например, все номера в одной зоне), квоты применяются только по линейным зонам L/M/H.
+        """
+        available_set = set(all_available_numbers)
+        frequency_zones = (
+            set(self.get_numbers_by_dynamic_zone("Hot")),
+            set(self.get_numbers_by_dynamic_zone("Warm")),
+            set(self.get_numbers_by_dynamic_zone("Cold")) | set(self.get_numbers_by_dynamic_zone("Sleepy")),
+        )
+        structure_quotas = self.config_core.get("structure_quotas") or self.base_quota_matrix
+        structures = self._structure_candidates(structure_quotas, available_set, frequency_zones, weighted)
+
+        if not structures:
+            self.warnings.append("Ни одна структура из квот не выполнима при текущих зонах pool_stats: "
+                                 "квоты применены только по линейным зонам L/M/H, без зон Hot/Warm/Cold.")
+            structures = self._structure_candidates(structure_quotas, available_set, frequency_zones, weighted,
+                                                    line_zones_only=True)
+        if not structures:
+            raise ValueError("Ни одна структура из квот не выполнима даже по линейным зонам L/M/H.")
+        return {"structures": structures}
+
+    def _structure_candidates(self, structure_quotas, available_set, frequency_zones, weighted, line_zones_only=False):
+        """
+        Выполнимые структуры квот с таблицами ячеек. line_zones_only=True не учитывает зоны Hot/Warm/Cold:
+        все доступные номера считаются одной зоной, квоты структур с одинаковой частью LMH складываются.
+        """
+        if line_zones_only:
+            frequency_zones = (available_set, set(), set())
+        cells = [[np.array(sorted(set(line_zone) & zone & available_set), dtype=np.uint8)
+                  for zone in frequency_zones]
+                 for line_zone in LINE_ZONES.values()]
+
+        parsed_quotas = {}
+        for structure_key, quota in structure_quotas.items():
+            parsed = _parse_structure_key(structure_key)
+            if parsed is None or quota <= 0:
+                if not line_zones_only:
+                    self.warnings.append(f"Пропущена структура '{structure_key}' (некорректный ключ или нулевая квота).")
+                continue
+            if line_zones_only:
+                lmh = parsed[0]
+                parsed, structure_key = (lmh, (6, 0, 0)), "-".join(map(str, lmh))
+            previous = parsed_quotas.get(structure_key)
+            parsed_quotas[structure_key] = (parsed, float(quota) + (previous[1] if previous else 0.0))
+
+        structures, infeasible = [], []
+        for structure_key, (parsed, quota) in parsed_quotas.items():
+            tables, weights = [], []
+            for table in _structure_tables(*parsed):
+                weight = 1
+                for r in range(3):
+                    for c in range(3):
+                        weight *= comb(len(cells[r][c]), table[r][c])
+                if weight > 0:
+                    tables.append([(cells[r][c], table[r][c], self._alias_table(cells[r][c], weighted))
+                                   for r in range(3) for c in range(3) if table[r][c] > 0])
+                    weights.append(weight)
+
+            if not tables:
+                infeasible.append(structure_key)
+                continue
+            weights = np.array(weights, dtype=np.float64)
+            structures.append({"key": structure_key, "quota": quota, "tables": tables, "probs": weights / weights.sum()})
+        if structures and infeasible:
+            self.warnings.append(f"Структуры невыполнимы при текущих зонах и пропущены: {', '.join(infeasible)}.")
+        return structures
+
+    def iter_batches(self, num_combinations, unique=False, exclude_bitmap=None,
+                     use_structure_quotas=None, weighted=None, glue_anchor=None, seed=None, workers=1):
+        """
+        Потоковая генерация: отдаёт порции до STREAM_CHUNK_SIZE комбинаций (массивы (n, 6) uint8),
+        пока в сумме не наберётся num_combinations. В памяти одновременно держится одна порция,
+        поэтому размер пула ограничен только местом на диске.
+
+        unique=True гарантирует отсутствие повторов внутри партии.
+        exclude_bitmap (CombinationBitmap) — уже выданные комбинации (например, прошлые пулы
+        этого тиража); они не повторяются, а новые комбинации дописываются в эту же карту.
+        use_structure_quotas=True распределяет партию по структурам LMH|HMC; по умолчанию
+        берётся флаг core_settings.use_structure_quotas.
+        weighted=True выбирает номера внутри зон по весам attention_weights.json
+        (по умолчанию — флаг core_settings.weighted_sampling).
+        glue_anchor=True отдаёт предпочтение комбинациям с парами, тройками и якорями
+        из glue_clusters.json (по умолчанию — флаг core_settings.glue_anchor).
+        seed задаёт воспроизводимый пул: при одном seed результат одинаков при любом workers.
+        Использованный seed сохраняется в self.last_seed.
+        workers > 1 распределяет порции партии по пулу процессов.
+        """
+        self.warnings = []
+        if use_structure_quotas is None:
+            use_structure_quotas = self.config_core.get("use_structure_quotas", False)
+        if weighted is None:
+            weighted = self.config_core.get("weighted_sampling", False)
+        if use_structure_quotas:
+            plan = self._build_structure_plan(self._get_available_numbers(), weighted)
+        else:
+            plan = self._build_batch_plan(self._get_available_numbers(), weighted)
+        if glue_anchor is None:
+            glue_anchor = self.config_core.get("glue_anchor", False)
+        if glue_anchor and not self.glue_index.is_empty():
+            plan["glue"] = self.glue_index
+
+        seed_sequence = np.random.SeedSequence(seed)
+        self.last_seed = seed_sequence.entropy
+
+        bitmap = None
+        if unique or exclude_bitmap is not None:
+            bitmap = exclude_bitmap if exclude_bitmap is not None else CombinationBitmap()
+
+        executor = None
+        if workers and workers > 1 and num_combinations > BATCH_CHUNK_SIZE:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            produced = 0
+            stalled_rounds = 0
+            while produced < num_combinations:
+                need = num_combinations - produced
+                # С картой уникальности порция не меньше BATCH_CHUNK_SIZE: к концу партии новых
+                # комбинаций мало, и выборка из need строк давала ложное «исчерпано»
+                size = min(max(need, BATCH_CHUNK_SIZE), STREAM_CHUNK_SIZE) if bitmap is not None else min(need, STREAM_CHUNK_SIZE)
+                # Каждая порция берёт следующие дочерние потоки того же seed_sequence
+                chunk = _sample_blocks(plan, size, seed_sequence, executor)
+
+                if bitmap is not None:
+                    ranks = rank_combinations(chunk)
+                    new_idx = np.flatnonzero(bitmap.new_mask(ranks))[:need]
+                    if len(new_idx) == 0:
+                        stalled_rounds += 1
+                        if stalled_rounds >= UNIQUE_MAX_STALLED_ROUNDS:
+                            raise ValueError(f"Не удалось получить {num_combinations} уникальных комбинаций: "
+                                             f"получено {produced}, допустимые комбинации исчерпаны.")
+                        continue
+                    stalled_rounds = 0
+                    bitmap.add(ranks[new_idx])
+                    chunk = chunk[new_idx]
+
+                produced += len(chunk)
+                yield chunk
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def generate_batch(self, num_combinations, **kwargs):
+        """
+        Пакетная генерация: возвращает массив (num_combinations, 6) uint8,
+        каждая строка — отсортированная комбинация. Параметры — как у iter_batches.
+        """
+        chunks = list(self.iter_batches(num_combinations, **kwargs))
+        if not chunks:
+            return np.empty((0, 6), dtype=np.uint8)
+        return np.concatenate(chunks, axis=0)
+
+    def generate_top_k(self, k, workers=1, progress_callback=None):
+        """
+        Режим полного перебора: оценивает все комбинации 6 из 52 (веса номеров, glue-пары и тройки,
+        структурные квоты) и возвращает k лучших как массив (k, 6) uint8.
+        """
+        scorer = ExhaustiveScorer(
+            self.pool_stats,
+            self.attention_weights,
+            glue_clusters=self.glue_clusters,
+            structure_quotas=self.config_core.get("structure_quotas") or self.base_quota_matrix,
+            excluded_numbers=self.config_softpool.get("exclude", [])
+        )
+        combinations, _ = scorer.top_k(k, workers=workers, progress_callback=progress_callback)
+        return combinations
+
+    def generate_combinations(self, num_combinations, unique=False, exclude_bitmap=None, seed=None, workers=1):
+        return self.generate_batch(num_combinations, unique=unique, exclude_bitmap=exclude_bitmap,
+                                   seed=seed, workers=workers).tolist()
@@ -0,0 +1,137 @@
+import os
+from itertools import combinations as iter_combinations
+
+import numpy as np
+
+from utils.json_utils import load_json_config
+
+# Ручной файл кластеров и файл частых пар/троек, которые LABCORE-80 пересчитывает по истории
+GLUE_CLUSTERS_FILE_NAME = "glue_clusters.json"
+GLUE_CLUSTERS_AUTO_FILE_NAME = "glue_clusters_auto.json"
+
+# Сколько номеров шаблона якоря должно быть в билете, чтобы он получил бонус якоря.
+ANCHOR_MIN_HITS = 2
+
+# Все 15 пар и 20 троек позиций внутри отсортированной комбинации из 6 номеров
+PAIR_POSITIONS = list(iter_combinations(range(6), 2))
+TRIPLET_POSITIONS = list(iter_combinations(range(6), 3))
+
+
+def triplet_code(a, b, c):
+    """Код отсортированной тройки номеров a < b < c в одном целом."""
+    return (a * 53 + b) * 53 + c
+
+
+def triplet_from_code(code):
+    """Обратное преобразование кода тройки в (a, b, c)."""
+    return code // 2809, code // 53 % 53, code % 53
+
+
+def merge_glue_clusters(glue_clusters, auto_clusters):
+    """
+    Ручные кластеры, дополненные расчётными частыми парами и тройками (без повторов).
+    anchor_patterns, glue_boost_factor и прочие ключи — только из ручного файла.
+    """
+    merged = dict(glue_clusters or {})
+    for key, size in (("frequent_pairs", 2), ("frequent_triplets", 3)):
+        items = [list(item) for item in merged.get(key, [])]
+        known = {tuple(sorted(int(x) for x in item)) for item in items}
+        for item in (auto_clusters or {}).get(key, []):
+            item_key = tuple(sorted(int(x) for x in item))
+            if len(item_key) == size and item_key not in known:
+                known.add(item_key)
+                items.append(list(item_key))
+        merged[key] = items
+    return merged
+
+
+def load_glue_clusters(config_dir):
+    """glue_clusters.json вместе с расчётными парами и тройками из glue_clusters_auto.json."""
+    return merge_glue_clusters(load_json_config(os.path.join(config_dir, GLUE_CLUSTERS_FILE_NAME)),
+                               load_json_config(os.path.join(config_dir, GLUE_CLUSTERS_AUTO_FILE_NAME)))
+
+
+class GlueIndex:
+    """
+    Индекс совместных появлений из glue_clusters.json, строится один раз:
+    матрица 53x53 частых пар, разреженная таблица троек (отсортированные коды)
+    и таблица принадлежности номеров шаблонам якорей.
+    Совпадения всей партии считаются табличными выборками, бонус — log(glue_boost_factor) за совпадение.
+    """
+
+    def __init__(self, glue_clusters):
+        glue_clusters = glue_clusters or {}
+        self.log_factor = float(np.log(max(float(glue_clusters.get("glue_boost_factor", 1.0)), 1.0)))
+
+        self.pair_members = np.zeros((53, 53), dtype=np.int8)
+        for pair in glue_clusters.get("frequent_pairs", []):
+            a, b = int(pair[0]), int(pair[1])
+            if a != b and 1 <= a <= 52 and 1 <= b <= 52:
+                self.pair_members[a, b] = self.pair_members[b, a] = 1
+
+        codes = set()
+        for triplet in glue_clusters.get("frequent_triplets", []):
+            a, b, c = sorted(int(x) for x in triplet)
+            if 1 <= a < b < c <= 52:
+                codes.add(triplet_code(a, b, c))
+        self.triplet_codes = np.array(sorted(codes), dtype=np.int64)
+        # Номера, входящие хотя бы в одну тройку: билет без трёх таких номеров тройку не содержит
+        self.triplet_numbers = np.zeros(53, dtype=np.int8)
+        for code in self.triplet_codes.tolist():
+            self.triplet_numbers[list(triplet_from_code(code))] = 1
+
+        anchors = [pattern for pattern in glue_clusters.get("anchor_patterns", {}).values()
+                   if len(pattern) >= ANCHOR_MIN_HITS]
+        self.anchor_members = np.zeros((len(anchors), 53), dtype=np.int8)
+        for i, pattern in enumerate(anchors):
+            for num in pattern:
+                if 1 <= int(num) <= 52:
+                    self.anchor_members[i, int(num)] = 1
+
+    def is_empty(self):
+        return self.log_factor == 0 or (not self.pair_members.any() and len(self.triplet_codes) == 0
+                                        and len(self.anchor_members) == 0)
+
+    def pair_matches(self, combinations):
+        """Сколько частых пар содержит каждая комбинация массива (N, 6)."""
+        combinations = np.asarray(combinations, dtype=np.intp)
+        matches = np.zeros(len(combinations), dtype=np.int32)
+        for i, j in PAIR_POSITIONS:
+            matches += self.pair_members[combinations[:, i], combinations[:, j]]
+        return matches
+
+    def triplet_matches(self, combinations):
+        """Сколько частых троек содержит каждая комбинация (строки должны быть отсортированы)."""
+        combinations = np.asarray(combinations, dtype=np.int64)
+        matches = np.zeros(len(combinations), dtype=np.int32)
+        if len(self.triplet_codes) == 0:
+            return matches
+        rows = np.flatnonzero(self.triplet_numbers[combinations].sum(axis=1) >= 3)
+        candidates = combinations[rows]
+        for i, j, k in TRIPLET_POSITIONS:
+            codes = triplet_code(candidates[:, i], candidates[:, j], candidates[:, k])
+            pos = np.minimum(np.searchsorted(self.triplet_codes, codes), len(self.triplet_codes) - 1)
+            matches[rows] += self.triplet_codes[pos] == codes
+        return matches
+
+    def anchor_matches(self, combinations):
+        """Сколько шаблонов якорей представлено в комбинации не менее чем ANCHOR_MIN_HITS номерами."""
+        combinations = np.asarray(combinations, dtype=np.intp)
+        if len(self.anchor_members) == 0:
+            return np.zeros(len(combinations), dtype=np.int32)
+        # hits[p, r] — сколько номеров шаблона p в билете r
+        hits = self.anchor_members[:, combinations].sum(axis=2)
+        return (hits >= ANCHOR_MIN_HITS).sum(axis=0).astype(np.int32)
+
+    def log_boost(self, combinations):
+        """Логарифм glue-бонуса каждой комбинации массива (N, 6): каждая пара, тройка и якорь — log(glue_boost_factor)."""
+        combinations = np.sort(np.asarray(combinations, dtype=np.int64), axis=1)
+        if self.log_factor == 0:
+            return np.zeros(len(combinations), dtype=np.float64)
+        matches = (self.pair_matches(combinations) + self.triplet_matches(combinations)
+                   + self.anchor_matches(combinations))
+        return matches * self.log_factor
+
+    def boost(self, combinations):
+        """Мультипликативный glue-бонус (1.0 — без бонуса)."""
+        return np.exp(self.log_boost(combinations))
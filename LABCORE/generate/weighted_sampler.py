@@ -0,0 +1,120 @@
+import json
+import hashlib
+import numpy as np
+
+# Признаки pool_stats и направление их влияния на вес номера:
+# +1 — чем больше значение, тем выше вес; -1 — чем меньше, тем выше.
+SCORE_FEATURES = (
+    ("frequency", "frequency_weight", 1),
+    ("last_seen", "last_seen_weight", 1),
+    ("avg_interval", "avg_interval_weight", -1),
+    ("std_interval", "std_interval_weight", -1),
+    ("psw", "psw_weight_final", 1),
+    ("transition", "transition_weight", 1),
+)
+
+# Минимальная доля среднего веса, которую получает любой номер,
+# чтобы ни один допустимый номер не выпадал из выборки полностью.
+MIN_WEIGHT_SHARE = 0.05
+
+# Кеш последнего расчёта: ключ — хеш содержимого pool_stats и весов внимания.
+_cache = {"key": None, "probabilities": None, "alias_tables": {}}
+
+
+class AliasTable:
+    """
+    Таблица псевдонимов Уолкера (вариант Воуза) для дискретного распределения.
+    Построение — O(n), каждая выборка — O(1): одно случайное число на ячейку и одно на порог.
+    """
+
+    def __init__(self, values, weights):
+        self.values = np.asarray(values)
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(self.values) == 0 or weights.sum() <= 0:
+            raise ValueError("Таблица псевдонимов требует хотя бы один номер с положительным весом.")
+        self.probabilities = weights / weights.sum()
+
+        n = len(weights)
+        scaled = self.probabilities * n
+        self.threshold = np.ones(n, dtype=np.float64)
+        self.alias = np.arange(n, dtype=np.intp)
+
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.threshold[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+    def sample(self, rng, size):
+        cells = rng.integers(0, len(self.threshold), size=size)
+        use_alias = rng.random(size) >= self.threshold[cells]
+        return self.values[np.where(use_alias, self.alias[cells], cells)]
+
+
+def _normalize(values):
+    span = values.max() - values.min()
+    if span == 0:
+        return np.full_like(values, 0.5)
+    return (values - values.min()) / span
+
+
+def compute_number_probabilities(pool_stats, attention_weights):
+    """
+    Переводит pool_stats и веса attention_weights.json в вероятности номеров.
+    Возвращает массив длины 53 (индекс — номер, элемент 0 всегда 0).
+    """
+    numbers = range(1, 53)
+    score = np.zeros(52, dtype=np.float64)
+    for stat_name, weight_name, direction in SCORE_FEATURES:
+        weight = attention_weights.get(weight_name, 0.0)
+        if not weight:
+            continue
+        values = np.array([float(pool_stats.get(str(n), {}).get(stat_name, 0.0) or 0.0) for n in numbers])
+        normalized = _normalize(values)
+        score += weight * (normalized if direction > 0 else 1.0 - normalized)
+
+    zone_priority = attention_weights.get("zone_priority", {})
+    zone_factor = np.array([zone_priority.get(pool_stats.get(str(n), {}).get("zone", "Sleepy"), 1.0) for n in numbers])
+    score *= zone_factor
+
+    if score.sum() <= 0:
+        score = np.ones(52)
+    score = np.maximum(score, MIN_WEIGHT_SHARE * score.mean())
+
+    probabilities = np.zeros(53, dtype=np.float64)
+    probabilities[1:] = score / score.sum()
+    return probabilities
+
+
+def _cache_key(pool_stats, attention_weights):
+    payload = json.dumps([pool_stats, attention_weights], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def get_number_probabilities(pool_stats, attention_weights):
+    """Вероятности номеров с кешем: пересчёт только при изменении pool_stats или весов."""
+    key = _cache_key(pool_stats, attention_weights)
+    if _cache["key"] != key:
+        _cache["key"] = key
+        _cache["probabilities"] = compute_number_probabilities(pool_stats, attention_weights)
+        _cache["alias_tables"] = {}
+    return _cache["probabilities"]
+
+
+def get_alias_table(pool_stats, attention_weights, pool):
+    """Таблица псевдонимов для подмножества номеров pool (зона, ячейка структуры и т.п.), из кеша."""
+    probabilities = get_number_probabilities(pool_stats, attention_weights)
+    pool = np.asarray(pool, dtype=np.uint8)
+    pool_key = pool.tobytes()
+    table = _cache["alias_tables"].get(pool_key)
+    if table is None:
+        table = AliasTable(pool, probabilities[pool])
+        _cache["alias_tables"][pool_key] = table
+    return table
@@ -8,7 +8,12 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 import datetime
 
+from utils.draw_store import get_draw_store
+from utils.draw_import import clean_draws, import_draws_csv, save_rejection_report
+from labcore.stats_calculator import StatsCalculator
+
 LABCORE_DRAWS_FILE = "labcore_draws.csv"
+REPORTS_DIR = "reports"
 
 class DrawsTab(QWidget):
     def __init__(self):
@@ -44,59 +49,26 @@ class DrawsTab(QWidget):
         path, _ = QFileDialog.getOpenFileName(self, "Выбрать CSV", "", "CSV Files (*.csv)")
         if path:
             try:
-                df = pd.read_csv(path, encoding="utf-8-sig")
-                df = self.clean_dataframe(df)
-                df.to_csv(LABCORE_DRAWS_FILE, index=False, encoding="utf-8-sig")
+                df, rejected = import_draws_csv(path)
+                if df.empty:
+                    QMessageBox.warning(self, "Ошибка", f"В файле нет корректных тиражей (отклонено строк: {len(rejected)}).")
+                    return
+                get_draw_store(LABCORE_DRAWS_FILE).replace_draws(df)
                 self.load_local_draws()
+                if not rejected.empty:
+                    report_path = save_rejection_report(rejected, os.path.join(
+                        REPORTS_DIR, f"import_rejected_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"))
+                    QMessageBox.information(self, "Импорт тиражей",
+                                            f"Загружено тиражей: {len(df)}. Отклонено строк: {len(rejected)}.\n"
+                                            f"Отчёт: {report_path}")
             except Exception as e:
                 QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить файл: {str(e)}")
 
-    def clean_dataframe(self, df):
-        column_mapping = {
-            "тираж": "Тираж", "розіграш": "Тираж",
-            "дата": "Дата",
-            "комплект": "Комплект",
-            "n1": "N1", "кулька 1": "N1", "шар 1": "N1",
-            "n2": "N2", "кулька 2": "N2", "шар 2": "N2",
-            "n3": "N3", "кулька 3": "N3", "шар 3": "N3",
-            "n4": "N4", "кулька 4": "N4", "шар 4": "N4",
-            "n5": "N5", "кулька 5": "N5", "шар 5": "N5",
-            "n6": "N6", "кулька 6": "N6", "шар 6": "N6"
-        }
-
-        df.columns = [col.lower() for col in df.columns]
-
-        df_cleaned = pd.DataFrame()
-        for target_col in ["Тираж", "Дата", "Комплект", "N1", "N2", "N3", "N4", "N5", "N6"]:
-            found_col_name = None
-            for original_col_name, mapped_col_name in column_mapping.items():
-                if mapped_col_name == target_col:
-                    if original_col_name in df.columns:
-                        found_col_name = original_col_name
-                        break
-            
-            if found_col_name:
-                df_cleaned[target_col] = df[found_col_name]
-            else:
-                df_cleaned[target_col] = pd.NA
-
-        if "Тираж" in df_cleaned.columns:
-            df_cleaned["Тираж"] = pd.to_numeric(df_cleaned["Тираж"], errors='coerce').astype('Int64')
-        
-        for col in ["Дата", "Комплект"]:
-            if col in df_cleaned.columns:
-                df_cleaned[col] = df_cleaned[col].fillna("").astype(str)
-
-        if "Тираж" in df_cleaned.columns:
-            df_cleaned.drop_duplicates(subset=["Тираж"], keep="last", inplace=True)
-            df_cleaned.sort_values(by="Тираж", ascending=False, inplace=True)
-
-        return df_cleaned
-
     def load_local_draws(self):
         if os.path.exists(LABCORE_DRAWS_FILE):
-            df = pd.read_csv(LABCORE_DRAWS_FILE, encoding="utf-8-sig")
-            df = self.clean_dataframe(df)
+            df, rejected = clean_draws(get_draw_store(LABCORE_DRAWS_FILE).dataframe())
+            if not rejected.empty:
+                print(f"DrawsTab: В {LABCORE_DRAWS_FILE} пропущено некорректных строк: {len(rejected)}.")
             
             display_cols = ["Тираж", "N1", "N2", "N3", "N4", "N5", "N6"]
             display_df = df[[col for col in display_cols if col in df.columns]].copy()
@@ -128,15 +100,10 @@ class DrawsTab(QWidget):
         self.table.resizeColumnsToContents()
 
     def get_next_draw_number(self):
-        if os.path.exists(LABCORE_DRAWS_FILE):
-            try:
-                df = pd.read_csv(LABCORE_DRAWS_FILE, encoding="utf-8-sig")
-                df['Тираж'] = pd.to_numeric(df['Тираж'], errors='coerce')
-                if not df.empty and not pd.isna(df['Тираж'].max()):
-                    return int(df['Тираж'].max()) + 1
-            except Exception:
-                return 1
-        return 1
+        try:
+            return get_draw_store(LABCORE_DRAWS_FILE).next_draw_number()
+        except Exception:
+            return 1
 
     def open_add_draw_dialog(self):
         dialog = QDialog(self)
@@ -187,36 +154,25 @@ class DrawsTab(QWidget):
         numbers.sort()
 
         try:
-            if os.path.exists(LABCORE_DRAWS_FILE):
-                df = pd.read_csv(LABCORE_DRAWS_FILE, encoding="utf-8-sig")
-            else:
-                df = pd.DataFrame(columns=["Тираж", "Дата", "Комплект", "N1", "N2", "N3", "N4", "N5", "N6"])
-            
-            df['Тираж'] = pd.to_numeric(df['Тираж'], errors='coerce').astype('Int64')
-
-            if draw_number in df['Тираж'].dropna().values:
+            draw_store = get_draw_store(LABCORE_DRAWS_FILE)
+            if draw_store.contains(draw_number):
                 QMessageBox.warning(self, "Ошибка", f"Тираж №{draw_number} уже существует. Введите другой номер или измените существующий тираж.")
                 return
 
-            new_row_data = {
-                "Тираж": draw_number,
-                "Дата": datetime.datetime.now().strftime("%Y-%m-%d"),
-                "Комплект": "",
-                "N1": numbers[0],
-                "N2": numbers[1],
-                "N3": numbers[2],
-                "N4": numbers[3],
-                "N5": numbers[4],
-                "N6": numbers[5]
-            }
-            new_draw_df = pd.DataFrame([new_row_data])
-
-            df = pd.concat([df, new_draw_df], ignore_index=True)
-            
-            df.to_csv(LABCORE_DRAWS_FILE, index=False, encoding="utf-8-sig")
-            
+            previous_draw = draw_store.last_draw_number()
+            draw_store.append_draw(draw_number, numbers)
+            self._push_draw_to_statistics(draw_number, numbers, previous_draw)
+
             self.load_local_draws()
             QMessageBox.information(self, "Успех", f"Тираж №{draw_number} успешно добавлен и сохранен.")
 
         except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Не удалось добавить тираж: {str(e)}")
\ No newline at end of file
+            QMessageBox.warning(self, "Ошибка", f"Не удалось добавить тираж: {str(e)}")
+
+    def _push_draw_to_statistics(self, draw_number, numbers, previous_draw):
+        """Передаёт новый тираж инкрементальной статистике pool_stats (без пересчёта всей истории)."""
+        project_root_dir = os.path.dirname(os.path.abspath(LABCORE_DRAWS_FILE))
+        try:
+            StatsCalculator(project_root_dir).add_draw(draw_number, numbers, previous_draw)
+        except Exception as e:
+            print(f"DrawsTab: Не удалось обновить pool_stats после тиража №{draw_number}: {e}")
@@ -0,0 +1,175 @@
+import os
+import numpy as np
+import pandas as pd
+
+from generate.glue_index import (PAIR_POSITIONS, TRIPLET_POSITIONS, GLUE_CLUSTERS_AUTO_FILE_NAME,
+                                 triplet_code, triplet_from_code)
+from utils.draw_store import get_draw_store
+from utils.json_utils import load_json_config, save_json_config
+
+CONFIG_DIR = "config"
+LABCORE_DRAWS_FILE = "labcore_draws.csv"
+
+# Скользящие окна анализа (None — вся история)
+WINDOWS = (30, 50, 100, None)
+
+# Параметры расчёта glue_clusters_auto.json (ручной glue_clusters.json не меняется)
+GLUE_WINDOW = 100
+GLUE_TOP_PAIRS = 10
+GLUE_TOP_TRIPLETS = 10
+GLUE_MIN_TRIPLET_COUNT = 2
+
+# Начальная ёмкость сверх текущей истории (дальше удваивается при добавлении тиражей)
+INITIAL_SPARE_ROWS = 64
+
+
+class CoOccurrenceEngine:
+    """
+    Совместные выпадения номеров по истории тиражей:
+    полная матрица пар 53x53 (строка и столбец 0 не используются) и разреженная таблица троек.
+    Для каждого тиража хранится строка выпадений и 20 кодов его троек, поэтому любое окно
+    считается по срезу за миллисекунды, а счётчики всей истории обновляются с каждым тиражом.
+    """
+
+    def __init__(self, draw_numbers=(), numbers=()):
+        draw_numbers = np.asarray(draw_numbers, dtype=np.int64).reshape(-1)
+        numbers = np.sort(np.asarray(numbers, dtype=np.int64).reshape(-1, 6), axis=1)
+        order = np.argsort(draw_numbers, kind="stable")
+        draw_numbers, numbers = draw_numbers[order], numbers[order]
+
+        self.size = len(draw_numbers)
+        capacity = self.size + INITIAL_SPARE_ROWS
+        self._draw_numbers = np.zeros(capacity, dtype=np.int64)
+        self._draw_numbers[:self.size] = draw_numbers
+        self._hits = np.zeros((capacity, 53), dtype=np.float32)
+        self._hits[np.arange(self.size)[:, None], numbers] = 1
+        self._triplet_codes = np.zeros((capacity, len(TRIPLET_POSITIONS)), dtype=np.int32)
+        self._triplet_codes[:self.size] = self._draw_triplet_codes(numbers)
+
+        self.pair_counts_all = self.pair_counts()
+        self._triplet_counts_all = None
+
+    @classmethod
+    def from_dataframe(cls, draws_df):
+        """Из DataFrame с колонками Тираж, N1..N6 (строки с пропусками отбрасываются)."""
+        columns = ['Тираж'] + [f'N{i}' for i in range(1, 7)]
+        df = draws_df[columns].apply(pd.to_numeric, errors='coerce').dropna().astype(int)
+        df = df.drop_duplicates('Тираж', keep='last')
+        return cls(df['Тираж'].to_numpy(), df[columns[1:]].to_numpy())
+
+    @classmethod
+    def from_csv(cls, project_root_dir):
+        """Общий для процесса экземпляр по labcore_draws.csv: новые тиражи DrawStore передаёт ему через append."""
+        return get_draw_store(os.path.join(project_root_dir, LABCORE_DRAWS_FILE)).derived(cls)
+
+    @staticmethod
+    def _draw_triplet_codes(numbers):
+        """Коды всех 20 троек каждого тиража (номера в строке отсортированы)."""
+        return np.stack([triplet_code(numbers[:, i], numbers[:, j], numbers[:, k])
+                         for i, j, k in TRIPLET_POSITIONS], axis=1).astype(np.int32)
+
+    def __len__(self):
+        return self.size
+
+    def _window_rows(self, window):
+        return slice(0 if window is None else max(self.size - window, 0), self.size)
+
+    def append(self, draw_number, numbers):
+        """Добавляет новый тираж: O(52) для матрицы пар всей истории."""
+        draw_number = int(draw_number)
+        if self.size and draw_number <= self._draw_numbers[self.size - 1]:
+            raise ValueError(f"Тираж №{draw_number} не новее последнего тиража №{self._draw_numbers[self.size - 1]}.")
+        if self.size == len(self._draw_numbers):
+            capacity = max(2 * len(self._draw_numbers), INITIAL_SPARE_ROWS)
+            self._draw_numbers = np.resize(self._draw_numbers, capacity)
+            hits = np.zeros((capacity, 53), dtype=np.float32)
+            hits[:self.size] = self._hits[:self.size]
+            self._hits = hits
+            codes = np.zeros((capacity, len(TRIPLET_POSITIONS)), dtype=np.int32)
+            codes[:self.size] = self._triplet_codes[:self.size]
+            self._triplet_codes = codes
+
+        numbers = np.sort(np.asarray(list(numbers), dtype=np.int64)).reshape(1, 6)
+        self._draw_numbers[self.size] = draw_number
+        self._hits[self.size, numbers[0]] = 1
+        self._triplet_codes[self.size] = self._draw_triplet_codes(numbers)[0]
+        for i, j in PAIR_POSITIONS:
+            a, b = numbers[0, i], numbers[0, j]
+            self.pair_counts_all[a, b] += 1
+            self.pair_counts_all[b, a] += 1
+        self._triplet_counts_all = None
+        self.size += 1
+
+    def pair_counts(self, window=None):
+        """
+        Матрица совместных выпадений пар 53x53 за последние window тиражей (None — вся история).
+        Диагональ обнулена.
+        """
+        hits = self._hits[self._window_rows(window)]
+        counts = np.rint(hits.T @ hits).astype(np.int32)
+        np.fill_diagonal(counts, 0)
+        return counts
+
+    def pair_counts_by_window(self, windows=WINDOWS):
+        """Матрицы пар для набора окон: {окно: матрица 53x53} (ключ None — вся история)."""
+        return {window: (self.pair_counts_all if window is None else self.pair_counts(window)) for window in windows}
+
+    def triplet_counts(self, window=None):
+        """Разреженная таблица троек за окно: (отсортированные коды троек, количества)."""
+        if window is None and self._triplet_counts_all is not None:
+            return self._triplet_counts_all
+        codes = np.sort(self._triplet_codes[self._window_rows(window)].reshape(-1))
+        if len(codes) == 0:
+            result = (codes, np.zeros(0, dtype=np.int32))
+        else:
+            starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            result = (codes[starts], np.diff(np.r_[starts, len(codes)]).astype(np.int32))
+        if window is None:
+            self._triplet_counts_all = result
+        return result
+
+    def top_pairs(self, window=None, limit=GLUE_TOP_PAIRS):
+        """Самые частые пары окна: список ([a, b], количество) по убыванию количества."""
+        counts = self.pair_counts_all if window is None else self.pair_counts(window)
+        upper = np.triu(counts, k=1)
+        a, b = np.nonzero(upper)
+        values = upper[a, b]
+        # При равных количествах — меньшие номера раньше
+        order = np.lexsort((b, a, -values))[:limit]
+        return [([int(a[i]), int(b[i])], int(values[i])) for i in order]
+
+    def top_triplets(self, window=None, limit=GLUE_TOP_TRIPLETS, min_count=GLUE_MIN_TRIPLET_COUNT):
+        """Самые частые тройки окна (не реже min_count): список ([a, b, c], количество)."""
+        codes, counts = self.triplet_counts(window)
+        keep = counts >= min_count
+        codes, counts = codes[keep], counts[keep]
+        order = np.lexsort((codes, -counts))[:limit]
+        return [(list(map(int, triplet_from_code(int(codes[i])))), int(counts[i])) for i in order]
+
+    def last_draw(self):
+        return int(self._draw_numbers[self.size - 1]) if self.size else None
+
+    def build_glue_clusters(self, window=GLUE_WINDOW):
+        """Содержимое glue_clusters_auto.json: частые пары и тройки окна и последний учтённый тираж."""
+        return {
+            "last_draw": self.last_draw(),
+            "window": window,
+            "frequent_pairs": [pair for pair, _ in self.top_pairs(window)],
+            "frequent_triplets": [triplet for triplet, _ in self.top_triplets(window)],
+        }
+
+    def update_glue_clusters_file(self, project_root_dir, window=GLUE_WINDOW):
+        """
+        Обновляет config/glue_clusters_auto.json, если с прошлого расчёта появились новые тиражи.
+        Ручной glue_clusters.json не трогается: генератор объединяет оба файла (load_glue_clusters).
+        """
+        filepath = os.path.join(project_root_dir, CONFIG_DIR, GLUE_CLUSTERS_AUTO_FILE_NAME)
+        saved = load_json_config(filepath)
+        if saved.get("last_draw") == self.last_draw() and saved.get("window") == window:
+            print(f"CoOccurrence: {GLUE_CLUSTERS_AUTO_FILE_NAME} актуален (тираж №{self.last_draw()}).")
+            return saved
+        glue_clusters = self.build_glue_clusters(window)
+        save_json_config(filepath, glue_clusters)
+        print(f"CoOccurrence: {GLUE_CLUSTERS_AUTO_FILE_NAME} обновлён по последним {window or len(self)} тиражам: "
+              f"пар {len(glue_clusters['frequent_pairs'])}, троек {len(glue_clusters['frequent_triplets'])}.")
+        return glue_clusters
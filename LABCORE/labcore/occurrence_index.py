@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import pandas as pd
+
+from utils.draw_store import get_draw_store
+
+LABCORE_DRAWS_FILE = "labcore_draws.csv"
+
+# Начальная ёмкость индекса сверх текущей истории (дальше удваивается при добавлении тиражей)
+INITIAL_SPARE_ROWS = 64
+
+
+def hits_matrix(numbers):
+    """Булева матрица (тиражи, 53): hits[i, n] — выпал ли номер n в тираже i (столбец 0 не используется)."""
+    numbers = np.asarray(numbers, dtype=np.intp)
+    hits = np.zeros((len(numbers), 53), dtype=bool)
+    hits[np.arange(len(numbers))[:, None], numbers] = True
+    return hits
+
+
+class OccurrenceIndex:
+    """
+    Префиксные суммы выпадений: prefix[i, n] — сколько раз номер n выпал в первых i тиражах
+    (в хронологическом порядке). Частоты в любом окне тиражей [a, b) — одно вычитание
+    prefix[b] - prefix[a], без повторного прохода по истории.
+    """
+
+    def __init__(self, draw_numbers=(), numbers=()):
+        draw_numbers = np.asarray(draw_numbers, dtype=np.int64).reshape(-1)
+        numbers = np.asarray(numbers, dtype=np.intp).reshape(-1, 6)
+        order = np.argsort(draw_numbers, kind="stable")
+        draw_numbers, numbers = draw_numbers[order], numbers[order]
+
+        self.size = len(draw_numbers)
+        capacity = self.size + INITIAL_SPARE_ROWS
+        self._draw_numbers = np.zeros(capacity, dtype=np.int64)
+        self._draw_numbers[:self.size] = draw_numbers
+        self._prefix = np.zeros((capacity + 1, 53), dtype=np.int32)
+        hits = np.zeros((self.size, 53), dtype=np.int32)
+        hits[np.arange(self.size)[:, None], numbers] = 1
+        np.cumsum(hits, axis=0, out=self._prefix[1:self.size + 1])
+        self.row_by_draw = {int(draw): row for row, draw in enumerate(draw_numbers)}
+
+    @classmethod
+    def from_dataframe(cls, draws_df):
+        """Из DataFrame с колонками Тираж, N1..N6 (строки с пропусками отбрасываются)."""
+        columns = ['Тираж'] + [f'N{i}' for i in range(1, 7)]
+        df = draws_df[columns].apply(pd.to_numeric, errors='coerce').dropna().astype(int)
+        df = df.drop_duplicates('Тираж', keep='last')
+        return cls(df['Тираж'].to_numpy(), df[columns[1:]].to_numpy())
+
+    @classmethod
+    def from_csv(cls, project_root_dir):
+        """Общий для процесса экземпляр по labcore_draws.csv: новые тиражи DrawStore передаёт ему через append."""
+        return get_draw_store(os.path.join(project_root_dir, LABCORE_DRAWS_FILE)).derived(cls)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def draw_numbers(self):
+        return self._draw_numbers[:self.size]
+
+    @property
+    def prefix(self):
+        """Массив префиксных сумм (тиражи + 1, 53); столбец 0 не используется."""
+        return self._prefix[:self.size + 1]
+
+    def append(self, draw_number, numbers):
+        """Добавляет новый тираж в конец истории за O(52) (амортизированно)."""
+        draw_number = int(draw_number)
+        if self.size and draw_number <= self._draw_numbers[self.size - 1]:
+            raise ValueError(f"Тираж №{draw_number} не новее последнего тиража №{self._draw_numbers[self.size - 1]}.")
+        if self.size == len(self._draw_numbers):
+            capacity = max(2 * len(self._draw_numbers), INITIAL_SPARE_ROWS)
+            self._draw_numbers = np.resize(self._draw_numbers, capacity)
+            prefix = np.zeros((capacity + 1, 53), dtype=np.int32)
+            prefix[:self.size + 1] = self._prefix[:self.size + 1]
+            self._prefix = prefix
+
+        row = self._prefix[self.size].copy()
+        row[np.asarray(list(numbers), dtype=np.intp)] += 1
+        self._prefix[self.size + 1] = row
+        self._draw_numbers[self.size] = draw_number
+        self.row_by_draw[draw_number] = self.size
+        self.size += 1
+
+    def frequency(self, start, end=None):
+        """Частоты номеров (массив длины 53) в тиражах с позициями [start, end)."""
+        end = self.size if end is None else min(end, self.size)
+        start = max(start, 0)
+        if start >= end:
+            return np.zeros(53, dtype=np.int32)
+        return self._prefix[end] - self._prefix[start]
+
+    def window_frequency(self, window, end=None):
+        """Частоты за последние window тиражей перед позицией end (по умолчанию — вся история)."""
+        end = self.size if end is None else min(end, self.size)
+        return self.frequency(end - window, end)
+
+    def window_frequencies(self, window):
+        """
+        Скользящие частоты для всех позиций сразу: строка i — частоты за window тиражей,
+        закончившихся тиражом i включительно (в начале истории окно короче). Массив (тиражи, 53).
+        """
+        prefix = self.prefix
+        upper = np.arange(1, self.size + 1)
+        return prefix[upper] - prefix[np.maximum(upper - window, 0)]
+
+    def interval_statistics(self):
+        """
+        Накопленная статистика номеров 1..52 после каждого тиража (массивы (тиражи, 52)):
+        frequency, last_seen (тиражей с последнего выпадения), avg_interval и std_interval
+        (среднее и стандартное отклонение интервалов между выпадениями).
+        """
+        frequency = self.prefix[1:, 1:]
+        hits = np.diff(self.prefix, axis=0)[:, 1:] > 0
+        index = np.arange(self.size, dtype=np.int64)[:, None]
+
+        last_index = np.maximum.accumulate(np.where(hits, index, -1), axis=0)
+        last_seen = np.where(last_index >= 0, index - last_index, index + 1)
+
+        # Интервал фиксируется в тираже выпадения, если номер уже выпадал раньше
+        previous_index = np.vstack([np.full((1, 52), -1, dtype=np.int64), last_index[:-1]])
+        has_interval = hits & (previous_index >= 0)
+        interval = np.where(has_interval, index - previous_index, 0)
+        interval_count = np.cumsum(has_interval, axis=0, dtype=np.int64)
+        interval_sum = np.cumsum(interval, axis=0, dtype=np.float64)
+        interval_sq_sum = np.cumsum(interval.astype(np.float64) ** 2, axis=0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_interval = np.where(interval_count > 0, interval_sum / interval_count, 0.0)
+            variance = np.where(interval_count > 0, interval_sq_sum / interval_count - avg_interval ** 2, 0.0)
+        return {
+            "frequency": frequency,
+            "last_seen": last_seen,
+            "avg_interval": avg_interval,
+            "std_interval": np.sqrt(np.maximum(variance, 0.0)),
+        }
+
+    def frequency_between_draws(self, first_draw, last_draw):
+        """Частоты в тиражах с номерами first_draw..last_draw включительно."""
+        draw_numbers = self.draw_numbers
+        start = int(np.searchsorted(draw_numbers, int(first_draw), side="left"))
+        end = int(np.searchsorted(draw_numbers, int(last_draw), side="right"))
+        return self.frequency(start, end)
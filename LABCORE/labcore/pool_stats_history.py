@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import pandas as pd
+
+from labcore.occurrence_index import OccurrenceIndex
+from labcore.psw_engine import DEFAULT_PSW_CONFIG, compute_psw_history, held_psw_history
+from labcore.zone_classifier import ZONE_NAMES, classify_zones
+from utils.draw_store import get_draw_store
+
+LABCORE_DRAWS_FILE = "labcore_draws.csv"
+
+# Признаки по оси 2 массива истории
+FEATURES = ("frequency", "last_seen", "avg_interval", "std_interval", "psw", "zone")
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+
+class PoolStatsHistory:
+    """
+    Статистика pool_stats «на момент» каждого тиража истории, рассчитанная одним векторным проходом.
+    values[i, n - 1, f] — признак f номера n после учёта тиражей 0..i (в хронологическом порядке).
+    Для бэктеста тиража d берётся строка до него (stats_before), поэтому будущие тиражи не подмешиваются.
+    """
+
+    def __init__(self, draw_numbers, numbers, psw_config=None, sleepy_config=None):
+        order = np.argsort(np.asarray(draw_numbers), kind="stable")
+        self.draw_numbers = np.asarray(draw_numbers, dtype=np.int64)[order]
+        self.row_by_draw = {int(draw): row for row, draw in enumerate(self.draw_numbers)}
+        self.psw_config = dict(DEFAULT_PSW_CONFIG, **(psw_config or {}))
+        self.sleepy_config = sleepy_config
+        self.values = self._compute(np.asarray(numbers)[order])
+
+    @classmethod
+    def from_dataframe(cls, draws_df, psw_config=None, sleepy_config=None):
+        """Из DataFrame с колонками Тираж, N1..N6 (строки с пропусками отбрасываются)."""
+        columns = ['Тираж'] + [f'N{i}' for i in range(1, 7)]
+        df = draws_df[columns].apply(pd.to_numeric, errors='coerce').dropna().astype(int)
+        df = df.drop_duplicates('Тираж', keep='last')
+        return cls(df['Тираж'].to_numpy(), df[columns[1:]].to_numpy(), psw_config, sleepy_config)
+
+    @classmethod
+    def from_csv(cls, project_root_dir, psw_config=None, sleepy_config=None):
+        draw_numbers, numbers = get_draw_store(os.path.join(project_root_dir, LABCORE_DRAWS_FILE)).arrays()
+        return cls(draw_numbers, numbers, psw_config, sleepy_config)
+
+    def _compute(self, numbers):
+        occurrences = OccurrenceIndex(self.draw_numbers, numbers)
+        statistics = occurrences.interval_statistics()
+        frequency, last_seen = statistics["frequency"], statistics["last_seen"]
+        avg_interval, std_interval = statistics["avg_interval"], statistics["std_interval"]
+        # PSW — как в live-режиме PSWEngine: пересчёт раз в psw_calculation_interval тиражей
+        psw = held_psw_history(compute_psw_history(occurrences, self.psw_config, statistics), self.psw_config)
+        zones = classify_zones(statistics, psw, self.sleepy_config)
+
+        values = np.empty((len(occurrences), 52, len(FEATURES)), dtype=np.float32)
+        for name, array in (("frequency", frequency), ("last_seen", last_seen), ("avg_interval", avg_interval),
+                            ("std_interval", std_interval), ("psw", psw), ("zone", zones)):
+            values[:, :, FEATURE_INDEX[name]] = array
+        return values
+
+    def __len__(self):
+        return len(self.draw_numbers)
+
+    def row_before(self, draw_number):
+        """Строка истории, отражающая состояние строго до тиража draw_number (-1 — истории ещё нет)."""
+        row = self.row_by_draw.get(int(draw_number))
+        if row is None:
+            # Тиража нет в истории: берём последний тираж с меньшим номером
+            row = int(np.searchsorted(self.draw_numbers, int(draw_number)))
+        return row - 1
+
+    def feature(self, name, row):
+        """Вектор признака name для всех 52 номеров (индекс 0 — номер 1) в строке row."""
+        return self.values[row, :, FEATURE_INDEX[name]]
+
+    def pool_stats_at(self, row):
+        """Статистика строки row в формате pool_stats.json."""
+        stats = {}
+        for n in range(1, 53):
+            frequency, last_seen, avg_interval, std_interval, psw, zone = self.values[row, n - 1].tolist()
+            stats[str(n)] = {
+                "last_seen": int(last_seen),
+                "avg_interval": round(avg_interval, 2),
+                "std_interval": round(std_interval, 2),
+                "psw": round(psw, 3),
+                "frequency": int(frequency),
+                "zone": ZONE_NAMES[int(zone)],
+            }
+        return stats
+
+    def stats_before(self, draw_number):
+        """pool_stats на момент перед тиражом draw_number (без информации об этом и последующих тиражах)."""
+        row = self.row_before(draw_number)
+        if row < 0:
+            return {}
+        return self.pool_stats_at(row)
@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+from labcore.occurrence_index import OccurrenceIndex
+from utils.json_utils import load_json_config, save_json_config
+
+CONFIG_DIR = "config"
+LABCORE_SAFE_DIR = "labcore_safe"
+PSW_CONFIG_FILE_NAME = "psw_config.json"
+POOL_STATS_FILE_NAME = "pool_stats.json"
+PSW_HISTORY_FILE_NAME = "psw_history.npz"
+
+# Параметры PSW по умолчанию (как в config/psw_config.json)
+DEFAULT_PSW_CONFIG = {
+    "long_term_avg_weight": 0.4,
+    "short_term_trend_weight": 0.3,
+    "deviation_sensitivity": 0.2,
+    "psw_calculation_interval": 10,
+    "short_term_window": 10,
+}
+
+
+def compute_psw_history(occurrences, psw_config=None, statistics=None):
+    """
+    PSW (потенциал скорого возврата) всех 52 номеров после каждого тиража, массив (тиражи, 52):
+    long_term_avg_weight * (долгосрочная частота / ожидаемая 6/52 - 1)
+    + short_term_trend_weight * (частота за short_term_window тиражей / долгосрочная - 1)
+    + deviation_sensitivity * (last_seen - avg_interval) / std_interval.
+    statistics — готовый результат occurrences.interval_statistics(), если он уже посчитан.
+    """
+    psw_config = dict(DEFAULT_PSW_CONFIG, **(psw_config or {}))
+    statistics = statistics or occurrences.interval_statistics()
+    draws_seen = np.arange(1, len(occurrences) + 1, dtype=np.float64)[:, None]
+    long_rate = statistics["frequency"] / draws_seen
+
+    window = max(int(psw_config["short_term_window"]), 1)
+    short_rate = occurrences.window_frequencies(window)[:, 1:] / np.minimum(draws_seen, window)
+
+    avg_interval, std_interval = statistics["avg_interval"], statistics["std_interval"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        long_term = long_rate / (6.0 / 52.0) - 1.0
+        trend = np.where(long_rate > 0, short_rate / long_rate - 1.0, 0.0)
+        deviation = np.where(std_interval > 0, (statistics["last_seen"] - avg_interval) / std_interval, 0.0)
+
+    return (psw_config["long_term_avg_weight"] * long_term
+            + psw_config["short_term_trend_weight"] * trend
+            + psw_config["deviation_sensitivity"] * deviation)
+
+
+def psw_evaluation_rows(size, psw_config=None):
+    """
+    Для каждой позиции истории — позиция последнего пересчёта PSW: PSW обновляется раз в
+    psw_calculation_interval тиражей (на позициях, кратных интервалу) и держится до следующего пересчёта.
+    """
+    psw_config = dict(DEFAULT_PSW_CONFIG, **(psw_config or {}))
+    interval = max(int(psw_config["psw_calculation_interval"]), 1)
+    index = np.arange(size)
+    return index - index % interval
+
+
+def held_psw_history(psw, psw_config=None):
+    """PSW, действующий после каждого тиража (массив как у compute_psw_history): значение последнего пересчёта."""
+    return psw[psw_evaluation_rows(len(psw), psw_config)]
+
+
+def draw_history_hash(occurrences, size):
+    """Хеш содержимого первых size тиражей истории (номера тиражей и префиксные суммы выпадений)."""
+    data = hashlib.sha1(np.ascontiguousarray(occurrences.draw_numbers[:size]).tobytes())
+    data.update(np.ascontiguousarray(occurrences.prefix[:size + 1]).tobytes())
+    return data.hexdigest()
+
+
+class PSWEngine:
+    """
+    Расчёт PSW по psw_config.json с кешем в labcore_safe/psw_history.npz.
+    PSW пересчитывается раз в psw_calculation_interval тиражей (held_psw_history) — те же значения
+    использует PoolStatsHistory для бэктеста. Точная история PSW считается одним векторным проходом
+    и сохраняется вместе с хешем содержимого учтённых тиражей; пересчёт — когда наступила следующая
+    позиция пересчёта, изменились параметры или уже учтённые тиражи переписаны.
+    """
+
+    def __init__(self, project_root_dir):
+        self.project_root_dir = project_root_dir
+        self.config = dict(DEFAULT_PSW_CONFIG, **load_json_config(
+            os.path.join(project_root_dir, CONFIG_DIR, PSW_CONFIG_FILE_NAME)))
+        self.cache_filepath = os.path.join(project_root_dir, LABCORE_SAFE_DIR, PSW_HISTORY_FILE_NAME)
+        self.pool_stats_filepath = os.path.join(project_root_dir, CONFIG_DIR, POOL_STATS_FILE_NAME)
+        self.draw_numbers = np.zeros(0, dtype=np.int64)
+        self.psw = np.zeros((0, 52), dtype=np.float32)
+        self.data_hash = None
+        # Размер истории тиражей при последнем update (для latest)
+        self.size = 0
+        self._load_cache()
+
+    def _config_key(self):
+        return json.dumps(self.config, sort_keys=True)
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_filepath):
+            return
+        try:
+            with np.load(self.cache_filepath) as data:
+                if str(data["config"]) != self._config_key():
+                    return
+                self.draw_numbers = data["draw_numbers"]
+                self.psw = data["psw"]
+                self.data_hash = str(data["data_hash"])
+                self.size = len(self.draw_numbers)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"PSWEngine: Кеш {PSW_HISTORY_FILE_NAME} не прочитан: {e}")
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(self.cache_filepath), exist_ok=True)
+        np.savez(self.cache_filepath, draw_numbers=self.draw_numbers, psw=self.psw,
+                 data_hash=np.array(self.data_hash), config=np.array(self._config_key()))
+
+    def is_due(self, occurrences):
+        """
+        Нужен ли пересчёт: кеша нет, история изменилась задним числом (номера тиражей или их содержимое)
+        или последняя позиция истории требует PSW пересчёта, которого в кеше ещё нет.
+        """
+        cached = len(self.draw_numbers)
+        if cached == 0 or cached > len(occurrences):
+            return True
+        if not np.array_equal(occurrences.draw_numbers[:cached], self.draw_numbers):
+            return True
+        if draw_history_hash(occurrences, cached) != self.data_hash:
+            return True
+        return psw_evaluation_rows(len(occurrences), self.config)[-1] >= cached
+
+    def update(self, occurrences=None, force=False):
+        """Пересчитывает историю PSW, если пора (или force=True). Возвращает True, если был пересчёт."""
+        if occurrences is None:
+            occurrences = OccurrenceIndex.from_csv(self.project_root_dir)
+        self.size = len(occurrences)
+        if not force and not self.is_due(occurrences):
+            return False
+        self.draw_numbers = occurrences.draw_numbers.copy()
+        self.psw = compute_psw_history(occurrences, self.config).astype(np.float32)
+        self.data_hash = draw_history_hash(occurrences, len(self.draw_numbers))
+        self._save_cache()
+        print(f"PSWEngine: История PSW пересчитана по {len(self.draw_numbers)} тиражам.")
+        return True
+
+    def held_rows(self, rows):
+        """PSW, действующий после тиражей с позициями rows (массив (len(rows), 52))."""
+        rows = np.asarray(rows, dtype=np.int64)
+        interval = max(int(self.config["psw_calculation_interval"]), 1)
+        return self.psw[rows - rows % interval]
+
+    def held_history(self, size=None):
+        """PSW, действующий после каждого из первых size тиражей истории (по умолчанию — всей), массив (size, 52)."""
+        return self.held_rows(np.arange(self.size if size is None else size))
+
+    def latest(self):
+        """Действующий PSW после последнего тиража (индекс 0 — номер 1), либо None."""
+        if self.size == 0 or len(self.psw) == 0:
+            return None
+        return self.psw[psw_evaluation_rows(self.size, self.config)[-1]]
+
+    def update_pool_stats(self, occurrences=None):
+        """Обновляет историю при необходимости и записывает действующие значения PSW в pool_stats.json."""
+        self.update(occurrences)
+        latest = self.latest()
+        pool_stats = load_json_config(self.pool_stats_filepath)
+        if latest is None or not pool_stats:
+            return pool_stats
+        for n in range(1, 53):
+            if str(n) in pool_stats:
+                pool_stats[str(n)]["psw"] = round(float(latest[n - 1]), 3)
+        save_json_config(self.pool_stats_filepath, pool_stats)
+        return pool_stats
@@ -0,0 +1,151 @@
+import os
+import math
+
+from utils.draw_store import get_draw_store
+from utils.json_utils import load_json_config, save_json_config
+
+CONFIG_DIR = "config"
+LABCORE_SAFE_DIR = "labcore_safe"
+LABCORE_DRAWS_FILE = "labcore_draws.csv"
+POOL_STATS_FILE_NAME = "pool_stats.json"
+STATS_STATE_FILE_NAME = "pool_stats_state.json"
+
+NUMBERS = range(1, 53)
+
+
+def _empty_accumulator():
+    # last_index — порядковый номер тиража (в хронологии) последнего выпадения, -1 — ещё не выпадал.
+    # interval_mean / interval_m2 — накопители Уэлфорда для интервалов между выпадениями.
+    return {"frequency": 0, "last_index": -1, "interval_count": 0, "interval_mean": 0.0, "interval_m2": 0.0}
+
+
+class StatsCalculator:
+    """
+    Инкрементальный расчёт pool_stats.json.
+    Для каждого номера хранятся накопители: частота, индекс последнего выпадения,
+    среднее и сумма квадратов отклонений интервалов (алгоритм Уэлфорда).
+    Новый тираж обновляет их за O(52), без пересчёта всей истории.
+    Накопители сохраняются в labcore_safe/pool_stats_state.json.
+    """
+
+    def __init__(self, project_root_dir):
+        self.project_root_dir = project_root_dir
+        self.draws_filepath = os.path.join(project_root_dir, LABCORE_DRAWS_FILE)
+        self.pool_stats_filepath = os.path.join(project_root_dir, CONFIG_DIR, POOL_STATS_FILE_NAME)
+        self.state_filepath = os.path.join(project_root_dir, LABCORE_SAFE_DIR, STATS_STATE_FILE_NAME)
+        self.state = load_json_config(self.state_filepath)
+        if not self.state.get("numbers"):
+            self.reset()
+
+    def reset(self):
+        """Сбрасывает накопители (следующий расчёт пройдёт по всей истории)."""
+        self.state = {
+            "last_draw": 0,
+            "last_numbers": [],
+            "draw_count": 0,
+            "numbers": {str(n): _empty_accumulator() for n in NUMBERS},
+        }
+
+    def update_with_draw(self, draw_number, numbers):
+        """
+        Учитывает один новый тираж: O(6) для накопителей выпавших номеров.
+        Тиражи должны поступать по возрастанию номера.
+        """
+        draw_number = int(draw_number)
+        if draw_number <= self.state["last_draw"]:
+            raise ValueError(f"Тираж №{draw_number} уже учтён (последний учтённый — №{self.state['last_draw']}).")
+
+        index = self.state["draw_count"]
+        for num in {int(n) for n in numbers}:
+            acc = self.state["numbers"].get(str(num))
+            if acc is None:
+                continue
+            if acc["last_index"] >= 0:
+                interval = index - acc["last_index"]
+                acc["interval_count"] += 1
+                delta = interval - acc["interval_mean"]
+                acc["interval_mean"] += delta / acc["interval_count"]
+                acc["interval_m2"] += delta * (interval - acc["interval_mean"])
+            acc["last_index"] = index
+            acc["frequency"] += 1
+
+        self.state["draw_count"] = index + 1
+        self.state["last_draw"] = draw_number
+        self.state["last_numbers"] = sorted(int(n) for n in numbers)
+
+    def get_pool_stats(self, previous_stats=None):
+        """
+        Текущая статистика в формате pool_stats.json.
+        Поля psw, transition и zone берутся из previous_stats: их рассчитывают другие модули.
+        """
+        previous_stats = previous_stats or {}
+        latest_index = self.state["draw_count"] - 1
+        stats = {}
+        for num in NUMBERS:
+            acc = self.state["numbers"][str(num)]
+            previous = previous_stats.get(str(num), {})
+            count = acc["interval_count"]
+            stats[str(num)] = {
+                "last_seen": latest_index - acc["last_index"] if acc["last_index"] >= 0 else self.state["draw_count"],
+                "avg_interval": round(acc["interval_mean"], 2) if count else 0.0,
+                "std_interval": round(math.sqrt(acc["interval_m2"] / count), 2) if count else 0.0,
+                "psw": previous.get("psw", 0.0),
+                "transition": previous.get("transition", 0.0),
+                "frequency": acc["frequency"],
+                "zone": previous.get("zone", "Hot"),
+            }
+        return stats
+
+    def _load_draws(self):
+        """Тиражи из labcore_draws.csv в хронологическом порядке: список (номер тиража, [6 номеров])."""
+        if not os.path.exists(self.draws_filepath):
+            print(f"StatsCalculator: Файл {LABCORE_DRAWS_FILE} не найден.")
+            return []
+        draw_numbers, numbers = get_draw_store(self.draws_filepath).arrays()
+        return list(zip(draw_numbers.tolist(), numbers.astype(int).tolist()))
+
+    def add_draw(self, draw_number, numbers, previous_draw):
+        """
+        Учитывает только что добавленный тираж и перезаписывает config/pool_stats.json без прохода по истории.
+        previous_draw — последний тираж истории до добавления; если накопители на нём не остановились,
+        выполняется обычный calculate_and_update_pool_stats.
+        """
+        if self.state["last_draw"] != previous_draw or int(draw_number) <= previous_draw:
+            return self.calculate_and_update_pool_stats()
+        self.update_with_draw(draw_number, numbers)
+        stats = self.get_pool_stats(load_json_config(self.pool_stats_filepath))
+        save_json_config(self.pool_stats_filepath, stats)
+        save_json_config(self.state_filepath, self.state)
+        print(f"StatsCalculator: Учтён тираж №{self.state['last_draw']}.")
+        return stats
+
+    def _is_consistent_with(self, draws):
+        """Проверяет, что сохранённые накопители соответствуют истории (файл не переписан задним числом)."""
+        last_draw = self.state["last_draw"]
+        if last_draw == 0:
+            return True
+        applied = [numbers for draw, numbers in draws if draw <= last_draw]
+        return len(applied) == self.state["draw_count"] and sorted(applied[-1]) == self.state["last_numbers"]
+
+    def calculate_and_update_pool_stats(self):
+        """
+        Учитывает тиражи, появившиеся после последнего расчёта, и перезаписывает config/pool_stats.json.
+        Если история изменилась задним числом, накопители пересчитываются с нуля.
+        """
+        draws = self._load_draws()
+        if not draws:
+            return load_json_config(self.pool_stats_filepath)
+
+        if not self._is_consistent_with(draws):
+            print("StatsCalculator: История тиражей изменилась, полный пересчёт накопителей.")
+            self.reset()
+
+        new_draws = [(draw, numbers) for draw, numbers in draws if draw > self.state["last_draw"]]
+        for draw, numbers in new_draws:
+            self.update_with_draw(draw, numbers)
+
+        stats = self.get_pool_stats(load_json_config(self.pool_stats_filepath))
+        save_json_config(self.pool_stats_filepath, stats)
+        save_json_config(self.state_filepath, self.state)
+        print(f"StatsCalculator: Учтено новых тиражей: {len(new_draws)}, последний — №{self.state['last_draw']}.")
+        return stats
@@ -0,0 +1,241 @@
+import os
+import numpy as np
+import pandas as pd
+
+from generate.glue_index import GlueIndex, load_glue_clusters
+from labcore.occurrence_index import OccurrenceIndex
+from labcore.psw_engine import PSWEngine
+from utils.draw_store import get_draw_store
+from utils.json_utils import load_json_config
+
+CONFIG_DIR = "config"
+DATA_DIR = "data"
+LABCORE_DRAWS_FILE = "labcore_draws.csv"
+FEATURES_FILE_NAME = "structure_features_matrix_FULL.csv"
+
+# Первый тираж матрицы: более ранние тиражи служат разгоном накопленных частот
+FIRST_DRAW = 1000
+
+# Размеры частотных зон H/M/C по рангу накопленной частоты
+HMC_ZONE_SIZES = (18, 17, 17)
+
+# Шаг обратного просмотра истории при поиске последних выпадений номеров
+LAST_HIT_BLOCK = 256
+
+STRUCTURE_RECURRENCE_WINDOW = 10
+QUOTA_WINDOW = 5
+QUOTA_THRESHOLDS = (3, 4, 5)
+
+COLUMNS = [
+    'Тираж', 'structure_HMC', 'structure_LMH', 'even_count', 'odd_count',
+    'prev_HMC', 'prev2_HMC', 'prev_LMH', 'prev2_LMH', 'draw_parity', 'draw_day', 'weekday_raw',
+    'sleepy_hit_count', 'glue_cluster_match', 'structure_recurrence_10', 'zone_bias',
+    'quota_3plus_last5', 'quota_4plus_last5', 'quota_5plus_last5', 'psw_pattern_score',
+]
+INTEGER_COLUMNS = ['Тираж', 'even_count', 'odd_count', 'sleepy_hit_count', 'glue_cluster_match',
+                   'structure_recurrence_10', 'quota_3plus_last5', 'quota_4plus_last5', 'quota_5plus_last5']
+# Колонки, которые считаются по предыдущим строкам самой матрицы (derive_structure_columns)
+DERIVED_COLUMNS = ['prev_HMC', 'prev2_HMC', 'prev_LMH', 'prev2_LMH', 'structure_recurrence_10', 'zone_bias',
+                   'quota_3plus_last5', 'quota_4plus_last5', 'quota_5plus_last5']
+# Сколько последних строк матрицы нужно, чтобы посчитать производные колонки новой строки
+DERIVED_CONTEXT_ROWS = max(STRUCTURE_RECURRENCE_WINDOW, QUOTA_WINDOW - 1, 2)
+
+
+def _zone_counts(zones):
+    """Количество номеров в зонах 0, 1, 2 для каждой строки массива зон (тиражи, 6)."""
+    return np.stack([(zones == z).sum(axis=1) for z in range(3)], axis=1)
+
+
+def _structure_strings(counts):
+    return pd.Series(counts[:, 0].astype(str)) + "-" + counts[:, 1].astype(str) + "-" + counts[:, 2].astype(str)
+
+
+def _rolling_sum(values, window):
+    """Сумма значений за последние window строк, включая текущую."""
+    cumulative = np.concatenate([[0], np.cumsum(values)])
+    upper = np.arange(1, len(values) + 1)
+    return cumulative[upper] - cumulative[np.maximum(upper - window, 0)]
+
+
+def _last_hit_rows(prefix, row):
+    """
+    Позиция последнего выпадения каждого номера в тиражах до позиции row (массив длины 53, -1 — не выпадал).
+    История просматривается назад блоками до тех пор, пока не найдены все номера.
+    """
+    last = np.full(53, -1, dtype=np.int64)
+    missing = np.ones(53, dtype=bool)
+    missing[0] = False
+    end = row
+    while end > 0 and missing.any():
+        start = max(end - LAST_HIT_BLOCK, 0)
+        hits = np.diff(prefix[start:end + 1], axis=0) > 0
+        found = hits.any(axis=0) & missing
+        last[found] = (end - 1 - np.argmax(hits[::-1], axis=0))[found]
+        missing &= ~found
+        end = start
+    return last
+
+
+def compute_structure_features(occurrences, draw_store, psw_engine, glue_clusters=None, sleepy_config=None,
+                               first_draw=FIRST_DRAW):
+    """
+    Признаки тиражей начиная с first_draw, которые зависят только от самого тиража и истории до него.
+    Просматриваются только эти строки истории (префиксные суммы OccurrenceIndex).
+    structure_HMC — распределение номеров тиража по зонам H/M/C ранга накопленной частоты с учётом самого
+    тиража; при равной частоте выше номер, дольше не выпадавший (так совпадает ~97% строк исходного файла).
+    sleepy_hit_count — по last_seen перед тиражом, psw_pattern_score — по действующему PSW PSWEngine перед тиражом.
+    Колонки из DERIVED_COLUMNS здесь не заполняются — см. derive_structure_columns.
+    """
+    draw_numbers = occurrences.draw_numbers
+    first_row = int(np.searchsorted(draw_numbers, int(first_draw), side="left"))
+    rows = np.arange(first_row, len(draw_numbers))
+    if len(rows) == 0:
+        return pd.DataFrame(columns=COLUMNS)
+    prefix = occurrences.prefix[first_row:]
+    hits = np.diff(prefix, axis=0) > 0
+    numbers = np.nonzero(hits[:, 1:])[1].reshape(-1, 6) + 1
+    draws = draw_numbers[first_row:]
+    row_index = np.arange(len(rows))[:, None]
+
+    # Позиции последних выпадений до тиража и с его учётом
+    last_hits = np.vstack([_last_hit_rows(occurrences.prefix, first_row), np.where(hits, rows[:, None], -1)])
+    last_hits = np.maximum.accumulate(last_hits, axis=0)
+    last_before, last_after = last_hits[:-1], last_hits[1:]
+
+    # LMH: 1-17, 18-34, 35-52
+    lmh = _zone_counts(np.digitize(numbers, [18, 35]))
+
+    # HMC: ранг по частоте (убывание), затем по последнему выпадению (раньше — выше), затем по номеру
+    order = np.lexsort((np.broadcast_to(np.arange(52), (len(rows), 52)), last_after[:, 1:], -prefix[1:, 1:]), axis=-1)
+    ranks = np.empty_like(order)
+    ranks[row_index, order] = np.arange(52)
+    hmc = _zone_counts(np.digitize(ranks[row_index, numbers - 1], np.cumsum(HMC_ZONE_SIZES)[:-1]))
+
+    min_last_seen = (sleepy_config or {}).get("min_last_seen_for_sleepy", 30)
+    last_index_before = last_before[row_index, numbers]
+    last_seen_before = np.where(last_index_before >= 0, rows[:, None] - 1 - last_index_before, rows[:, None])
+
+    # PSW, действовавший после предыдущего тиража (как в pool_stats.json на тот момент)
+    psw_before = np.full(len(rows), np.nan)
+    known = rows >= 1
+    if known.any():
+        held = psw_engine.held_rows(rows[known] - 1)
+        psw_before[known] = held[np.arange(len(held))[:, None], numbers[known] - 1].astype(np.float64).mean(axis=1)
+
+    dates = draw_store.dates[np.searchsorted(draw_store.draw_numbers, draws)]
+    glue_index = GlueIndex(glue_clusters)
+    features = pd.DataFrame({
+        'Тираж': draws,
+        'structure_HMC': _structure_strings(hmc),
+        'structure_LMH': _structure_strings(lmh),
+        'even_count': (numbers % 2 == 0).sum(axis=1),
+        'odd_count': (numbers % 2 == 1).sum(axis=1),
+        'draw_parity': np.where(draws % 2 == 0, "even", "odd"),
+        'draw_day': np.where(draws % 2 == 0, "Saturday", "Wednesday"),
+        'weekday_raw': pd.to_datetime(dates).day_name(),
+        'sleepy_hit_count': (last_seen_before >= min_last_seen).sum(axis=1),
+        'glue_cluster_match': glue_index.pair_matches(numbers) + glue_index.triplet_matches(numbers),
+        'psw_pattern_score': np.round(psw_before, 3),
+    })
+    return features.reindex(columns=COLUMNS)
+
+
+def derive_structure_columns(features):
+    """
+    Колонки DERIVED_COLUMNS по structure_HMC и structure_LMH самой матрицы (строки по возрастанию тиража):
+    лаги структур, повторы структуры за STRUCTURE_RECURRENCE_WINDOW строк, zone_bias и квоты.
+    Возвращает DataFrame только с этими колонками, индекс — как у features.
+    """
+    hmc_strings = features['structure_HMC'].astype(str)
+    hmc = hmc_strings.str.split("-", expand=True).astype(int).to_numpy().reshape(-1, 3)
+    structure_key = (features['structure_LMH'].astype(str) + "|" + hmc_strings).to_numpy()
+    recurrence = np.zeros(len(features), dtype=np.int64)
+    for lag in range(1, min(STRUCTURE_RECURRENCE_WINDOW, len(features) - 1) + 1):
+        recurrence[lag:] += structure_key[lag:] == structure_key[:-lag]
+
+    derived = pd.DataFrame(index=features.index)
+    for name in ('HMC', 'LMH'):
+        derived[f'prev_{name}'] = features[f'structure_{name}'].shift(1)
+        derived[f'prev2_{name}'] = features[f'structure_{name}'].shift(2)
+    derived['structure_recurrence_10'] = recurrence
+    derived['zone_bias'] = np.round((hmc[:, 0] - hmc[:, 2]) / 6.0, 3)
+    max_zone = hmc.max(axis=1)
+    for threshold in QUOTA_THRESHOLDS:
+        derived[f'quota_{threshold}plus_last{QUOTA_WINDOW}'] = _rolling_sum(max_zone >= threshold, QUOTA_WINDOW)
+    return derived[DERIVED_COLUMNS]
+
+
+class StructureFeaturesBuilder:
+    """
+    Поддерживает data/structure_features_matrix_FULL.csv в актуальном состоянии:
+    после нового тиража считаются и дописываются только строки тиражей после последнего в файле.
+    Пустые колонки уже существующих строк однократно заполняются расчётными значениями
+    (производные колонки — по structure_HMC самого файла), непустые значения файла не перезаписываются.
+    """
+
+    def __init__(self, project_root_dir):
+        self.project_root_dir = project_root_dir
+        self.draws_filepath = os.path.join(project_root_dir, LABCORE_DRAWS_FILE)
+        self.features_filepath = os.path.join(project_root_dir, DATA_DIR, FEATURES_FILE_NAME)
+
+    def _compute(self, first_draw=FIRST_DRAW):
+        config_dir = os.path.join(self.project_root_dir, CONFIG_DIR)
+        occurrences = OccurrenceIndex.from_csv(self.project_root_dir)
+        psw_engine = PSWEngine(self.project_root_dir)
+        psw_engine.update(occurrences)
+        return compute_structure_features(
+            occurrences,
+            get_draw_store(self.draws_filepath),
+            psw_engine,
+            glue_clusters=load_glue_clusters(config_dir),
+            sleepy_config=load_json_config(os.path.join(config_dir, "sleepy_zones.json")),
+            first_draw=first_draw,
+        )
+
+    @staticmethod
+    def _with_derived(features, context=None):
+        """Заполняет производные колонки features; context — предыдущие строки матрицы для лагов и окон."""
+        context = context if context is not None else features.iloc[:0]
+        combined = pd.concat([context[COLUMNS], features[COLUMNS]], ignore_index=True)
+        derived = derive_structure_columns(combined).iloc[len(context):]
+        features = features.reset_index(drop=True).copy()
+        features[DERIVED_COLUMNS] = derived.reset_index(drop=True)
+        features[INTEGER_COLUMNS] = features[INTEGER_COLUMNS].astype('Int64')
+        return features[COLUMNS]
+
+    def _write(self, features, append=False):
+        os.makedirs(os.path.dirname(self.features_filepath), exist_ok=True)
+        features.to_csv(self.features_filepath, mode='a' if append else 'w', header=not append,
+                        index=False, encoding="utf-8", lineterminator="\n")
+
+    def refresh(self):
+        """Обновляет файл матрицы; возвращает количество дописанных строк."""
+        if not os.path.exists(self.features_filepath):
+            features = self._with_derived(self._compute())
+            self._write(features)
+            print(f"StructureFeatures: Создан {FEATURES_FILE_NAME}, строк: {len(features)}.")
+            return len(features)
+
+        existing = pd.read_csv(self.features_filepath, encoding="utf-8")
+        missing_columns = [c for c in COLUMNS if c not in existing.columns or existing[c].isna().all()]
+        last_draw = int(existing['Тираж'].max())
+        new_rows = self._compute(first_draw=last_draw + 1)
+
+        if missing_columns:
+            # Однократное заполнение пустых колонок: значения файла имеют приоритет над расчётными.
+            # Производные колонки считаются по structure_HMC/structure_LMH файла, а не по расчётным.
+            existing = existing.reindex(columns=COLUMNS).sort_values('Тираж').reset_index(drop=True)
+            computed = self._compute(first_draw=int(existing['Тираж'].min()))
+            merged = existing.set_index('Тираж').combine_first(computed.set_index('Тираж')[COLUMNS[1:]])
+            merged = merged.loc[merged.index <= last_draw].reset_index()[COLUMNS]
+            merged = pd.concat([merged, new_rows[COLUMNS]], ignore_index=True)
+            derived = derive_structure_columns(merged)
+            merged[DERIVED_COLUMNS] = merged[DERIVED_COLUMNS].combine_first(derived)
+            merged[INTEGER_COLUMNS] = merged[INTEGER_COLUMNS].astype('Int64')
+            self._write(merged[COLUMNS])
+            print(f"StructureFeatures: Заполнены колонки {missing_columns}, дописано строк: {len(new_rows)}.")
+        elif len(new_rows):
+            context = existing.reindex(columns=COLUMNS).sort_values('Тираж').tail(DERIVED_CONTEXT_ROWS)
+            self._write(self._with_derived(new_rows, context), append=True)
+            print(f"StructureFeatures: Дописано строк: {len(new_rows)}.")
+        return len(new_rows)
@@ -0,0 +1,89 @@
+import os
+import numpy as np
+
+from labcore.occurrence_index import hits_matrix
+from utils.draw_store import get_draw_store
+from utils.json_utils import load_json_config, save_json_config
+
+LABCORE_DRAWS_FILE = "labcore_draws.csv"
+DATA_DIR = "data"
+TRANSITION_FILE_NAME = "transition_counts.npy"
+CONFIG_DIR = "config"
+POOL_STATS_FILE_NAME = "pool_stats.json"
+
+# Сколько лагов считается по умолчанию (тираж t -> тиражи t+1 .. t+DEFAULT_MAX_LAG)
+DEFAULT_MAX_LAG = 5
+
+
+def compute_transition_counts(numbers, max_lag=DEFAULT_MAX_LAG):
+    """
+    Матрицы переходов по хронологической истории numbers (тиражи, 6):
+    counts[lag - 1, a, b] — сколько раз номер a в тираже t сопровождался номером b в тираже t + lag.
+    Результат — int32 массив (max_lag, 53, 53); строка и столбец 0 не используются.
+    """
+    hits = hits_matrix(numbers).astype(np.float32)
+    counts = np.zeros((max_lag, 53, 53), dtype=np.int32)
+    for lag in range(1, min(max_lag, len(hits) - 1) + 1):
+        counts[lag - 1] = np.rint(hits[:-lag].T @ hits[lag:])
+    return counts
+
+
+def transition_probabilities(counts):
+    """Построчная нормировка: P[lag - 1, a, b] — доля переходов a -> b среди всех переходов из a."""
+    totals = counts.sum(axis=2, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(totals > 0, counts / totals, 0.0)
+
+
+def next_draw_scores(counts, recent_draws, lag_weights=None):
+    """
+    Оценка номеров следующего тиража по последним тиражам recent_draws (от нового к старому):
+    тираж с индексом l - 1 даёт вклад вероятностей переходов с лагом l. Возвращает массив длины 53.
+    """
+    probabilities = transition_probabilities(counts)
+    max_lag = min(len(probabilities), len(recent_draws))
+    lag_weights = np.ones(max_lag) if lag_weights is None else np.asarray(lag_weights, dtype=np.float64)
+    scores = np.zeros(53, dtype=np.float64)
+    for lag in range(1, max_lag + 1):
+        numbers = np.asarray(list(recent_draws[lag - 1]), dtype=np.intp)
+        scores += lag_weights[lag - 1] * probabilities[lag - 1, numbers].sum(axis=0)
+    return scores
+
+
+def load_transition_counts(project_root_dir, max_lag=DEFAULT_MAX_LAG):
+    """
+    Матрицы переходов из data/transition_counts.npy.
+    Файл пересчитывается и перезаписывается, только если labcore_draws.csv новее него
+    или в нём меньше лагов, чем запрошено.
+    """
+    draws_filepath = os.path.join(project_root_dir, LABCORE_DRAWS_FILE)
+    filepath = os.path.join(project_root_dir, DATA_DIR, TRANSITION_FILE_NAME)
+    if os.path.exists(filepath) and os.path.getmtime(filepath) >= os.path.getmtime(draws_filepath):
+        counts = np.load(filepath)
+        if len(counts) >= max_lag:
+            return counts[:max_lag]
+
+    counts = compute_transition_counts(get_draw_store(draws_filepath).arrays()[1], max_lag)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    np.save(filepath, counts)
+    print(f"TransitionMatrix: Матрицы переходов (лаги 1..{max_lag}) пересчитаны и сохранены в {TRANSITION_FILE_NAME}.")
+    return counts
+
+
+def update_pool_stats(project_root_dir, max_lag=DEFAULT_MAX_LAG):
+    """
+    Записывает в pool_stats.json признак "transition" — оценку next_draw_scores по последним max_lag тиражам.
+    Взвешенная генерация учитывает его с весом transition_weight из attention_weights.json.
+    """
+    pool_stats_filepath = os.path.join(project_root_dir, CONFIG_DIR, POOL_STATS_FILE_NAME)
+    pool_stats = load_json_config(pool_stats_filepath)
+    numbers = get_draw_store(os.path.join(project_root_dir, LABCORE_DRAWS_FILE)).arrays()[1]
+    if not pool_stats or len(numbers) == 0:
+        return pool_stats
+    counts = load_transition_counts(project_root_dir, max_lag)
+    scores = next_draw_scores(counts, numbers[::-1][:max_lag])
+    for n in range(1, 53):
+        if str(n) in pool_stats:
+            pool_stats[str(n)]["transition"] = round(float(scores[n]), 4)
+    save_json_config(pool_stats_filepath, pool_stats)
+    return pool_stats
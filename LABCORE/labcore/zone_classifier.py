@@ -0,0 +1,143 @@
+import os
+import json
+import numpy as np
+
+from labcore.occurrence_index import OccurrenceIndex
+from labcore.psw_engine import PSWEngine, draw_history_hash
+from utils.json_utils import load_json_config, save_json_config
+
+CONFIG_DIR = "config"
+LABCORE_SAFE_DIR = "labcore_safe"
+SLEEPY_CONFIG_FILE_NAME = "sleepy_zones.json"
+POOL_STATS_FILE_NAME = "pool_stats.json"
+ZONE_HISTORY_FILE_NAME = "zone_history.npz"
+
+# Коды зон в истории (int8)
+ZONE_NAMES = ("Hot", "Warm", "Cold", "Sleepy")
+HOT, WARM, COLD, SLEEPY = range(len(ZONE_NAMES))
+
+# Правила sleepy по умолчанию (как в config/sleepy_zones.json)
+DEFAULT_SLEEPY_CONFIG = {
+    "min_last_seen_for_sleepy": 30,
+    "max_avg_interval_for_sleepy": 25,
+    "min_psw_for_sleepy": 0.3,
+    "sleepy_boost_if_active": 1.5,
+    "sleepy_re_evaluation_interval": 5,
+}
+
+
+def classify_zones(statistics, psw, sleepy_config=None):
+    """
+    Зоны всех 52 номеров после каждого тиража, int8 массив (тиражи, 52).
+    Hot — last_seen не больше среднего интервала, Warm — в пределах одного std сверх него, иначе Cold.
+    Sleepy — номер с обычно коротким интервалом (avg_interval <= max_avg_interval_for_sleepy),
+    не выпадавший min_last_seen_for_sleepy тиражей, с PSW не ниже min_psw_for_sleepy.
+    Статус Sleepy пересматривается раз в sleepy_re_evaluation_interval тиражей и держится до
+    следующего пересмотра, но снимается сразу, как только номер выпадает.
+    """
+    sleepy_config = dict(DEFAULT_SLEEPY_CONFIG, **(sleepy_config or {}))
+    last_seen = statistics["last_seen"]
+    avg_interval, std_interval = statistics["avg_interval"], statistics["std_interval"]
+
+    zones = np.full(last_seen.shape, COLD, dtype=np.int8)
+    zones[last_seen <= avg_interval + std_interval] = WARM
+    zones[last_seen <= avg_interval] = HOT
+
+    sleepy = ((last_seen >= sleepy_config["min_last_seen_for_sleepy"])
+              & (avg_interval > 0)
+              & (avg_interval <= sleepy_config["max_avg_interval_for_sleepy"])
+              & (psw >= sleepy_config["min_psw_for_sleepy"]))
+    interval = max(int(sleepy_config["sleepy_re_evaluation_interval"]), 1)
+    index = np.arange(len(last_seen))
+    evaluation_row = index - index % interval
+    held = sleepy[evaluation_row] & (last_seen > (index - evaluation_row)[:, None])
+    zones[held] = SLEEPY
+    return zones
+
+
+class ZoneClassifier:
+    """
+    История зон (тиражи x 52, int8) по правилам sleepy_zones.json, сохраняется в
+    labcore_safe/zone_history.npz: генераторы и бэктесты читают зону на любой момент без
+    повторной классификации. PSW берётся из истории PSWEngine (те же значения, что в pool_stats.json).
+    Пересчёт — только при изменении параметров, содержимого истории тиражей или истории PSW.
+    """
+
+    def __init__(self, project_root_dir):
+        self.project_root_dir = project_root_dir
+        config_dir = os.path.join(project_root_dir, CONFIG_DIR)
+        self.sleepy_config = dict(DEFAULT_SLEEPY_CONFIG,
+                                  **load_json_config(os.path.join(config_dir, SLEEPY_CONFIG_FILE_NAME)))
+        self.psw_engine = PSWEngine(project_root_dir)
+        self.history_filepath = os.path.join(project_root_dir, LABCORE_SAFE_DIR, ZONE_HISTORY_FILE_NAME)
+        self.pool_stats_filepath = os.path.join(config_dir, POOL_STATS_FILE_NAME)
+        self.draw_numbers = np.zeros(0, dtype=np.int64)
+        self.zones = np.zeros((0, 52), dtype=np.int8)
+        self._cache_key = None
+        self._load_history()
+
+    def _key(self, occurrences):
+        """
+        Ключ истории зон: параметры sleepy_zones.json и psw_config.json и хеш содержимого истории тиражей
+        (номера тиражей и префиксные суммы выпадений). Действующий PSW однозначно задан ими же.
+        """
+        return json.dumps({
+            "sleepy_config": self.sleepy_config,
+            "psw_config": self.psw_engine.config,
+            "data": draw_history_hash(occurrences, len(occurrences)),
+        }, sort_keys=True)
+
+    def _load_history(self):
+        if not os.path.exists(self.history_filepath):
+            return
+        try:
+            with np.load(self.history_filepath) as data:
+                self._cache_key = str(data["key"])
+                self.draw_numbers = data["draw_numbers"]
+                self.zones = data["zones"]
+        except (OSError, KeyError, ValueError) as e:
+            print(f"ZoneClassifier: История зон {ZONE_HISTORY_FILE_NAME} не прочитана: {e}")
+
+    def update(self, occurrences=None):
+        """Переклассифицирует историю, если изменились тиражи, PSW или параметры. Возвращает True, если был пересчёт."""
+        if occurrences is None:
+            occurrences = OccurrenceIndex.from_csv(self.project_root_dir)
+        self.psw_engine.update(occurrences)
+        key = self._key(occurrences)
+        if key == self._cache_key:
+            return False
+        statistics = occurrences.interval_statistics()
+        self.draw_numbers = occurrences.draw_numbers.copy()
+        self.zones = classify_zones(statistics, self.psw_engine.held_history(len(occurrences)), self.sleepy_config)
+        self._cache_key = key
+
+        os.makedirs(os.path.dirname(self.history_filepath), exist_ok=True)
+        np.savez(self.history_filepath, draw_numbers=self.draw_numbers, zones=self.zones, key=np.array(key))
+        print(f"ZoneClassifier: Зоны пересчитаны по {len(self.draw_numbers)} тиражам.")
+        return True
+
+    def zones_before(self, draw_number):
+        """Коды зон 52 номеров на момент перед тиражом draw_number, либо None."""
+        row = int(np.searchsorted(self.draw_numbers, int(draw_number), side="left")) - 1
+        if row < 0:
+            return None
+        return self.zones[row]
+
+    def latest_zone_names(self):
+        """{номер: зона} по последнему тиражу."""
+        if len(self.zones) == 0:
+            return {}
+        return {n: ZONE_NAMES[code] for n, code in enumerate(self.zones[-1].tolist(), start=1)}
+
+    def update_pool_stats(self, occurrences=None):
+        """Обновляет историю при необходимости и записывает текущие зоны в pool_stats.json."""
+        self.update(occurrences)
+        zone_names = self.latest_zone_names()
+        pool_stats = load_json_config(self.pool_stats_filepath)
+        if not zone_names or not pool_stats:
+            return pool_stats
+        for n, zone in zone_names.items():
+            if str(n) in pool_stats:
+                pool_stats[str(n)]["zone"] = zone
+        save_json_config(self.pool_stats_filepath, pool_stats)
+        return pool_stats
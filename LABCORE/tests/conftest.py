@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули LABCORE импортируются от корня приложения (как при запуске main.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
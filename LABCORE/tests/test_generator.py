@@ -0,0 +1,42 @@
+import numpy as np
+
+from generate.generator import LotteryGenerator
+from utils.combination_rank import rank_combinations
+
+# 24 доступных номера, по 8 в зонах Hot/Warm/Cold, квоты 2-2-2: допустимо C(8, 2) ** 3 = 21952 комбинации
+ZONES = {"Hot": range(1, 9), "Warm": range(9, 17), "Cold": range(17, 25)}
+FEASIBLE_COUNT = 28 ** 3
+
+
+def _small_space_generator():
+    pool_stats = {str(n): {"frequency": 1.0, "last_seen": 1, "avg_interval": 1.0, "std_interval": 0.0,
+                           "psw": 0.0, "zone": zone}
+                  for zone, numbers in ZONES.items() for n in numbers}
+    return LotteryGenerator(
+        draws_df=None,
+        config_core={},
+        config_softpool={"exclude": list(range(25, 53))},
+        config_quotas={"H": 33.4, "M": 33.3, "C": 33.3},
+        pool_stats=pool_stats,
+    )
+
+
+def test_unique_batch_near_feasible_limit():
+    """~95% допустимого пространства набирается без ложного «исчерпано» в конце партии."""
+    num_combinations = int(FEASIBLE_COUNT * 0.95)
+    combinations = _small_space_generator().generate_batch(num_combinations, unique=True, seed=1)
+
+    assert combinations.shape == (num_combinations, 6)
+    assert len(np.unique(rank_combinations(combinations))) == num_combinations
+
+
+def test_structure_quotas_fall_back_to_line_zones():
+    """Все номера в зоне Hot (как в поставляемом pool_stats.json): квоты LMH|HMC заменяются квотами L/M/H."""
+    pool_stats = {str(n): {"frequency": 1.0, "last_seen": 1, "avg_interval": 1.0, "std_interval": 0.0,
+                           "psw": 0.0, "zone": "Hot"} for n in range(1, 53)}
+    generator = LotteryGenerator(draws_df=None, config_core={}, config_softpool={},
+                                 config_quotas={"H": 33.4, "M": 33.3, "C": 33.3}, pool_stats=pool_stats)
+    combinations = generator.generate_batch(1000, use_structure_quotas=True, seed=1)
+
+    assert combinations.shape == (1000, 6)
+    assert len(generator.warnings) == 1
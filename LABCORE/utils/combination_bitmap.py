@@ -0,0 +1,70 @@
+import numpy as np
+
+from utils.combination_rank import TOTAL_COMBINATIONS, rank_combinations, rank_dataframe
+
+
+def _unique_sorted(ranks):
+    ranks = np.sort(ranks)
+    return ranks[np.r_[True, ranks[1:] != ranks[:-1]]] if len(ranks) else ranks
+
+
+def _first_occurrence_mask(ranks):
+    """Булев массив: True для первого вхождения каждого ранга."""
+    order = np.argsort(ranks, kind="stable")
+    sorted_ranks = ranks[order]
+    mask = np.zeros(len(ranks), dtype=bool)
+    mask[order[np.r_[True, sorted_ranks[1:] != sorted_ranks[:-1]]]] = True
+    return mask
+
+
+class CombinationBitmap:
+    """
+    Битовая карта всего пространства 6 из 52: один бит на ранг комбинации (~2.5 МБ).
+    Проверка и отметка комбинации — O(1) независимо от размера пула.
+    """
+
+    def __init__(self):
+        self.bits = np.zeros((TOTAL_COMBINATIONS + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def _split(ranks):
+        ranks = np.asarray(ranks, dtype=np.int64).reshape(-1)
+        return ranks >> 3, (np.uint8(1) << (ranks & 7).astype(np.uint8))
+
+    def contains(self, ranks):
+        """Булев массив: отмечен ли каждый ранг."""
+        byte_idx, bit = self._split(ranks)
+        return (self.bits[byte_idx] & bit) != 0
+
+    def add(self, ranks):
+        """Отмечает ранги (повторы и уже отмеченные ранги допустимы)."""
+        ranks = _unique_sorted(np.asarray(ranks, dtype=np.int64).reshape(-1))
+        ranks = ranks[~self.contains(ranks)]
+        if len(ranks) == 0:
+            return
+        # ranks отсортированы, поэтому биты одного байта идут подряд и сливаются одним reduceat
+        byte_idx, bit = self._split(ranks)
+        starts = np.flatnonzero(np.r_[True, byte_idx[1:] != byte_idx[:-1]])
+        self.bits[byte_idx[starts]] |= np.bitwise_or.reduceat(bit, starts)
+        self.count += len(ranks)
+
+    def add_combinations(self, combinations):
+        self.add(rank_combinations(combinations))
+
+    def add_dataframe(self, df):
+        """Отмечает все корректные комбинации из DataFrame с колонками N1..N6."""
+        self.add(rank_dataframe(df))
+
+    def new_mask(self, ranks):
+        """
+        Булев массив: ранг ещё не отмечен и встречается в ranks впервые.
+        Саму карту не изменяет.
+        """
+        ranks = np.asarray(ranks, dtype=np.int64).reshape(-1)
+        if len(ranks) == 0:
+            return np.zeros(0, dtype=bool)
+        return _first_occurrence_mask(ranks) & ~self.contains(ranks)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from math import comb
+
+# Колексикографический ранг комбинации 6 из 52:
+# для отсортированных номеров c1 < ... < c6 ранг = sum(C(c_i - 1, i)), i = 1..6.
+# Ранги занимают диапазон 0..C(52, 6) - 1 и помещаются в uint32.
+MAX_NUMBER = 52
+COMBINATION_SIZE = 6
+TOTAL_COMBINATIONS = comb(MAX_NUMBER, COMBINATION_SIZE)
+
+# _BINOM[a, i] = C(a, i) для a = 0..51, i = 0..6
+_BINOM = np.array([[comb(a, i) for i in range(COMBINATION_SIZE + 1)] for a in range(MAX_NUMBER)], dtype=np.int64)
+
+
+def rank_combinations(combinations):
+    """
+    Переводит массив комбинаций (N, 6) в массив рангов uint32.
+    Порядок номеров внутри строки не важен — строки сортируются.
+    """
+    combinations = np.asarray(combinations)
+    if combinations.ndim == 1:
+        combinations = combinations.reshape(1, -1)
+    if combinations.shape[1] != COMBINATION_SIZE:
+        raise ValueError(f"Ожидается {COMBINATION_SIZE} номеров в комбинации, получено {combinations.shape[1]}.")
+
+    zero_based = np.sort(combinations.astype(np.int64), axis=1) - 1
+    if (zero_based < 0).any() or (zero_based >= MAX_NUMBER).any():
+        raise ValueError(f"Номера комбинаций должны быть в диапазоне 1..{MAX_NUMBER}.")
+    if (np.diff(zero_based, axis=1) == 0).any():
+        raise ValueError("Номера внутри комбинации должны быть уникальными.")
+
+    ranks = np.zeros(len(zero_based), dtype=np.int64)
+    for i in range(COMBINATION_SIZE):
+        ranks += _BINOM[zero_based[:, i], i + 1]
+    return ranks.astype(np.uint32)
+
+
+def unrank_combinations(ranks):
+    """
+    Обратное преобразование: массив рангов -> массив отсортированных комбинаций (N, 6) uint8.
+    """
+    remainder = np.asarray(ranks, dtype=np.int64).reshape(-1).copy()
+    if (remainder < 0).any() or (remainder >= TOTAL_COMBINATIONS).any():
+        raise ValueError(f"Ранг комбинации должен быть в диапазоне 0..{TOTAL_COMBINATIONS - 1}.")
+
+    combinations = np.empty((len(remainder), COMBINATION_SIZE), dtype=np.uint8)
+    for i in range(COMBINATION_SIZE, 0, -1):
+        # Наибольшее a, для которого C(a, i) <= остатка
+        a = np.searchsorted(_BINOM[:, i], remainder, side="right") - 1
+        remainder -= _BINOM[a, i]
+        combinations[:, i - 1] = a + 1
+    return combinations
+
+
+def combination_rank(numbers):
+    """Ранг одной комбинации (список из 6 номеров)."""
+    return int(rank_combinations([list(numbers)])[0])
+
+
+def combination_from_rank(rank):
+    """Комбинация (отсортированный список номеров) по её рангу."""
+    return unrank_combinations([rank])[0].tolist()
+
+
+def rank_dataframe(df):
+    """
+    Ранги комбинаций из DataFrame с колонками N1..N6 (файлы generated/, labcore_draws.csv).
+    Строки с пропусками или некорректными номерами пропускаются.
+    """
+    columns = [f'N{i}' for i in range(1, 7)]
+    numbers = df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(numbers).any(axis=1)
+    numbers = numbers[valid].astype(np.int64)
+    in_range = ((numbers >= 1) & (numbers <= MAX_NUMBER)).all(axis=1)
+    numbers = numbers[in_range]
+    distinct = (np.diff(np.sort(numbers, axis=1), axis=1) != 0).all(axis=1)
+    return rank_combinations(numbers[distinct])
@@ -0,0 +1,128 @@
+import os
+import numpy as np
+import pandas as pd
+
+DRAW_COLUMNS = ["Тираж", "Дата", "Комплект", "N1", "N2", "N3", "N4", "N5", "N6"]
+NUMBER_COLUMNS = [f'N{i}' for i in range(1, 7)]
+
+# Заголовки внешних файлов (в нижнем регистре) -> колонки labcore_draws.csv
+COLUMN_MAPPING = {
+    "тираж": "Тираж", "розіграш": "Тираж",
+    "дата": "Дата",
+    "комплект": "Комплект",
+    "n1": "N1", "кулька 1": "N1", "шар 1": "N1",
+    "n2": "N2", "кулька 2": "N2", "шар 2": "N2",
+    "n3": "N3", "кулька 3": "N3", "шар 3": "N3",
+    "n4": "N4", "кулька 4": "N4", "шар 4": "N4",
+    "n5": "N5", "кулька 5": "N5", "шар 5": "N5",
+    "n6": "N6", "кулька 6": "N6", "шар 6": "N6"
+}
+
+# Строк внешнего CSV за одно чтение
+IMPORT_CHUNK_SIZE = 100000
+
+REJECTION_COLUMNS = ["Строка", "Тираж", "Причина"]
+
+
+def normalize_columns(df):
+    """Приводит заголовки к колонкам labcore_draws.csv; отсутствующие колонки заполняются NA."""
+    renamed = {}
+    for col in df.columns:
+        target = COLUMN_MAPPING.get(str(col).strip().lower())
+        if target is not None and target not in renamed.values():
+            renamed[col] = target
+    return df[list(renamed)].rename(columns=renamed).reindex(columns=DRAW_COLUMNS)
+
+
+def _rejections(rows, draw_numbers, mask, reason):
+    return pd.DataFrame({"Строка": rows[mask], "Тираж": draw_numbers[mask], "Причина": reason})
+
+
+def validate_draws(df, first_row=0):
+    """
+    Векторная проверка строк (колонки уже приведены normalize_columns).
+    Возвращает (валидные строки, отчёт об отклонённых строках). Строка в отчёте — позиция
+    строки данных в исходном файле, начиная с first_row.
+    Проверяются: номер тиража, наличие всех 6 номеров, диапазон 1..52, повторы внутри тиража.
+    """
+    draw_numbers = pd.to_numeric(df["Тираж"], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    numbers = df[NUMBER_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    rows = np.arange(first_row, first_row + len(df))
+
+    no_draw = np.isnan(draw_numbers) | (draw_numbers != np.round(draw_numbers))
+    incomplete = ~no_draw & np.isnan(numbers).any(axis=1)
+    checked = ~no_draw & ~incomplete
+    out_of_range = checked & ((numbers < 1) | (numbers > 52) | (numbers != np.round(numbers))).any(axis=1)
+    checked &= ~out_of_range
+    sorted_numbers = np.sort(numbers, axis=1)
+    repeated = checked & (sorted_numbers[:, 1:] == sorted_numbers[:, :-1]).any(axis=1)
+    valid = checked & ~repeated
+
+    rejected = pd.concat([
+        _rejections(rows, draw_numbers, no_draw, "нет корректного номера тиража"),
+        _rejections(rows, draw_numbers, incomplete, "указаны не все 6 номеров"),
+        _rejections(rows, draw_numbers, out_of_range, "номер вне диапазона 1..52"),
+        _rejections(rows, draw_numbers, repeated, "номер повторяется внутри тиража"),
+    ], ignore_index=True)
+
+    cleaned = df[valid].copy()
+    cleaned["Тираж"] = draw_numbers[valid].astype(np.int64)
+    cleaned[NUMBER_COLUMNS] = numbers[valid].astype(np.int64)
+    cleaned["Строка"] = rows[valid]
+    return cleaned, rejected
+
+
+def _finalize(cleaned, rejected):
+    """Удаляет повторы номеров тиража (остаётся последняя строка) и сортирует от нового к старому."""
+    duplicated = cleaned["Тираж"].duplicated(keep="last").to_numpy()
+    if duplicated.any():
+        duplicates = cleaned[duplicated]
+        rejected = pd.concat([rejected, pd.DataFrame({
+            "Строка": duplicates["Строка"].to_numpy(),
+            "Тираж": duplicates["Тираж"].to_numpy(),
+            "Причина": "повтор номера тиража (оставлена последняя строка)",
+        })], ignore_index=True)
+    cleaned = cleaned[~duplicated].drop(columns="Строка")
+
+    cleaned["Тираж"] = cleaned["Тираж"].astype('Int64')
+    for col in ["Дата", "Комплект"]:
+        cleaned[col] = cleaned[col].fillna("").astype(str)
+    cleaned = cleaned.sort_values(by="Тираж", ascending=False).reset_index(drop=True)
+
+    rejected = rejected.sort_values(by="Строка", kind="stable").reset_index(drop=True)
+    rejected["Тираж"] = rejected["Тираж"].astype('Int64')
+    return cleaned, rejected
+
+
+def clean_draws(df):
+    """
+    Очистка таблицы тиражей в памяти: колонки, проверки, удаление повторов.
+    Возвращает (таблица от нового тиража к старому, отчёт об отклонённых строках).
+    """
+    cleaned, rejected = validate_draws(normalize_columns(df), first_row=2)
+    return _finalize(cleaned, rejected)
+
+
+def import_draws_csv(filepath, chunksize=IMPORT_CHUNK_SIZE):
+    """
+    Импорт внешнего CSV любого размера: файл читается порциями по chunksize строк,
+    каждая порция проверяется векторно. Возвращает (таблица тиражей, отчёт об отклонённых строках);
+    Строка в отчёте — номер строки файла (заголовок — строка 1).
+    """
+    cleaned_parts, rejected_parts = [], []
+    first_row = 2
+    for chunk in pd.read_csv(filepath, encoding="utf-8-sig", dtype=str, chunksize=chunksize):
+        cleaned, rejected = validate_draws(normalize_columns(chunk), first_row)
+        cleaned_parts.append(cleaned)
+        rejected_parts.append(rejected)
+        first_row += len(chunk)
+    if not cleaned_parts:
+        return _finalize(pd.DataFrame(columns=DRAW_COLUMNS + ["Строка"]), pd.DataFrame(columns=REJECTION_COLUMNS))
+    return _finalize(pd.concat(cleaned_parts, ignore_index=True), pd.concat(rejected_parts, ignore_index=True))
+
+
+def save_rejection_report(rejected, filepath):
+    """Сохраняет отчёт об отклонённых строках в CSV."""
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    rejected.to_csv(filepath, index=False, encoding="utf-8-sig")
+    return filepath
@@ -0,0 +1,473 @@
+import os
+import csv
+import io
+import json
+import datetime
+import hashlib
+import numpy as np
+import pandas as pd
+
+DRAW_COLUMNS = ["Тираж", "Дата", "Комплект", "N1", "N2", "N3", "N4", "N5", "N6"]
+NUMBER_COLUMNS = [f'N{i}' for i in range(1, 7)]
+
+# Бинарный кеш истории лежит рядом с CSV: <папка CSV>/labcore_safe/<имя CSV>_cache/
+CACHE_DIR = "labcore_safe"
+CACHE_META_FILE_NAME = "meta.json"
+CACHE_ARRAYS = ("draw_numbers", "dates", "numbers")
+# Колонки файла в исходном порядке строк кешируются как table_<номер колонки>.npy (см. meta.json)
+CACHE_TABLE_PREFIX = "table_"
+# Строки, дописанные после сборки кеша (по одной JSON-строке); .npy при дописывании не переписываются
+CACHE_TAIL_FILE_NAME = "appended.jsonl"
+# При открытии кеша с таким числом дописанных строк он пересобирается (журнал сворачивается в .npy)
+CACHE_TAIL_LIMIT = 256
+# Запас ёмкости массивов в памяти при дописывании (дальше удваивается)
+INITIAL_SPARE_ROWS = 64
+HASH_CHUNK_SIZE = 1 << 20
+# Журнал незавершённого дописывания тиража (рядом с CSV)
+WAL_SUFFIX = ".wal"
+
+# Открытые хранилища процесса: абсолютный путь к CSV -> DrawStore
+_stores = {}
+
+
+def _write_atomic(filepath, data):
+    """Записывает байты во временный файл рядом с filepath и атомарно подменяет им filepath."""
+    tmp_filepath = filepath + ".tmp"
+    with open(tmp_filepath, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filepath, filepath)
+
+
+def _save_array_atomic(filepath, array):
+    """np.save во временный файл и атомарная подмена filepath (файлы кеша открыты другими читателями через memmap)."""
+    tmp_filepath = filepath + ".tmp"
+    with open(tmp_filepath, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filepath, filepath)
+
+
+def _in_memory(array):
+    """Копия массива в памяти вместо memmap (чтобы файл кеша можно было заменить, в том числе под Windows)."""
+    return np.array(array) if isinstance(array, np.memmap) else array
+
+
+def _grow(array, capacity):
+    """Копия массива с ёмкостью capacity строк (хвост заполнен нулями)."""
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _encode_column(series):
+    """Колонка DataFrame -> (массив для .npy, описание колонки для meta.json)."""
+    if series.dtype.kind in "biuf":
+        return series.to_numpy(), {"name": series.name, "kind": "number"}
+    values = series.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    values = np.asarray(np.where(missing, "", values.astype(str)), dtype=str)
+    return values, {"name": series.name, "kind": "text", "dtype": str(series.dtype), "missing": bool(missing.any())}
+
+
+def _decode_column(array, column):
+    """Обратное к _encode_column: пустые строки текстовой колонки снова становятся пропусками."""
+    if column["kind"] == "number":
+        return pd.Series(np.array(array), name=column["name"])
+    series = pd.Series(np.array(array, dtype=object), name=column["name"])
+    if column["missing"]:
+        series = series.where(series != "")
+    return series.astype(column["dtype"])
+
+
+def _file_hash(filepath):
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DrawStore:
+    """
+    История тиражей в памяти, общая для всего процесса.
+    CSV разбирается один раз в int8 массив номеров (тиражи x 6, по возрастанию номера тиража),
+    массив дат и словарь «номер тиража -> строка»; при изменении mtime или размера файла данные
+    перечитываются автоматически при следующем обращении.
+    Разобранные массивы и все колонки файла (для dataframe()) сохраняются в бинарный кеш (.npy)
+    и при следующих запусках открываются через memmap без разбора CSV; кеш пересобирается,
+    только если изменилось содержимое файла.
+    Новые тиражи дописываются в конец CSV через журнал (append_draw), файл целиком при этом
+    не перечитывается и не перезаписывается: массивы растут в запасе ёмкости, строка ложится
+    в журнал кеша appended.jsonl, а производные индексы (derived) получают её через свой append.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = os.path.abspath(filepath)
+        directory, filename = os.path.split(self.filepath)
+        self.cache_dir = os.path.join(directory, CACHE_DIR, f"{os.path.splitext(filename)[0]}_cache")
+        self.wal_filepath = self.filepath + WAL_SUFFIX
+        self._signature = None
+        self._cache_meta = None
+        self._set_empty()
+
+    def _set_empty(self):
+        self._dataframe = pd.DataFrame(columns=DRAW_COLUMNS)
+        self._table = None
+        self._tail_rows = []
+        self._buffers = None
+        self._derived = {}
+        self.draw_numbers = np.zeros(0, dtype=np.int64)
+        self.dates = np.zeros(0, dtype="datetime64[D]")
+        self.numbers = np.zeros((0, 6), dtype=np.int8)
+        self.complete = np.zeros(0, dtype=bool)
+        self._row_by_draw = {}
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _ensure_fresh(self):
+        if os.path.exists(self.wal_filepath):
+            self._recover_wal()
+        signature = self._file_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._load()
+
+    def _load(self):
+        if self._signature is None or self._signature[1] == 0:
+            self._set_empty()
+            return
+        if self._load_cache():
+            return
+        try:
+            df = pd.read_csv(self.filepath, encoding="utf-8-sig")
+        except pd.errors.EmptyDataError:
+            self._set_empty()
+            return
+        self._set_arrays(*self._parse(df))
+        self._table = [_encode_column(df[column]) for column in df.columns]
+        self._dataframe = df
+        self._save_cache()
+
+    @staticmethod
+    def _parse(df):
+        """(номера тиражей, даты, номера) по возрастанию тиража; при повторе номера действует последняя строка файла."""
+        if 'Тираж' not in df.columns:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype="datetime64[D]"), np.zeros((0, 6), dtype=np.int8)
+        draw_numbers = pd.to_numeric(df['Тираж'], errors='coerce')
+        valid = draw_numbers.notna().to_numpy()
+        draw_numbers = draw_numbers.to_numpy()[valid].astype(np.int64)
+        numbers = df.reindex(columns=NUMBER_COLUMNS).apply(pd.to_numeric, errors='coerce')
+        numbers = numbers.to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+        dates = pd.to_datetime(df.reindex(columns=['Дата'])['Дата'], errors='coerce')
+        dates = dates.to_numpy(dtype="datetime64[ns]")[valid].astype("datetime64[D]")
+
+        order = np.argsort(draw_numbers, kind="stable")
+        draw_numbers, dates, numbers = draw_numbers[order], dates[order], numbers[order]
+        last = np.r_[draw_numbers[1:] != draw_numbers[:-1], True] if len(draw_numbers) else np.zeros(0, dtype=bool)
+        draw_numbers, dates, numbers = draw_numbers[last], dates[last], numbers[last]
+        in_range = (numbers >= 1) & (numbers <= 52)
+        return draw_numbers, dates, np.where(in_range, numbers, 0).astype(np.int8)
+
+    def _set_arrays(self, draw_numbers, dates, numbers):
+        self.draw_numbers, self.dates, self.numbers = draw_numbers, dates, numbers
+        self.complete = (numbers > 0).all(axis=1)
+        self._row_by_draw = None
+        self._dataframe = None
+        self._tail_rows = []
+        self._buffers = None
+        self._derived = {}
+
+    def _load_cache(self):
+        """Открывает бинарный кеш, если он соответствует текущему файлу. Возвращает True при успехе."""
+        meta_filepath = os.path.join(self.cache_dir, CACHE_META_FILE_NAME)
+        try:
+            with open(meta_filepath, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["signature"] != list(self._signature):
+                # mtime сменился, но содержимое могло остаться прежним (копирование, touch)
+                if meta["sha1"] is None or meta["sha1"] != _file_hash(self.filepath):
+                    return False
+                meta["signature"] = list(self._signature)
+                _write_atomic(meta_filepath, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+            arrays = [np.load(os.path.join(self.cache_dir, f"{name}.npy"), mmap_mode="r") for name in CACHE_ARRAYS]
+            table = [(np.load(os.path.join(self.cache_dir, f"{CACHE_TABLE_PREFIX}{i}.npy"), mmap_mode="r"), column)
+                     for i, column in enumerate(meta["columns"])]
+            tail_rows = []
+            if meta["tail_size"]:
+                with open(os.path.join(self.cache_dir, CACHE_TAIL_FILE_NAME), "rb") as f:
+                    tail_rows = [json.loads(line) for line in f.read(meta["tail_size"]).decode("utf-8").splitlines()]
+        except (OSError, KeyError, TypeError, ValueError):
+            return False
+        self._set_arrays(*arrays)
+        self._table = table
+        self._cache_meta = meta
+        for row in tail_rows:
+            self._insert_row(row)
+        if len(tail_rows) >= CACHE_TAIL_LIMIT:
+            self._save_cache()
+        return True
+
+    def _save_cache(self, with_hash=True):
+        """Полная сборка кеша: массивы и колонки файла в .npy, журнал дописанных строк сворачивается."""
+        if self._tail_rows:
+            df = self._build_dataframe()
+            self._table = [_encode_column(df[column]) for column in df.columns]
+            self._tail_rows = []
+        # Собственные memmap на файлы кеша отпускаются до их замены
+        self.draw_numbers, self.dates, self.numbers = (_in_memory(a) for a in (self.draw_numbers, self.dates, self.numbers))
+        self._table = [(_in_memory(array), column) for array, column in self._table]
+        self._cache_meta = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Старая метка удаляется первой: недописанный кеш не будет принят за актуальный
+            meta_filepath = os.path.join(self.cache_dir, CACHE_META_FILE_NAME)
+            if os.path.exists(meta_filepath):
+                os.remove(meta_filepath)
+            for name, array in zip(CACHE_ARRAYS, (self.draw_numbers, self.dates, self.numbers)):
+                _save_array_atomic(os.path.join(self.cache_dir, f"{name}.npy"), array)
+            for i, (array, _) in enumerate(self._table):
+                _save_array_atomic(os.path.join(self.cache_dir, f"{CACHE_TABLE_PREFIX}{i}.npy"), array)
+            meta = {
+                "signature": list(self._signature),
+                "sha1": _file_hash(self.filepath) if with_hash else None,
+                "columns": [column for _, column in self._table],
+                "tail_size": 0,
+            }
+            _write_atomic(meta_filepath, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+            self._cache_meta = meta
+        except OSError as e:
+            print(f"DrawStore: Не удалось сохранить кеш истории в {self.cache_dir}: {e}")
+
+    @property
+    def row_by_draw(self):
+        """Словарь «номер тиража -> строка массивов» (строится при первом обращении)."""
+        self._ensure_fresh()
+        if self._row_by_draw is None:
+            self._row_by_draw = {draw: row for row, draw in enumerate(self.draw_numbers.tolist())}
+        return self._row_by_draw
+
+    def reload(self):
+        """Принудительно перечитывает файл."""
+        self._signature = self._file_signature()
+        self._load()
+
+    def __len__(self):
+        self._ensure_fresh()
+        return len(self.draw_numbers)
+
+    def exists(self):
+        return os.path.exists(self.filepath)
+
+    def dataframe(self):
+        """Копия содержимого файла как DataFrame (в исходном порядке строк); собирается из кеша без разбора CSV."""
+        self._ensure_fresh()
+        if self._dataframe is None:
+            self._dataframe = self._build_dataframe()
+        return self._dataframe.copy()
+
+    def _build_dataframe(self):
+        df = pd.concat([_decode_column(array, column) for array, column in self._table], axis=1)
+        if self._tail_rows:
+            df = pd.concat([df, self._row_frame(self._tail_rows)], ignore_index=True)
+        return df
+
+    def derived(self, factory):
+        """
+        Производный индекс истории (например, OccurrenceIndex), общий для процесса: строится один раз
+        как factory(номера тиражей, номера) по полным тиражам, новые тиражи из append_draw получает
+        через свой метод append. При перечитывании файла индекс строится заново.
+        """
+        self._ensure_fresh()
+        index = self._derived.get(factory)
+        if index is None:
+            index = factory(*self.arrays())
+            self._derived[factory] = index
+        return index
+
+    def arrays(self, complete_only=True):
+        """(номера тиражей int64, номера int8 (тиражи, 6)) по возрастанию тиража; по умолчанию — только полные тиражи."""
+        self._ensure_fresh()
+        if complete_only and not self.complete.all():
+            return self.draw_numbers[self.complete], self.numbers[self.complete]
+        return self.draw_numbers, self.numbers
+
+    def last_draw_number(self):
+        """Номер последнего тиража (0, если история пуста)."""
+        self._ensure_fresh()
+        return int(self.draw_numbers[-1]) if len(self.draw_numbers) else 0
+
+    def next_draw_number(self):
+        return self.last_draw_number() + 1
+
+    def contains(self, draw_number):
+        return int(draw_number) in self.row_by_draw
+
+    def numbers_for(self, draw_number):
+        """Шесть номеров тиража draw_number списком, либо None, если тиража нет или он неполный."""
+        row = self.row_by_draw.get(int(draw_number))
+        if row is None or not self.complete[row]:
+            return None
+        return self.numbers[row].astype(int).tolist()
+
+    def _encode_row(self, row):
+        """Байты для дописывания строки row в конец CSV (с заголовком, если файл пуст)."""
+        size = os.path.getsize(self.filepath) if os.path.exists(self.filepath) else 0
+        prefix, newline = "", os.linesep
+        if size == 0:
+            columns = DRAW_COLUMNS
+            prefix = "\ufeff" + ",".join(columns) + newline
+        else:
+            with open(self.filepath, "rb") as f:
+                header = f.readline()
+                # Окончания строк — как в самом файле
+                newline = "\r\n" if header.endswith(b"\r\n") else "\n"
+                columns = next(csv.reader([header.decode("utf-8-sig")]))
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    prefix = newline
+        line = io.StringIO()
+        csv.writer(line, lineterminator=newline).writerow([row.get(column, "") for column in columns])
+        return size, (prefix + line.getvalue()).encode("utf-8")
+
+    def _apply_wal_record(self, record):
+        """Обрезает CSV до позиции записи из журнала и дописывает её (повторное применение безопасно)."""
+        if not os.path.exists(self.filepath):
+            open(self.filepath, "wb").close()
+        with open(self.filepath, "r+b") as f:
+            f.truncate(record["offset"])
+            f.seek(record["offset"])
+            f.write(record["data"].encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.remove(self.wal_filepath)
+
+    def _recover_wal(self):
+        try:
+            with open(self.wal_filepath, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            size = os.path.getsize(self.filepath) if os.path.exists(self.filepath) else 0
+            if size < record["offset"]:
+                print(f"DrawStore: Журнал {self.wal_filepath} не соответствует файлу тиражей и отброшен.")
+                os.remove(self.wal_filepath)
+                return
+            self._apply_wal_record(record)
+            print(f"DrawStore: Незавершённое добавление тиража восстановлено из журнала {self.wal_filepath}.")
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            print(f"DrawStore: Не удалось применить журнал {self.wal_filepath}: {e}")
+
+    def append_draw(self, draw_number, numbers, date=None, kit=""):
+        """
+        Дописывает тираж в конец CSV, не перечитывая и не перезаписывая файл.
+        Запись сначала атомарно ложится в журнал <csv>.wal, затем дописывается в CSV, и журнал
+        удаляется; если процесс прервётся, запись восстановится из журнала при следующем обращении.
+        Массивы в памяти, журнал кеша и производные индексы обновляются за O(1). Возвращает строку тиража как словарь.
+        """
+        draw_number = int(draw_number)
+        numbers = sorted(int(n) for n in numbers)
+        if len(numbers) != 6 or len(set(numbers)) != 6 or not all(1 <= n <= 52 for n in numbers):
+            raise ValueError("Тираж должен содержать 6 разных номеров от 1 до 52.")
+        if self.contains(draw_number):
+            raise ValueError(f"Тираж №{draw_number} уже существует.")
+
+        date = date or datetime.datetime.now().strftime("%Y-%m-%d")
+        row = {"Тираж": draw_number, "Дата": date, "Комплект": kit}
+        row.update({f'N{i}': n for i, n in enumerate(numbers, start=1)})
+        offset, data = self._encode_row(row)
+        record = {"offset": offset, "data": data.decode("utf-8")}
+        _write_atomic(self.wal_filepath, json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        self._apply_wal_record(record)
+
+        if self._table is None:
+            # Файл был пуст: первая строка разбирается обычным порядком
+            self.reload()
+            return row
+        self._signature = self._file_signature()
+        self._insert_row(row)
+        self._append_cache_tail(row)
+        return row
+
+    def _insert_row(self, row):
+        """Добавляет строку в массивы в памяти: в конец истории — за O(1) амортизированно, в середину — копированием."""
+        draw_number = int(row["Тираж"])
+        date = pd.to_datetime(row["Дата"], errors='coerce')
+        date = np.datetime64(date, "D") if pd.notna(date) else np.datetime64("NaT")
+        numbers = [int(row[column]) for column in NUMBER_COLUMNS]
+        size = len(self.draw_numbers)
+        if size == 0 or draw_number > self.draw_numbers[-1]:
+            if self._buffers is None or size == len(self._buffers[0]):
+                capacity = max(2 * size, size + INITIAL_SPARE_ROWS)
+                self._buffers = tuple(_grow(array, capacity) for array in (self.draw_numbers, self.dates, self.numbers, self.complete))
+            for buffer, value in zip(self._buffers, (draw_number, date, numbers, True)):
+                buffer[size] = value
+            self.draw_numbers, self.dates, self.numbers, self.complete = (buffer[:size + 1] for buffer in self._buffers)
+            if self._row_by_draw is not None:
+                self._row_by_draw[draw_number] = size
+            for index in self._derived.values():
+                index.append(draw_number, numbers)
+        else:
+            # Пропущенный ранее тираж из середины истории — редкий случай, массивы копируются
+            position = int(np.searchsorted(self.draw_numbers, draw_number))
+            self.draw_numbers = np.insert(self.draw_numbers, position, draw_number)
+            self.dates = np.insert(self.dates, position, date)
+            self.numbers = np.insert(self.numbers, position, numbers, axis=0)
+            self.complete = np.insert(self.complete, position, True)
+            self._buffers = None
+            self._row_by_draw = None
+            self._derived = {}
+        self._tail_rows.append(row)
+        self._dataframe = None
+
+    def _append_cache_tail(self, row):
+        """Дописывает строку в журнал кеша и обновляет метку кеша; файлы .npy не переписываются."""
+        meta = self._cache_meta
+        if meta is None:
+            return
+        meta_filepath = os.path.join(self.cache_dir, CACHE_META_FILE_NAME)
+        tail_filepath = os.path.join(self.cache_dir, CACHE_TAIL_FILE_NAME)
+        line = (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with open(tail_filepath, "r+b" if os.path.exists(tail_filepath) else "wb") as f:
+                # Всё, что лежит за tail_size, не подтверждено меткой (прерванная запись) и отбрасывается
+                f.truncate(meta["tail_size"])
+                f.seek(meta["tail_size"])
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            meta.update(signature=list(self._signature), sha1=None, tail_size=meta["tail_size"] + len(line))
+            _write_atomic(meta_filepath, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            self._cache_meta = None
+            print(f"DrawStore: Не удалось дописать строку в кеш истории {self.cache_dir}: {e}")
+
+    def _row_frame(self, rows):
+        """Дописанные строки как DataFrame с колонками файла; числовые колонки приводятся как при чтении CSV."""
+        frame = pd.DataFrame(rows).reindex(columns=[column["name"] for _, column in self._table])
+        for _, column in self._table:
+            if column["kind"] == "number":
+                frame[column["name"]] = pd.to_numeric(frame[column["name"]], errors='coerce')
+        return frame
+
+    def replace_draws(self, df):
+        """Атомарно заменяет весь CSV содержимым df (через временный файл и переименование)."""
+        _write_atomic(self.filepath, df.to_csv(index=False).encode("utf-8-sig"))
+        if os.path.exists(self.wal_filepath):
+            os.remove(self.wal_filepath)
+        self.reload()
+
+
+def get_draw_store(filepath):
+    """Общее для процесса хранилище тиражей файла filepath."""
+    key = os.path.abspath(filepath)
+    store = _stores.get(key)
+    if store is None:
+        store = DrawStore(key)
+        _stores[key] = store
+    return store
@@ -0,0 +1,190 @@
+import os
+import hashlib
+import datetime
+
+from utils.json_utils import load_json_config, save_json_config
+from utils.pool_format import parse_pool_filename, is_binary_pool, read_pool_header
+
+CATALOG_FILE_NAME = "pool_catalog.json"
+CATALOG_VERSION = 1
+HASH_CHUNK_SIZE = 1 << 20
+
+# Открытые каталоги процесса: абсолютный путь к generated/ -> PoolCatalog
+_catalogs = {}
+
+
+def _describe_file(filepath):
+    """(sha1, количество комбинаций) за один проход по файлу; для CSV считаются строки без заголовка."""
+    digest = hashlib.sha1()
+    line_count = 0
+    last_byte = b"\n"
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            line_count += chunk.count(b"\n")
+            last_byte = chunk[-1:]
+    if is_binary_pool(filepath):
+        count = read_pool_header(filepath)["count"]
+    else:
+        count = max(line_count + (last_byte != b"\n") - 1, 0)
+    return digest.hexdigest(), count
+
+
+def _modified(stat):
+    return datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds")
+
+
+class PoolCatalog:
+    """
+    Каталог пулов папки generated/ (generated/pool_catalog.json): для каждого файла — тираж, контур,
+    время создания, размер, число комбинаций и sha1. Каталог пополняется при записи пула (register),
+    поиск пулов тиража — по словарю, без разбора имён и хеширования всех файлов.
+    При открытии и после каждого изменения папки (её mtime) каталог сверяется с содержимым папки
+    по размеру и времени изменения файлов: пулы, положенные в папку в обход register (копии,
+    CSV прежних запусков, другие программы), добавляются, записи удалённых файлов убираются.
+    """
+
+    def __init__(self, generated_dir):
+        self.generated_dir = os.path.abspath(generated_dir)
+        self.filepath = os.path.join(self.generated_dir, CATALOG_FILE_NAME)
+        self._mtime = None
+        self._dir_mtime = None
+        self.pools = {}
+        self.by_draw = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.filepath):
+            self.rebuild()
+            return
+        self.pools = load_json_config(self.filepath).get("pools", {})
+        self._mtime = os.path.getmtime(self.filepath)
+        self._reconcile()
+
+    def _ensure_fresh(self):
+        """Перечитывает каталог, если его обновил другой процесс, и сверяет с папкой, если она изменилась."""
+        mtime = os.path.getmtime(self.filepath) if os.path.exists(self.filepath) else None
+        if mtime != self._mtime:
+            self._load()
+        elif self._directory_mtime() != self._dir_mtime:
+            self._reconcile()
+
+    def _directory_mtime(self):
+        try:
+            return os.stat(self.generated_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _is_current(entry, stat):
+        return entry is not None and entry["size"] == stat.st_size and entry["created"] == _modified(stat)
+
+    def _reconcile(self):
+        """Сверка с папкой: новые и изменённые (по размеру и времени) файлы описываются заново, исчезнувшие удаляются."""
+        self._dir_mtime = self._directory_mtime()
+        changed = False
+        present = set()
+        if os.path.isdir(self.generated_dir):
+            for item in os.scandir(self.generated_dir):
+                if not item.is_file() or parse_pool_filename(item.name) is None:
+                    continue
+                present.add(item.name)
+                if self._is_current(self.pools.get(item.name), item.stat()):
+                    continue
+                self.pools[item.name] = self._make_entry(item.path)
+                changed = True
+        for name in [name for name in self.pools if name not in present]:
+            del self.pools[name]
+            changed = True
+        if changed:
+            self._save()
+        self._build_index()
+
+    def _build_index(self):
+        self.by_draw = {}
+        for name, entry in self.pools.items():
+            self.by_draw.setdefault(entry["draw"], []).append(name)
+        for names in self.by_draw.values():
+            names.sort(key=lambda name: self.pools[name]["created"])
+
+    def _save(self):
+        save_json_config(self.filepath, {"version": CATALOG_VERSION, "pools": self.pools})
+        self._mtime = os.path.getmtime(self.filepath)
+
+    def _make_entry(self, filepath):
+        parsed = parse_pool_filename(filepath)
+        if parsed is None:
+            return None
+        draw, contour, _ = parsed
+        sha1, count = _describe_file(filepath)
+        stat = os.stat(filepath)
+        return {
+            "draw": draw,
+            "contour": contour,
+            "created": _modified(stat),
+            "size": stat.st_size,
+            "count": count,
+            "sha1": sha1,
+            "format": "lcpool" if is_binary_pool(filepath) else "csv",
+        }
+
+    def register(self, filepath):
+        """Добавляет (или обновляет) запись о пуле. Возвращает запись, либо None для файлов не по шаблону имени."""
+        self._ensure_fresh()
+        name = os.path.basename(filepath)
+        # Файл уже мог быть описан сверкой с папкой в _ensure_fresh
+        if os.path.dirname(os.path.abspath(filepath)) == self.generated_dir and self._is_current(self.pools.get(name), os.stat(filepath)):
+            return self.pools[name]
+        entry = self._make_entry(filepath)
+        if entry is None:
+            print(f"PoolCatalog: Имя файла {os.path.basename(filepath)} не соответствует шаблону пула, файл не учтён.")
+            return None
+        if name in self.pools:
+            self.by_draw[self.pools[name]["draw"]].remove(name)
+        self.pools[name] = entry
+        names = self.by_draw.setdefault(entry["draw"], [])
+        names.append(name)
+        names.sort(key=lambda pool_name: self.pools[pool_name]["created"])
+        self._save()
+        return entry
+
+    def rebuild(self):
+        """Полная пересборка каталога по содержимому папки (при отсутствии каталога)."""
+        self.pools = {}
+        self._reconcile()
+        if os.path.isdir(self.generated_dir):
+            if not os.path.exists(self.filepath):
+                self._save()
+            print(f"PoolCatalog: Каталог пулов собран, файлов: {len(self.pools)}.")
+
+    def pools_for_draw(self, draw_number, contour=None):
+        """Полные пути к пулам тиража (контур 'A'/'B' или все), от старых к новым. Удалённые файлы исключаются из каталога."""
+        self._ensure_fresh()
+        names = [name for name in self.by_draw.get(int(draw_number), [])
+                 if contour is None or self.pools[name]["contour"] == contour]
+        paths, missing = [], []
+        for name in names:
+            path = os.path.join(self.generated_dir, name)
+            if os.path.exists(path):
+                paths.append(path)
+            else:
+                missing.append(name)
+        if missing:
+            for name in missing:
+                self.by_draw[self.pools.pop(name)["draw"]].remove(name)
+            self._save()
+        return paths
+
+    def entry(self, filepath):
+        self._ensure_fresh()
+        return self.pools.get(os.path.basename(filepath))
+
+
+def get_pool_catalog(generated_dir):
+    """Общий для процесса каталог пулов папки generated_dir."""
+    key = os.path.abspath(generated_dir)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        catalog = PoolCatalog(key)
+        _catalogs[key] = catalog
+    return catalog
@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import hashlib
+import datetime
+import numpy as np
+import pandas as pd
+
+from utils.combination_rank import rank_combinations, unrank_combinations, rank_dataframe
+from utils.ticket_masks import TicketMasks, combination_to_mask, mask_to_numbers
+
+# Бинарный пул: 4 КБ заголовка (MAGIC + JSON, добитый пробелами), затем ранги комбинаций uint32 (little-endian)
+# в порядке генерации. Ранг — колексикографический номер комбинации 6 из 52 (utils.combination_rank).
+POOL_EXTENSION = ".lcpool"
+POOL_MAGIC = b"LCPOOL1\n"
+POOL_HEADER_SIZE = 4096
+POOL_FORMAT_VERSION = 1
+RANK_DTYPE = np.dtype("<u4")
+
+# Имена файлов пулов в generated/ (CSV и бинарные)
+POOL_FILENAME_PATTERN = re.compile(r"combinations_for_draw_(\d+)_Контур_([AB])_?(\d{8}_\d{6})?\.(csv|lcpool)$")
+
+# Подпапка рядом с пулом для CSV-выгрузок: в самой папке пулов выгрузка считалась бы вторым пулом того же тиража
+POOL_EXPORT_DIR = "exports"
+
+# Комбинаций за одну порцию при экспорте и чтении CSV
+POOL_CHUNK_SIZE = 1000000
+# Билетов в одном окне потоковой сверки: память на окно не зависит от размера пула
+POOL_WINDOW_SIZE = 1 << 20
+# Сколько совпавших билетов сверка возвращает построчно (остальные учитываются только в счётчиках)
+POOL_MAX_HITS = 10000
+NUMBER_COLUMNS = [f'N{i}' for i in range(1, 7)]
+
+
+def parse_pool_filename(filename):
+    """(тираж, контур 'A'/'B', метка времени или None) по имени файла пула, либо None."""
+    match = POOL_FILENAME_PATTERN.match(os.path.basename(filename))
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2), match.group(3)
+
+
+def is_binary_pool(filepath):
+    return filepath.endswith(POOL_EXTENSION)
+
+
+def config_hash(*configs):
+    """Короткий хеш набора конфигураций генерации (для заголовка пула)."""
+    payload = json.dumps(configs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _encode_header(header):
+    data = POOL_MAGIC + json.dumps(header, ensure_ascii=False).encode("utf-8")
+    if len(data) > POOL_HEADER_SIZE:
+        raise ValueError(f"Заголовок пула длиннее {POOL_HEADER_SIZE} байт.")
+    return data.ljust(POOL_HEADER_SIZE, b" ")
+
+
+class PoolWriter:
+    """
+    Потоковая запись бинарного пула. Комбинации дописываются порциями (write), заголовок
+    с итоговым количеством пишется при close(). Файл собирается во временном файле и
+    появляется под своим именем только целиком (атомарное переименование).
+    """
+
+    def __init__(self, filepath, draw=None, contour=None, seed=None, config_hash=None):
+        self.filepath = filepath
+        self.header = {
+            "format": POOL_FORMAT_VERSION,
+            "encoding": "rank_u32",
+            "draw": draw,
+            "contour": contour,
+            "seed": seed,
+            "config_hash": config_hash,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "count": 0,
+        }
+        self._tmp_filepath = filepath + ".tmp"
+        self._file = open(self._tmp_filepath, "wb")
+        self._file.write(_encode_header(self.header))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, combinations):
+        """Дописывает порцию комбинаций (N, 6)."""
+        self.write_ranks(rank_combinations(combinations) if len(combinations) else np.zeros(0, dtype=np.uint32))
+
+    def write_ranks(self, ranks):
+        ranks = np.asarray(ranks, dtype=RANK_DTYPE).reshape(-1)
+        self._file.write(ranks.tobytes())
+        self.header["count"] += len(ranks)
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(_encode_header(self.header))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_filepath, self.filepath)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_filepath):
+            os.remove(self._tmp_filepath)
+
+
+def write_pool(filepath, combinations, **header):
+    """Записывает массив комбинаций (N, 6) в бинарный пул одним вызовом."""
+    with PoolWriter(filepath, **header) as writer:
+        writer.write(combinations)
+    return writer.header
+
+
+def read_pool_header(filepath):
+    with open(filepath, "rb") as f:
+        data = f.read(POOL_HEADER_SIZE)
+    if not data.startswith(POOL_MAGIC):
+        raise ValueError(f"Файл {os.path.basename(filepath)} не является пулом {POOL_EXTENSION}.")
+    return json.loads(data[len(POOL_MAGIC):].decode("utf-8").rstrip())
+
+
+def read_pool_ranks(filepath, mmap=True):
+    """Ранги комбинаций пула: memmap uint32 (по умолчанию) или массив в памяти."""
+    header = read_pool_header(filepath)
+    count = header["count"]
+    if count == 0:
+        return np.zeros(0, dtype=RANK_DTYPE)
+    if mmap:
+        return np.memmap(filepath, dtype=RANK_DTYPE, mode="r", offset=POOL_HEADER_SIZE, shape=(count,))
+    with open(filepath, "rb") as f:
+        f.seek(POOL_HEADER_SIZE)
+        return np.fromfile(f, dtype=RANK_DTYPE, count=count)
+
+
+def read_pool(filepath):
+    """(заголовок, комбинации (N, 6) uint8) бинарного пула."""
+    return read_pool_header(filepath), unrank_combinations(read_pool_ranks(filepath, mmap=False))
+
+
+def load_pool_combinations(filepath):
+    """Комбинации пула (N, 6) из файла любого формата: .lcpool или CSV с колонками N1..N6."""
+    if is_binary_pool(filepath):
+        return read_pool(filepath)[1]
+    df = pd.read_csv(filepath, encoding="utf-8-sig")
+    return df[[col for col in NUMBER_COLUMNS if col in df.columns]].apply(
+        pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def load_pool_ranks(filepath):
+    """Ранги корректных комбинаций пула любого формата (для битовой карты прошлых генераций)."""
+    if is_binary_pool(filepath):
+        return read_pool_ranks(filepath, mmap=False)
+    return rank_dataframe(pd.read_csv(filepath, encoding="utf-8-sig"))
+
+
+def export_pool_csv(filepath, csv_filepath=None, chunksize=POOL_CHUNK_SIZE):
+    """
+    Выгружает бинарный пул в CSV (N1..N6, UTF-8 с BOM) порциями. Возвращает путь к CSV.
+    По умолчанию файл пишется в подпапку exports/ рядом с пулом.
+    """
+    if csv_filepath is None:
+        directory, filename = os.path.split(filepath)
+        csv_filepath = os.path.join(directory, POOL_EXPORT_DIR, os.path.splitext(filename)[0] + ".csv")
+    os.makedirs(os.path.dirname(csv_filepath) or ".", exist_ok=True)
+    ranks = read_pool_ranks(filepath)
+    with open(csv_filepath, 'w', encoding="utf-8-sig", newline="") as f:
+        f.write(",".join(NUMBER_COLUMNS) + "\n")
+        for start in range(0, len(ranks), chunksize):
+            combinations = unrank_combinations(ranks[start:start + chunksize])
+            pd.DataFrame(combinations, columns=NUMBER_COLUMNS).to_csv(f, header=False, index=False, lineterminator="\n")
+    return csv_filepath
+
+
+def import_pool_csv(csv_filepath, filepath=None, chunksize=POOL_CHUNK_SIZE, **header):
+    """Переводит CSV-пул в бинарный формат порциями (некорректные строки пропускаются). Возвращает путь."""
+    filepath = filepath or os.path.splitext(csv_filepath)[0] + POOL_EXTENSION
+    if "draw" not in header and "contour" not in header:
+        parsed = parse_pool_filename(csv_filepath)
+        if parsed:
+            header.update(draw=parsed[0], contour=parsed[1])
+    with PoolWriter(filepath, **header) as writer:
+        for chunk in pd.read_csv(csv_filepath, encoding="utf-8-sig", chunksize=chunksize):
+            writer.write_ranks(rank_dataframe(chunk))
+    return filepath
+
+
+def iter_pool_masks(filepath, window=POOL_WINDOW_SIZE):
+    """
+    Потоковое чтение пула окнами по window билетов: (номер первого билета окна, TicketMasks окна).
+    Бинарный пул открывается через numpy.memmap отдельно на каждое окно, поэтому в памяти
+    одновременно находится только одно окно, а повторные сверки читают файл из кеша ОС.
+    CSV читается порциями pandas.
+    """
+    if is_binary_pool(filepath):
+        count = read_pool_header(filepath)["count"]
+        for start in range(0, count, window):
+            ranks = np.memmap(filepath, dtype=RANK_DTYPE, mode="r", offset=POOL_HEADER_SIZE + start * RANK_DTYPE.itemsize,
+                              shape=(min(window, count - start),))
+            masks = TicketMasks.from_numbers(unrank_combinations(ranks))
+            del ranks
+            yield start, masks
+        return
+    start = 0
+    for chunk in pd.read_csv(filepath, encoding="utf-8-sig", chunksize=window):
+        masks = TicketMasks.from_dataframe(chunk)
+        yield start, masks
+        start += len(masks)
+
+
+def scan_pool(filepath, winning_numbers, min_matches=None, number_counts=False, window=POOL_WINDOW_SIZE,
+              max_hits=POOL_MAX_HITS):
+    """
+    Сверка пула с тиражом winning_numbers окнами (iter_pool_masks). Возвращает словарь:
+    total — билетов в пуле, match_counts — массив длины 7 (сколько билетов имеют 0..6 совпадений),
+    hits — список (номер билета с 1, номера билета, совпавшие номера, совпадений) для билетов
+    с не менее чем min_matches совпадениями (пустой, если min_matches=None); если таких билетов
+    больше max_hits, остаются max_hits с наибольшим числом совпадений (по порядку в пуле),
+    hits_total — сколько билетов прошло порог min_matches,
+    number_counts — частоты номеров по пулу (массив длины 53), если number_counts=True.
+    Память ограничена окном и max_hits и не зависит от размера пула.
+    """
+    result = {
+        "total": 0,
+        "match_counts": np.zeros(7, dtype=np.int64),
+        "hits": [],
+        "hits_total": 0,
+        "number_counts": np.zeros(53, dtype=np.int64) if number_counts else None,
+    }
+    hit_numbers = np.zeros(0, dtype=np.int64)
+    hit_masks = np.zeros(0, dtype=np.uint64)
+    hit_matches = np.zeros(0, dtype=np.uint8)
+    for start, masks in iter_pool_masks(filepath, window):
+        matches = masks.match_counts(winning_numbers)
+        result["total"] += len(masks)
+        result["match_counts"] += np.bincount(matches, minlength=7)[:7]
+        if min_matches is not None:
+            selected = np.flatnonzero(matches >= min_matches)
+            result["hits_total"] += len(selected)
+            hit_numbers = np.concatenate([hit_numbers, start + selected + 1])
+            hit_masks = np.concatenate([hit_masks, masks.masks[selected]])
+            hit_matches = np.concatenate([hit_matches, matches[selected]])
+            if len(hit_numbers) > max_hits:
+                keep = np.sort(np.lexsort((hit_numbers, -hit_matches.astype(np.int64)))[:max_hits])
+                hit_numbers, hit_masks, hit_matches = hit_numbers[keep], hit_masks[keep], hit_matches[keep]
+        if number_counts:
+            result["number_counts"] += masks.number_counts()
+    winning_mask = combination_to_mask(winning_numbers)
+    result["hits"] = [(int(number), mask_to_numbers(mask), mask_to_numbers(mask & winning_mask), int(count))
+                      for number, mask, count in zip(hit_numbers, hit_masks, hit_matches)]
+    return result
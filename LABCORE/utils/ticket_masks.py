@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Номер n (1..52) хранится битом n в 64-битной маске; бит 0 не используется.
+MAX_NUMBER = 52
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(values):
+        return np.bitwise_count(values).astype(np.uint8)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values):
+        as_bytes = np.ascontiguousarray(values, dtype=np.uint64).view(np.uint8).reshape(-1, 8)
+        return _POPCOUNT_TABLE[as_bytes].sum(axis=1, dtype=np.uint8).reshape(np.shape(values))
+
+
+def combination_to_mask(numbers):
+    """Переводит одну комбинацию (итерируемое чисел 1..52) в 64-битную маску."""
+    mask = 0
+    for num in numbers:
+        num = int(num)
+        if 1 <= num <= MAX_NUMBER:
+            mask |= 1 << num
+    return np.uint64(mask)
+
+
+def mask_to_numbers(mask):
+    """Возвращает отсортированный список номеров, закодированных в маске."""
+    mask = int(mask)
+    return [num for num in range(1, MAX_NUMBER + 1) if mask >> num & 1]
+
+
+class TicketMasks:
+    """
+    Компактный набор билетов: каждый билет 6 из 52 — одна маска uint64.
+    Сверка с тиражом сводится к AND и подсчёту битов по всему массиву сразу.
+    """
+
+    def __init__(self, masks):
+        self.masks = np.asarray(masks, dtype=np.uint64).reshape(-1)
+
+    @classmethod
+    def from_numbers(cls, numbers):
+        """
+        Строит маски из массива (N, k) номеров. Пропуски (NaN, 0) и числа вне 1..52 игнорируются.
+        """
+        numbers = np.asarray(numbers)
+        if numbers.ndim == 1:
+            numbers = numbers.reshape(1, -1)
+        if numbers.dtype.kind == "f":
+            numbers = np.nan_to_num(numbers, nan=0.0)
+        numbers = numbers.astype(np.int64)
+
+        valid = (numbers >= 1) & (numbers <= MAX_NUMBER)
+        shifts = np.where(valid, numbers, 0).astype(np.uint64)
+        bits = np.where(valid, np.left_shift(np.uint64(1), shifts), np.uint64(0))
+        return cls(np.bitwise_or.reduce(bits, axis=1))
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Строит маски из DataFrame с колонками N1..N6 (как в файлах generated/)."""
+        columns = [f'N{i}' for i in range(1, 7) if f'N{i}' in df.columns]
+        numbers = df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        return cls.from_numbers(numbers)
+
+    def __len__(self):
+        return len(self.masks)
+
+    def _other_masks(self, other):
+        if isinstance(other, TicketMasks):
+            return other.masks
+        if np.ndim(other) == 0:
+            return np.uint64(other)
+        return combination_to_mask(other)
+
+    def match_counts(self, other):
+        """Количество совпадений каждого билета с тиражом (маска, список номеров или TicketMasks)."""
+        return _popcount(self.masks & self._other_masks(other))
+
+    def intersection(self, other):
+        return TicketMasks(self.masks & self._other_masks(other))
+
+    def union(self, other):
+        return TicketMasks(self.masks | self._other_masks(other))
+
+    def sizes(self):
+        """Количество номеров в каждом билете."""
+        return _popcount(self.masks)
+
+    def numbers_at(self, index):
+        return mask_to_numbers(self.masks[index])
+
+    def number_counts(self, chunk_size=100000):
+        """
+        Сколько раз каждый номер встречается в наборе.
+        Возвращает массив длины 53, индекс — номер (элемент 0 не используется).
+        """
+        counts = np.zeros(MAX_NUMBER + 1, dtype=np.int64)
+        shifts = np.arange(MAX_NUMBER + 1, dtype=np.uint64)
+        for start in range(0, len(self.masks), chunk_size):
+            chunk = self.masks[start:start + chunk_size]
+            counts += ((chunk[:, None] >> shifts) & np.uint64(1)).sum(axis=0, dtype=np.int64)
+        counts[0] = 0
+        return counts